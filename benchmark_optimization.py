@@ -0,0 +1,447 @@
+#!/usr/bin/env python3
+"""
+Reproducible performance benchmark of Optimization.perform_optimization.
+
+The scenarios are generated from a seed (horizon, timestep, deferrable, thermal,
+sequence and EV loads, battery, hybrid inverter and cost function). For each
+scenario and solver the model build, solve and extraction times (median of the
+repeats) and the peak traced memory are written as JSON, then compared with a
+stored baseline.
+
+Usage:
+    python benchmark_optimization.py                      # run and compare with the baseline
+    python benchmark_optimization.py --save-baseline      # store a new baseline
+    python benchmark_optimization.py --scenarios ev_day --solvers PULP_CBC_CMD --repeat 5
+
+Exits with status 1 when a gate fails: a non optimal solve, a different model
+size or objective, or a peak memory above the baseline tolerance. The times are
+wall-clock and only gated on request, with at least MIN_TIME_REPEAT repeats:
+
+    python benchmark_optimization.py --repeat 5 --time-tolerance 1.0
+
+    python benchmark_optimization.py --low-memory         # same, in the low memory mode
+    python benchmark_optimization.py --memory-ceiling     # peak memory by horizon and load count
+"""
+import argparse
+import json
+import logging
+import pathlib
+import platform
+import statistics
+import sys
+from dataclasses import asdict, dataclass
+
+import numpy as np
+import pandas as pd
+import pulp as plp
+
+sys.path.append('/workspaces/emhass/src')
+
+from emhass.optimization import Optimization
+
+BASELINE_PATH = pathlib.Path(__file__).parent / "benchmark_baseline.json"
+# Solver names of the optimization config, by PuLP solver name
+SOLVERS = {
+    "PULP_CBC_CMD": "PULP_CBC_CMD",
+    "GLPK_CMD": "GLPK_CMD",
+    "HiGHS": "HiGHS",
+    "COIN_CMD": "COIN_CMD",
+}
+TIME_METRICS = ["build_ms", "solve_ms", "extraction_ms"]
+SIZE_METRICS = ["variables", "constraints", "nonzeros"]
+# Minimum number of repeats for the median times to be gated
+MIN_TIME_REPEAT = 5
+
+logger = logging.getLogger("benchmark_optimization")
+
+
+@dataclass(frozen=True)
+class Scenario:
+    """A synthetic optimization problem, fully defined by its parameters and seed"""
+
+    name: str
+    horizon_hours: int = 24
+    timestep_minutes: int = 30
+    deferrable_loads: int = 2
+    thermal_loads: int = 0
+    sequence_loads: int = 0
+    ev_loads: int = 0
+    battery: bool = False
+    hybrid_inverter: bool = False
+    costfun: str = "profit"
+    seed: int = 0
+
+    @property
+    def timesteps(self):
+        return self.horizon_hours * 60 // self.timestep_minutes
+
+
+# The sequence loads are not in the default scenarios: their placement constraints
+# make the model infeasible (see the sequence-load formulation of the optimization)
+SCENARIOS = {
+    scenario.name: scenario
+    for scenario in [
+        Scenario("deferrable_day"),
+        Scenario("ev_day", ev_loads=1),
+        Scenario("battery_two_ev_day", timestep_minutes=15, ev_loads=2, battery=True),
+        Scenario("thermal_day", deferrable_loads=1, thermal_loads=1),
+        Scenario("hybrid_selfcons_day", timestep_minutes=15, battery=True, hybrid_inverter=True, costfun="self-consumption"),
+        Scenario("cost_ev_five_minutes", horizon_hours=12, timestep_minutes=5, ev_loads=1, costfun="cost"),
+    ]
+}
+
+
+def generate_scenario(scenario, solver="PULP_CBC_CMD"):
+    """Build the configs and the input data of a scenario"""
+    rng = np.random.default_rng(scenario.seed)
+    n = scenario.timesteps
+    steps_per_hour = 60 // scenario.timestep_minutes
+    index = pd.date_range(
+        "2025-06-01", periods=n, freq=f"{scenario.timestep_minutes}min", tz="UTC"
+    )
+    hours = index.hour + index.minute / 60
+    data = pd.DataFrame(
+        {
+            "P_PV": np.clip(6000 * np.sin((hours - 6) / 12 * np.pi), 0, None)
+            * rng.uniform(0.7, 1.0, n),
+            "P_load": 300 + rng.uniform(0, 600, n),
+            "unit_load_cost": np.where((hours > 7) & (hours < 22), 0.25, 0.15)
+            + rng.uniform(0, 0.02, n),
+            "unit_prod_price": 0.05 + rng.uniform(0, 0.01, n),
+            "outdoor_temperature_forecast": 12 + 6 * np.sin((hours - 9) / 24 * 2 * np.pi),
+        },
+        index=index,
+    )
+
+    nominal_powers, operating_hours, def_load_config = [], [], []
+    for _ in range(scenario.deferrable_loads):
+        nominal_powers.append(float(rng.choice([750, 1500, 3000])))
+        operating_hours.append(int(rng.integers(2, 5)))
+        def_load_config.append({})
+    for _ in range(scenario.thermal_loads):
+        nominal_powers.append(2000.0)
+        operating_hours.append(0)
+        def_load_config.append(
+            {
+                "thermal_config": {
+                    "heating_rate": 5.0,
+                    "cooling_constant": 0.1,
+                    "overshoot_temperature": 24.0,
+                    "start_temperature": 20.0,
+                    "desired_temperatures": [21.0] * n,
+                }
+            }
+        )
+    for _ in range(scenario.sequence_loads):
+        nominal_powers.append([500.0, 1500.0, 1500.0, 500.0])
+        operating_hours.append(0)
+        def_load_config.append({})
+    num_def = len(nominal_powers)
+    availability, min_soc = [], []
+    for _ in range(scenario.ev_loads):
+        away_start = int(rng.integers(7, 10)) * steps_per_hour
+        away_end = away_start + 8 * steps_per_hour
+        availability.append(
+            [0 if away_start <= i < away_end else 1 for i in range(n)]
+        )
+        min_soc.append(
+            [0.2 if i < away_start else 0.8 if i < away_end else 0.2 for i in range(n)]
+        )
+
+    retrieve_hass_conf = {
+        "optimization_time_step": pd.to_timedelta(scenario.timestep_minutes, "minutes"),
+        "time_zone": "UTC",
+        "sensor_power_photovoltaics": "sensor.pv_power",
+        "sensor_power_load_no_var_loads": "sensor.load_power",
+    }
+    optim_conf = {
+        "set_use_battery": scenario.battery,
+        "set_total_pv_sell": False,
+        "number_of_deferrable_loads": num_def,
+        "nominal_power_of_deferrable_loads": nominal_powers,
+        "operating_hours_of_each_deferrable_load": operating_hours,
+        # The thermal loads modulate, the sequence loads have no single nominal power
+        "treat_deferrable_load_as_semi_cont": [
+            i < scenario.deferrable_loads for i in range(num_def)
+        ],
+        "set_deferrable_load_single_constant": [False] * num_def,
+        "set_deferrable_startup_penalty": [0.0] * num_def,
+        "start_timesteps_of_each_deferrable_load": [0] * num_def,
+        "end_timesteps_of_each_deferrable_load": [0] * num_def,
+        "def_load_config": def_load_config,
+        "set_nocharge_from_grid": False,
+        "set_nodischarge_to_grid": True,
+        "set_battery_dynamic": False,
+        "battery_dynamic_max": 0.9,
+        "battery_dynamic_min": -0.9,
+        "weight_battery_discharge": 0.0,
+        "weight_battery_charge": 0.0,
+        "number_of_ev_loads": scenario.ev_loads,
+        "ev_battery_capacity": [60000] * scenario.ev_loads,
+        "ev_charging_efficiency": [0.9] * scenario.ev_loads,
+        "ev_nominal_charging_power": [7400] * scenario.ev_loads,
+        "ev_minimum_charging_power": [1380] * scenario.ev_loads,
+        "ev_availability": availability,
+        "ev_minimum_soc_schedule": min_soc,
+        "ev_initial_soc": [0.2] * scenario.ev_loads,
+        "lp_solver": solver,
+        "lp_solver_timeout": 120,
+        "num_threads": 1,
+    }
+    plant_conf = {
+        "maximum_power_from_grid": 20000,
+        "maximum_power_to_grid": 9000,
+        "inverter_is_hybrid": scenario.hybrid_inverter,
+        "inverter_ac_output_max": 8000,
+        "inverter_ac_input_max": 8000,
+        "compute_curtailment": False,
+        "battery_discharge_power_max": 5000,
+        "battery_charge_power_max": 5000,
+        "battery_discharge_efficiency": 0.95,
+        "battery_charge_efficiency": 0.95,
+        "battery_nominal_energy_capacity": 10000,
+        "battery_minimum_state_of_charge": 0.1,
+        "battery_maximum_state_of_charge": 0.9,
+        "battery_target_state_of_charge": 0.6,
+    }
+    return retrieve_hass_conf, optim_conf, plant_conf, data
+
+
+def run_once(scenario, solver, options=None):
+    """Run one optimization, the options override the optimization config"""
+    retrieve_hass_conf, optim_conf, plant_conf, data = generate_scenario(scenario, solver)
+    optim_conf.update(options or {})
+    opt = Optimization(
+        retrieve_hass_conf,
+        optim_conf,
+        plant_conf,
+        "unit_load_cost",
+        "unit_prod_price",
+        scenario.costfun,
+        {},
+        logger,
+    )
+    opt.perform_optimization(
+        data,
+        data["P_PV"].values,
+        data["P_load"].values,
+        data["unit_load_cost"].values,
+        data["unit_prod_price"].values,
+    )
+    return opt
+
+
+def run_benchmark(scenario, solver, repeat=3, low_memory=False):
+    """Benchmark one scenario with one solver"""
+    options = {"low_memory_mode": low_memory}
+    runs = [run_once(scenario, solver, options) for _ in range(repeat)]
+    # The memory is traced in a separate run, tracemalloc slows the timed runs down
+    memory = run_once(scenario, solver, dict(options, memory_report=True)).last_memory_report
+    timings = [opt.last_timings for opt in runs]
+    stats = runs[-1].last_solve_stats or {}
+    return {
+        "scenario": scenario.name,
+        "solver": solver,
+        "parameters": asdict(scenario),
+        "low_memory": low_memory,
+        "status": runs[-1].optim_status,
+        "objective": stats.get("objective"),
+        "variables": sum(stats.get("variables", {}).values()),
+        "constraints": stats.get("constraints"),
+        "nonzeros": stats.get("nonzeros"),
+        "build_ms": statistics.median(
+            t["variables"] + t["objective"] + t["constraints"] for t in timings
+        ),
+        "solve_ms": statistics.median(t["solve"] for t in timings),
+        "extraction_ms": statistics.median(t["extraction"] for t in timings),
+        "total_ms": statistics.median(t["total"] for t in timings),
+        "peak_memory_mb": memory["peak_mb"],
+        "memory_phases": {name: phase["peak_mb"] for name, phase in memory["phases"].items()},
+        "memory_families": dict(list(memory["families"].items())[:5]),
+    }
+
+
+def memory_ceiling(
+    timesteps=(48, 96, 192, 288, 576), ev_loads=(0, 1, 3), solver="PULP_CBC_CMD", low_memory=False
+):
+    """
+    Trace the peak memory of a battery scenario with 2 deferrable loads, by number
+    of timesteps and EV loads. The solver time is capped, it does not change the
+    memory traced in the Python process.
+    """
+    rows = []
+    for n in timesteps:
+        for num_ev in ev_loads:
+            scenario = Scenario(
+                f"ceiling_{n}_{num_ev}",
+                horizon_hours=n * 5 // 60,
+                timestep_minutes=5,
+                ev_loads=num_ev,
+                battery=True,
+            )
+            opt = run_once(
+                scenario,
+                solver,
+                {"low_memory_mode": low_memory, "memory_report": True, "lp_solver_timeout": 10},
+            )
+            rows.append(
+                {
+                    "timesteps": n,
+                    "ev_loads": num_ev,
+                    "variables": sum(opt.last_solve_stats["variables"].values()),
+                    "constraints": opt.last_solve_stats["constraints"],
+                    "nonzeros": opt.last_solve_stats["nonzeros"],
+                    "peak_memory_mb": opt.last_memory_report["peak_mb"],
+                }
+            )
+    return rows
+
+
+def compare(
+    results,
+    baseline,
+    memory_tolerance=0.2,
+    objective_tolerance=1e-6,
+    time_tolerance=None,
+    min_time_ms=20.0,
+):
+    """
+    Compare the results with the baseline, return the failed gates.
+
+    The status, the model size and the objective (relative objective_tolerance) are
+    deterministic and always gated. The times are wall-clock and only gated when
+    time_tolerance is set: a time fails when it is above the baseline by more than
+    time_tolerance (relative) and min_time_ms (absolute, for the timer noise of the
+    small phases).
+    """
+    reference = {(r["scenario"], r["solver"]): r for r in baseline["results"]}
+    failures = []
+    for result in results["results"]:
+        key = (result["scenario"], result["solver"])
+        label = f"{key[0]} [{key[1]}]"
+        if result["status"] != "Optimal":
+            failures.append(f"{label}: status {result['status']}")
+        base = reference.get(key)
+        if base is None:
+            continue
+        for metric in SIZE_METRICS:
+            if result[metric] != base[metric]:
+                failures.append(
+                    f"{label}: {metric} changed from {base[metric]} to {result[metric]}"
+                )
+        if result["objective"] is not None and base["objective"] is not None:
+            if not np.isclose(
+                result["objective"], base["objective"], rtol=objective_tolerance, atol=1e-9
+            ):
+                failures.append(
+                    f"{label}: objective changed from {base['objective']:.6g} "
+                    f"to {result['objective']:.6g}"
+                )
+        for metric in TIME_METRICS if time_tolerance is not None else []:
+            limit = max(base[metric] * (1 + time_tolerance), base[metric] + min_time_ms)
+            if result[metric] > limit:
+                failures.append(
+                    f"{label}: {metric} {result[metric]:.1f} above {limit:.1f} "
+                    f"(baseline {base[metric]:.1f})"
+                )
+        limit = base["peak_memory_mb"] * (1 + memory_tolerance)
+        if result["peak_memory_mb"] > limit:
+            failures.append(
+                f"{label}: peak_memory_mb {result['peak_memory_mb']:.1f} above {limit:.1f} "
+                f"(baseline {base['peak_memory_mb']:.1f})"
+            )
+    return failures
+
+
+def get_available_solvers():
+    available = plp.listSolvers(onlyAvailable=True)
+    return [name for pulp_name, name in SOLVERS.items() if pulp_name in available]
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(
+        description="Benchmark Optimization.perform_optimization"
+    )
+    parser.add_argument("--scenarios", default=",".join(SCENARIOS))
+    parser.add_argument("--solvers", default=None, help="Defaults to the available solvers")
+    parser.add_argument("--repeat", type=int, default=3)
+    parser.add_argument("--output", default="benchmark_results.json")
+    parser.add_argument("--baseline", default=str(BASELINE_PATH))
+    parser.add_argument("--save-baseline", action="store_true")
+    parser.add_argument("--memory-tolerance", type=float, default=0.2)
+    parser.add_argument("--objective-tolerance", type=float, default=1e-6)
+    parser.add_argument(
+        "--time-tolerance",
+        type=float,
+        default=None,
+        help=f"Gate the times too, needs --repeat {MIN_TIME_REPEAT} or more",
+    )
+    parser.add_argument("--min-time-ms", type=float, default=20.0)
+    parser.add_argument("--low-memory", action="store_true", help="Use the low memory mode")
+    parser.add_argument(
+        "--memory-ceiling",
+        action="store_true",
+        help="Print the peak memory by horizon and load count, then exit",
+    )
+    args = parser.parse_args(argv)
+    if args.time_tolerance is not None and args.repeat < MIN_TIME_REPEAT:
+        parser.error(f"--time-tolerance needs --repeat {MIN_TIME_REPEAT} or more")
+
+    if args.memory_ceiling:
+        print("| timesteps | EV loads | variables | constraints | nonzeros | peak MiB |")
+        print("|---|---|---|---|---|---|")
+        for row in memory_ceiling(low_memory=args.low_memory):
+            print(
+                f"| {row['timesteps']} | {row['ev_loads']} | {row['variables']} | "
+                f"{row['constraints']} | {row['nonzeros']} | {row['peak_memory_mb']:.1f} |"
+            )
+        return 0
+
+    solvers = args.solvers.split(",") if args.solvers else get_available_solvers()
+    results = {
+        "meta": {
+            "python": platform.python_version(),
+            "pulp": plp.__version__,
+            "numpy": np.__version__,
+            "pandas": pd.__version__,
+            "machine": platform.machine(),
+            "repeat": args.repeat,
+            "low_memory": args.low_memory,
+        },
+        "results": [],
+    }
+    for name in args.scenarios.split(","):
+        for solver in solvers:
+            result = run_benchmark(SCENARIOS[name], solver, args.repeat, args.low_memory)
+            results["results"].append(result)
+            print(
+                f"{name:<24} {solver:<14} {result['variables']:>6} vars "
+                f"{result['constraints']:>6} rows  build {result['build_ms']:8.1f} ms  "
+                f"solve {result['solve_ms']:8.1f} ms  extraction {result['extraction_ms']:6.1f} ms  "
+                f"peak {result['peak_memory_mb']:6.1f} MiB"
+            )
+    pathlib.Path(args.output).write_text(json.dumps(results, indent=2))
+    if args.save_baseline:
+        pathlib.Path(args.baseline).write_text(json.dumps(results, indent=2))
+        print(f"Baseline written to {args.baseline}")
+        return 0
+    baseline_path = pathlib.Path(args.baseline)
+    if not baseline_path.is_file():
+        print(f"No baseline in {baseline_path}, run with --save-baseline")
+        return 0
+    failures = compare(
+        results,
+        json.loads(baseline_path.read_text()),
+        args.memory_tolerance,
+        args.objective_tolerance,
+        args.time_tolerance,
+        args.min_time_ms,
+    )
+    for failure in failures:
+        print(f"FAIL {failure}")
+    print(f"{len(failures)} failed gates")
+    return 1 if failures else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
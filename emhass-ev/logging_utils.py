@@ -0,0 +1,85 @@
+"""
+Logging helpers: lazy message arguments and non-blocking file handlers.
+
+The records of the file loggers go through a queue, and a background listener \
+writes them to the log file. The optimization thread never waits on the disk.
+"""
+
+from __future__ import annotations
+
+import atexit
+import logging
+import pathlib
+import queue
+import threading
+from collections.abc import Callable
+from logging.handlers import QueueListener
+
+
+class Lazy:
+    """
+    A logging argument computed only when the record is formatted.
+
+    ``logger.debug("y = %s", Lazy(list, y.keys()))`` only builds the list when \
+    the DEBUG records are emitted.
+    """
+
+    __slots__ = ("func", "args")
+
+    def __init__(self, func: Callable, *args):
+        self.func = func
+        self.args = args
+
+    def __str__(self) -> str:
+        return str(self.func(*self.args))
+
+    __repr__ = __str__
+
+
+# Queue and listener writing each log file, keyed by path
+_file_listeners = {}
+_lock = threading.Lock()
+
+
+def get_log_queue(path: str | pathlib.Path, formatter: logging.Formatter) -> queue.SimpleQueue:
+    """
+    Get the queue of the records written to a log file.
+
+    The file is written by one listener thread per path, started on the first \
+    call. Log to the file with a ``logging.handlers.QueueHandler`` on this queue.
+
+    :param path: The log file path
+    :type path: str | pathlib.Path
+    :param formatter: The formatter of the log file lines, used when the \
+        listener is started
+    :type formatter: logging.Formatter
+    :return: The queue read by the listener of the file
+    :rtype: queue.SimpleQueue
+    """
+    path = str(pathlib.Path(path).resolve())
+    with _lock:
+        if path not in _file_listeners:
+            file_handler = logging.FileHandler(path)
+            file_handler.setFormatter(formatter)
+            records = queue.SimpleQueue()
+            listener = QueueListener(records, file_handler)
+            listener.start()
+            _file_listeners[path] = (records, listener, file_handler)
+        return _file_listeners[path][0]
+
+
+def stop_queue_listeners() -> None:
+    """
+    Write the queued records and close the log files.
+
+    Called at exit, the next get_log_queue call starts a new listener.
+    """
+    with _lock:
+        listeners = list(_file_listeners.values())
+        _file_listeners.clear()
+    for _, listener, file_handler in listeners:
+        listener.stop()
+        file_handler.close()
+
+
+atexit.register(stop_queue_listeners)
@@ -0,0 +1,129 @@
+"""
+Memory report of the optimization, traced with ``tracemalloc``.
+
+The report gives the memory allocated and the peak of each phase of a run, and \
+the memory retained by each constraint family of the optimization model. Only \
+the Python allocations are traced: the memory of a solver running in its own \
+process (CBC, GLPK) is not included.
+"""
+
+from __future__ import annotations
+
+import json
+import logging
+import tracemalloc
+
+MB = 2**20
+
+
+class MemoryReport:
+    r"""
+    Trace the memory of the phases of a run and of the model families.
+
+    ``tracemalloc`` is started on creation when it is not tracing yet, and \
+    stopped by ``stop``. Tracing slows the Python code down noticeably, so the \
+    report is only built on request.
+    """
+
+    def __init__(self):
+        self._owner = not tracemalloc.is_tracing()
+        if self._owner:
+            tracemalloc.start()
+        tracemalloc.reset_peak()
+        self._start = tracemalloc.get_traced_memory()[0]
+        self._last_phase = self._start
+        self._last_family = self._start
+        self._peak = 0
+        self._stopped = False
+        self.phases: dict[str, dict[str, float]] = {}
+        self.families: dict[str, float] = {}
+
+    def phase(self, name: str) -> None:
+        """
+        Close the phase running since the previous call.
+
+        :param name: The phase name
+        :type name: str
+        """
+        if self._stopped or not tracemalloc.is_tracing():
+            return
+        current, peak = tracemalloc.get_traced_memory()
+        phase = self.phases.setdefault(name, {"allocated_mb": 0.0, "peak_mb": 0.0})
+        phase["allocated_mb"] += (current - self._last_phase) / MB
+        phase["peak_mb"] = max(phase["peak_mb"], (peak - self._start) / MB)
+        self._peak = max(self._peak, peak)
+        tracemalloc.reset_peak()
+        self._last_phase = current
+        self._last_family = current
+
+    def family(self, name: str) -> None:
+        """
+        Charge the memory allocated since the previous call to a model family.
+
+        :param name: The family name
+        :type name: str
+        """
+        if self._stopped or not tracemalloc.is_tracing():
+            return
+        current = tracemalloc.get_traced_memory()[0]
+        self.families[name] = (
+            self.families.get(name, 0.0) + (current - self._last_family) / MB
+        )
+        self._last_family = current
+
+    def stop(self) -> dict:
+        """
+        Stop tracing (when started by this report) and get the report.
+
+        Only the first call stops tracing, so a run can stop its report again \
+        on errors without stopping a trace started since by someone else.
+
+        :return: The report, see ``as_dict``
+        :rtype: dict
+        """
+        if self._stopped:
+            return self.as_dict()
+        self._stopped = True
+        if tracemalloc.is_tracing():
+            self._peak = max(self._peak, tracemalloc.get_traced_memory()[1])
+        if self._owner and tracemalloc.is_tracing():
+            tracemalloc.stop()
+        return self.as_dict()
+
+    def as_dict(self) -> dict:
+        """
+        Get the report, in MiB above the memory traced at the creation.
+
+        :return: The ``peak_mb`` of the run, the ``phases`` with their \
+            ``allocated_mb`` and ``peak_mb``, and the ``families`` by allocated \
+            memory (largest first)
+        :rtype: dict
+        """
+        return {
+            "peak_mb": round((self._peak - self._start) / MB, 3) if self._peak else 0.0,
+            "phases": {
+                name: {key: round(value, 3) for key, value in phase.items()}
+                for name, phase in self.phases.items()
+            },
+            "families": {
+                name: round(value, 3)
+                for name, value in sorted(
+                    self.families.items(), key=lambda item: item[1], reverse=True
+                )
+            },
+        }
+
+    def log(self, logger: logging.Logger, label: str) -> dict:
+        """
+        Stop tracing and log the report at INFO as a single structured line.
+
+        :param logger: The logger
+        :type logger: logging.Logger
+        :param label: The name of the traced run
+        :type label: str
+        :return: The logged report
+        :rtype: dict
+        """
+        report = self.stop()
+        logger.info("memory %s %s", label, json.dumps(report))
+        return report
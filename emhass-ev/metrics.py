@@ -0,0 +1,468 @@
+"""
+Metrics of the optimizations in the Prometheus text exposition format.
+
+The request latencies, the solve and model build times, the number of requests \
+in progress, the cache hit counts, the process memory and the statistics of \
+the last solve are kept in memory. ``get_metrics`` renders them as the body of a \
+``/metrics`` endpoint served with ``CONTENT_TYPE``, ``start_http_server`` serves \
+them on a port of their own (``ensure_http_server`` once per process). Recording \
+a value only updates a few counters, the rendering cost only depends on the \
+number of series.
+"""
+
+from __future__ import annotations
+
+import bisect
+import math
+import os
+import resource
+import threading
+import time
+from collections.abc import Callable, Iterator
+from contextlib import contextmanager
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+CONTENT_TYPE = "text/plain; version=0.0.4; charset=utf-8"
+
+# Latency buckets in seconds, from the cached config reads to the long MPC solves
+LATENCY_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30, 60, 120)
+
+# Statistics of the last MILP solve, see Optimization.get_solve_stats
+_last_solve_stats = {}
+_lock = threading.Lock()
+
+
+def _format_labels(labels: dict) -> str:
+    if not labels:
+        return ""
+    items = ",".join(
+        '{}="{}"'.format(
+            key,
+            str(value).replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n"),
+        )
+        for key, value in labels.items()
+    )
+    return "{" + items + "}"
+
+
+def _format_value(value: float) -> str:
+    if value is None:
+        return "NaN"
+    value = float(value)
+    if math.isnan(value):
+        return "NaN"
+    if math.isinf(value):
+        return "+Inf" if value > 0 else "-Inf"
+    return repr(value)
+
+
+def format_metric(
+    name: str, metric_type: str, help_text: str, samples: list[tuple[dict, float]]
+) -> str:
+    """
+    Format one metric family.
+
+    :param name: The metric name
+    :type name: str
+    :param metric_type: The metric type (gauge, counter, histogram)
+    :type metric_type: str
+    :param help_text: The metric description
+    :type help_text: str
+    :param samples: The samples as (labels, value) pairs
+    :type samples: list
+    :return: The metric family in the text exposition format
+    :rtype: str
+    """
+    lines = [f"# HELP {name} {help_text}", f"# TYPE {name} {metric_type}"]
+    for labels, value in samples:
+        lines.append(f"{name}{_format_labels(labels)} {_format_value(value)}")
+    return "\n".join(lines) + "\n"
+
+
+class Histogram:
+    """
+    A histogram with fixed buckets, by label values.
+    """
+
+    def __init__(
+        self,
+        name: str,
+        help_text: str,
+        label_names: tuple = (),
+        buckets: tuple = LATENCY_BUCKETS,
+    ):
+        self.name = name
+        self.help_text = help_text
+        self.label_names = label_names
+        self.buckets = tuple(sorted(buckets))
+        # Label values: (count by bucket, +Inf included, sum)
+        self._series = {}
+        self._lock = threading.Lock()
+
+    def observe(self, value: float, *label_values: str) -> None:
+        """
+        Add an observation.
+
+        :param value: The observed value
+        :type value: float
+        :param label_values: The values of the labels, in the order of label_names
+        :type label_values: str
+        """
+        position = bisect.bisect_left(self.buckets, value)
+        with self._lock:
+            series = self._series.get(label_values)
+            if series is None:
+                series = self._series[label_values] = [[0] * (len(self.buckets) + 1), 0.0]
+            series[0][position] += 1
+            series[1] += value
+
+    @contextmanager
+    def time(self, *label_values: str) -> Iterator[None]:
+        """
+        Observe the duration of the ``with`` block, in seconds.
+
+        :param label_values: The values of the labels, in the order of label_names
+        :type label_values: str
+        """
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.observe(time.perf_counter() - start, *label_values)
+
+    def clear(self) -> None:
+        with self._lock:
+            self._series.clear()
+
+    def render(self) -> str:
+        """
+        Format the histogram.
+
+        :return: The histogram in the text exposition format
+        :rtype: str
+        """
+        with self._lock:
+            series = {key: (list(counts), total) for key, (counts, total) in self._series.items()}
+        samples = []
+        for label_values, (counts, total) in series.items():
+            labels = dict(zip(self.label_names, label_values))
+            cumulative = 0
+            for bound, count in zip(self.buckets + (math.inf,), counts):
+                cumulative += count
+                le = "+Inf" if math.isinf(bound) else repr(float(bound))
+                samples.append(("_bucket", {**labels, "le": le}, cumulative))
+            samples.append(("_sum", labels, total))
+            samples.append(("_count", labels, cumulative))
+        lines = [f"# HELP {self.name} {self.help_text}", f"# TYPE {self.name} histogram"]
+        for suffix, labels, value in samples:
+            lines.append(f"{self.name}{suffix}{_format_labels(labels)} {_format_value(value)}")
+        return "\n".join(lines) + "\n"
+
+
+class CacheStats:
+    """
+    Hit and miss counts of a cache, with the interface of ``functools.lru_cache``.
+    """
+
+    def __init__(self):
+        self.hits = 0
+        self.misses = 0
+
+    def hit(self) -> None:
+        with _lock:
+            self.hits += 1
+
+    def miss(self) -> None:
+        with _lock:
+            self.misses += 1
+
+    def __call__(self) -> CacheStats:
+        return self
+
+
+REQUEST_LATENCY = Histogram(
+    "emhass_request_duration_seconds",
+    "Duration of the action requests in seconds.",
+    ("action",),
+)
+SOLVE_TIME = Histogram(
+    "emhass_solve_duration_seconds",
+    "Solver time of the optimizations in seconds.",
+    ("engine",),
+)
+MODEL_BUILD_TIME = Histogram(
+    "emhass_model_build_duration_seconds",
+    "Build time of the optimization models (variables, objective and constraints) in seconds.",
+)
+_histograms = (REQUEST_LATENCY, SOLVE_TIME, MODEL_BUILD_TIME)
+
+# Action requests running or waiting for the optimization, by action
+_requests_in_progress = {}
+# Hit and miss counts by cache name, see register_cache
+_caches = {}
+# The server started by ensure_http_server, one per process
+_server = None
+
+
+@contextmanager
+def track_request(action: str) -> Iterator[None]:
+    """
+    Count the request as in progress and observe its duration.
+
+    :param action: The action name (dayahead-optim, naive-mpc-optim, ...)
+    :type action: str
+    """
+    with _lock:
+        _requests_in_progress[action] = _requests_in_progress.get(action, 0) + 1
+    try:
+        with REQUEST_LATENCY.time(action):
+            yield
+    finally:
+        with _lock:
+            _requests_in_progress[action] -= 1
+
+
+def observe_timings(timings: dict) -> None:
+    """
+    Observe the solve and model build times of an optimization.
+
+    :param timings: The phase durations in milliseconds, see Optimization.last_timings
+    :type timings: dict
+    """
+    if "greedy" in timings:
+        SOLVE_TIME.observe(timings["greedy"] / 1000, "greedy")
+    if "solve" in timings:
+        SOLVE_TIME.observe(timings["solve"] / 1000, "milp")
+    if "constraints" in timings:
+        build = sum(timings.get(name, 0) for name in ["variables", "objective", "constraints"])
+        MODEL_BUILD_TIME.observe(build / 1000)
+
+
+def register_cache(name: str, cache_info: Callable | None = None) -> CacheStats:
+    """
+    Register a cache for its hit rate metrics.
+
+    :param name: The cache name
+    :type name: str
+    :param cache_info: A callable returning an object with hits and misses \
+        attributes, as the cache_info method of a functools.lru_cache; \
+        a CacheStats counter when not given, kept if the cache is registered again
+    :type cache_info: Callable, optional
+    :return: The registered counter, or the given callable
+    :rtype: CacheStats
+    """
+    if cache_info is None:
+        cache_info = _caches.get(name)
+        if not isinstance(cache_info, CacheStats):
+            cache_info = CacheStats()
+    _caches[name] = cache_info
+    return cache_info
+
+
+def get_rss() -> int:
+    """
+    Get the resident memory of the process in bytes.
+
+    Read from /proc on Linux, elsewhere the peak resident memory is returned.
+
+    :return: The resident memory in bytes
+    :rtype: int
+    """
+    try:
+        with open("/proc/self/statm") as statm:
+            return int(statm.read().split()[1]) * os.sysconf("SC_PAGE_SIZE")
+    except (OSError, ValueError, IndexError):
+        return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss * 1024
+
+
+def record_solve_stats(stats: dict | None) -> None:
+    """
+    Keep the statistics of the last solve for the metrics.
+
+    :param stats: The solve statistics
+    :type stats: dict | None
+    """
+    if stats is None:
+        return
+    with _lock:
+        _last_solve_stats.clear()
+        _last_solve_stats.update(stats)
+
+
+def render_solve_stats(stats: dict) -> str:
+    """
+    Render the statistics of a solve as metric families.
+
+    The model configuration is exposed as labels of ``emhass_solve_info``, to \
+    correlate the solve cost with the loads of the site.
+
+    :param stats: The solve statistics, see Optimization.get_solve_stats
+    :type stats: dict
+    :return: The metrics in the text exposition format
+    :rtype: str
+    """
+    if not stats:
+        return ""
+    labels = {"solver": stats["solver"]}
+    info = {**labels, "status": stats["status"], **stats["config"]}
+    return "".join(
+        [
+            format_metric(
+                "emhass_solve_info",
+                "gauge",
+                "Status and model configuration of the last solve.",
+                [(info, 1)],
+            ),
+            format_metric(
+                "emhass_solve_variables",
+                "gauge",
+                "Number of variables of the last solved model by type.",
+                [
+                    ({**labels, "type": var_type}, count)
+                    for var_type, count in stats["variables"].items()
+                ],
+            ),
+            format_metric(
+                "emhass_solve_constraints",
+                "gauge",
+                "Number of constraint rows of the last solved model.",
+                [(labels, stats["constraints"])],
+            ),
+            format_metric(
+                "emhass_solve_nonzeros",
+                "gauge",
+                "Number of nonzero coefficients of the last solved model.",
+                [(labels, stats["nonzeros"])],
+            ),
+            format_metric(
+                "emhass_solve_constraint_family_rows",
+                "gauge",
+                "Number of constraint rows of the last solved model by family.",
+                [
+                    ({**labels, "family": family}, count)
+                    for family, count in stats["constraint_families"].items()
+                ],
+            ),
+            format_metric(
+                "emhass_solve_seconds",
+                "gauge",
+                "Solver wall time of the last solve in seconds.",
+                [(labels, stats["solve_time"])],
+            ),
+            format_metric(
+                "emhass_solve_nodes",
+                "gauge",
+                "Branch and bound nodes of the last solve.",
+                [(labels, stats["nodes"])],
+            ),
+            format_metric(
+                "emhass_solve_iterations",
+                "gauge",
+                "Simplex iterations of the last solve.",
+                [(labels, stats["iterations"])],
+            ),
+            format_metric(
+                "emhass_solve_gap",
+                "gauge",
+                "Relative optimality gap of the last solve.",
+                [(labels, stats["gap"])],
+            ),
+        ]
+    )
+
+
+def get_metrics() -> str:
+    """
+    Get the body of the metrics endpoint.
+
+    :return: The metrics in the text exposition format
+    :rtype: str
+    """
+    with _lock:
+        stats = dict(_last_solve_stats)
+        in_progress = dict(_requests_in_progress)
+    caches = {name: cache_info() for name, cache_info in _caches.items()}
+    return "".join(
+        [histogram.render() for histogram in _histograms]
+        + [
+            format_metric(
+                "emhass_requests_in_progress",
+                "gauge",
+                "Action requests running or waiting for the optimization.",
+                [({"action": action}, count) for action, count in in_progress.items()],
+            ),
+            format_metric(
+                "emhass_cache_hits_total",
+                "counter",
+                "Cache hits by cache.",
+                [({"cache": name}, info.hits) for name, info in caches.items()],
+            ),
+            format_metric(
+                "emhass_cache_misses_total",
+                "counter",
+                "Cache misses by cache.",
+                [({"cache": name}, info.misses) for name, info in caches.items()],
+            ),
+            format_metric(
+                "process_resident_memory_bytes",
+                "gauge",
+                "Resident memory size in bytes.",
+                [({}, get_rss())],
+            ),
+            render_solve_stats(stats),
+        ]
+    )
+
+
+class _MetricsHandler(BaseHTTPRequestHandler):
+    def do_GET(self):
+        if self.path.split("?")[0] != "/metrics":
+            self.send_error(404)
+            return
+        body = get_metrics().encode()
+        self.send_response(200)
+        self.send_header("Content-Type", CONTENT_TYPE)
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, format, *args):
+        # The scrapes are too frequent to be logged
+        pass
+
+
+def start_http_server(port: int, addr: str = "0.0.0.0") -> ThreadingHTTPServer:
+    """
+    Serve the metrics on ``/metrics`` from a daemon thread.
+
+    :param port: The port, 0 to pick a free port
+    :type port: int
+    :param addr: The address to bind
+    :type addr: str
+    :return: The running server, its port is ``server.server_address[1]``
+    :rtype: ThreadingHTTPServer
+    """
+    server = ThreadingHTTPServer((addr, port), _MetricsHandler)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return server
+
+
+def ensure_http_server(port: int, addr: str = "0.0.0.0") -> ThreadingHTTPServer:
+    """
+    Start the metrics server of the process, once.
+
+    The optimizations run in the process of the EMHASS web server, so the \
+    metrics are served from that process on a port of their own.
+
+    :param port: The port
+    :type port: int
+    :param addr: The address to bind
+    :type addr: str
+    :return: The running server, the first one started when called again
+    :rtype: ThreadingHTTPServer
+    """
+    global _server
+    with _lock:
+        if _server is None:
+            _server = start_http_server(port, addr)
+        return _server
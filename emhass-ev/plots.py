@@ -0,0 +1,340 @@
+"""
+Rendering helpers of the web UI.
+
+Kept apart from utils so that plotly is only imported when a page is rendered.
+"""
+
+from __future__ import annotations
+
+import hashlib
+from typing import TYPE_CHECKING
+
+import numpy as np
+import pandas as pd
+import plotly.express as px
+
+if TYPE_CHECKING:
+    from emhass.machine_learning_forecaster import MLForecaster
+
+pd.options.plotting.backend = "plotly"
+
+
+# Rendered result pages, keyed by a hash of the result frame and the page options
+_render_cache = {}
+RENDER_CACHE_SIZE = 4
+
+
+def get_result_hash(df: pd.DataFrame) -> str:
+    """
+    Get a hash of a result DataFrame, its values, index and column names.
+
+    :param df: The optimization result DataFrame
+    :type df: pd.DataFrame
+    :return: The hexadecimal hash
+    :rtype: str
+    """
+    digest = hashlib.blake2b(digest_size=16)
+    digest.update(pd.util.hash_pandas_object(df, index=True).to_numpy().tobytes())
+    digest.update("\x1f".join(map(str, df.columns)).encode())
+    return digest.hexdigest()
+
+
+def _format_results(df: pd.DataFrame) -> tuple[pd.DataFrame, str]:
+    """Round the results for display, returning them without the optim_status column."""
+    optim_status = df["optim_status"].unique().item()
+    df = df.drop(columns="optim_status").apply(pd.to_numeric)
+    cols_p = [i for i in df.columns.to_list() if "P_" in i]
+    cols_else = [i for i in df.columns.to_list() if "P_" not in i]
+    df[cols_p] = df[cols_p].astype(int)
+    df[cols_else] = df[cols_else].round(3)
+    return df, optim_status
+
+
+def downsample_minmax(df: pd.DataFrame, plot_size: int | None = 1366) -> pd.DataFrame:
+    """
+    Reduce a time series DataFrame to at most two rows per pixel column of the plot.
+
+    The rows are split in plot_size buckets of consecutive timesteps. Each bucket \
+    is replaced by two rows holding the minimum and the maximum of each column over \
+    the bucket, in the order they occur, so the edges keep their direction. The rows \
+    are placed at the first and last positions of these extremes in the bucket (their \
+    own positions when there is one column). The drawn envelope is the same as with \
+    all the points, while the size no longer depends on the horizon.
+
+    :param df: The numeric DataFrame to plot
+    :type df: pd.DataFrame
+    :param plot_size: The number of pixel columns of the plot
+    :type plot_size: int, optional
+    :return: The downsampled DataFrame, the input when it is already small enough
+    :rtype: pd.DataFrame
+    """
+    n = len(df)
+    if plot_size is None or n <= 2 * plot_size:
+        return df
+    starts = np.arange(plot_size) * n // plot_size
+    bucket = np.repeat(np.arange(plot_size), np.diff(np.append(starts, n)))
+    offsets = (np.arange(n) - starts[bucket])[:, None]
+    values = df.to_numpy(dtype=float)
+
+    def get_extreme(reduce):
+        extreme = reduce.reduceat(values, starts, axis=0)
+        # Offset in the bucket of the first occurrence, the bucket start for NaN
+        first = np.minimum.reduceat(
+            np.where(values == extreme[bucket], offsets, n), starts, axis=0
+        )
+        first[first == n] = 0
+        return extreme, starts[:, None] + first
+
+    minimum, argmin = get_extreme(np.minimum)
+    maximum, argmax = get_extreme(np.maximum)
+    min_first = argmin <= argmax
+    rows = np.empty((2 * plot_size, values.shape[1]))
+    rows[0::2] = np.where(min_first, minimum, maximum)
+    rows[1::2] = np.where(min_first, maximum, minimum)
+    positions = np.empty(2 * plot_size, dtype=int)
+    positions[0::2] = np.minimum(argmin, argmax).min(axis=1)
+    positions[1::2] = np.maximum(argmin, argmax).max(axis=1)
+    return pd.DataFrame(rows, index=df.index[positions], columns=df.columns)
+
+
+def get_plot_data(
+    df: pd.DataFrame,
+    columns: list[str] | None = None,
+    start: str | pd.Timestamp | None = None,
+    end: str | pd.Timestamp | None = None,
+    plot_size: int | None = 1366,
+) -> dict:
+    """
+    Get the plot data of a time range, e.g. to redraw a zoomed figure.
+
+    The range is downsampled for the plot size, so a narrow zoom gets the full \
+    resolution and a wide one stays bounded.
+
+    :param df: The optimization result DataFrame
+    :type df: pd.DataFrame
+    :param columns: The columns to plot, defaults to the numeric columns
+    :type columns: list[str], optional
+    :param start: The first timestamp of the range, defaults to the start
+    :type start: str | pd.Timestamp, optional
+    :param end: The last timestamp of the range, defaults to the end
+    :type end: str | pd.Timestamp, optional
+    :param plot_size: The number of pixel columns of the plot
+    :type plot_size: int, optional
+    :return: The ISO timestamps (index) and the values of each column (columns), \
+        json serializable
+    :rtype: dict
+    """
+    if columns is None:
+        columns = df.select_dtypes("number").columns.to_list()
+    df = downsample_minmax(df.loc[start:end, columns], plot_size)
+    return {
+        "index": [date.isoformat() for date in df.index],
+        "columns": {col: df[col].to_numpy(dtype=float).tolist() for col in columns},
+    }
+
+
+def get_results_table_page(
+    df: pd.DataFrame, page: int | None = 0, page_size: int | None = None
+) -> dict:
+    """
+    Render one page of the optimization results table.
+
+    :param df: The optimization result DataFrame
+    :type df: pd.DataFrame
+    :param page: The page number, starting at 0
+    :type page: int, optional
+    :param page_size: The number of rows per page, defaults to all the rows
+    :type page_size: int, optional
+    :return: A dictionary with the table in html format, the page, the number of \
+        pages and the number of rows
+    :rtype: dict
+    """
+    if "optim_status" in df.columns:
+        df, _ = _format_results(df)
+    page_size = page_size or max(len(df), 1)
+    pages = max(-(-len(df) // page_size), 1)
+    page = min(max(page, 0), pages - 1)
+    table = (
+        df.iloc[page * page_size : (page + 1) * page_size]
+        .reset_index()
+        .to_html(classes="mystyle", index=False)
+    )
+    return {"table": table, "page": page, "pages": pages, "rows": len(df)}
+
+
+def get_injection_dict(
+    df: pd.DataFrame,
+    plot_size: int | None = 1366,
+    table_page_size: int | None = None,
+) -> dict:
+    """
+    Build a dictionary with graphs and tables for the webui.
+
+    The pages are cached by result hash, so an unchanged result is not rendered \
+    again. The figures are sent as plotly JSON data, drawn by the browser, with \
+    the plotly.js bundle included only in the first one, and the long series use \
+    WebGL traces. The input DataFrame is not modified.
+
+    :param df: The optimization result DataFrame
+    :type df: pd.DataFrame
+    :param plot_size: Size of the plot figure in pixels, the figures are downsampled \
+        to two points per pixel, defaults to 1366
+    :type plot_size: Optional[int], optional
+    :param table_page_size: Number of rows of the results table, the others being \
+        served by get_results_table_page, defaults to all the rows
+    :type table_page_size: Optional[int], optional
+    :return: A dictionary containing the graphs and tables in html format
+    :rtype: dict
+
+    """
+    key = (get_result_hash(df), plot_size, table_page_size)
+    cached = _render_cache.get(key)
+    if cached is not None:
+        return dict(cached)
+    # Let's round the data in the DF
+    df, optim_status = _format_results(df)
+    cols_p = [i for i in df.columns.to_list() if "P_" in i]
+    # Create plots, from at most two points per pixel column
+    df_plot = downsample_minmax(df, plot_size)
+    n_colors = len(cols_p)
+    colors = px.colors.sample_colorscale(
+        "jet", [n / (n_colors - 1) for n in range(n_colors)]
+    )
+    fig_0 = px.line(
+        df_plot[cols_p],
+        title="Systems powers schedule after optimization results",
+        template="presentation",
+        line_shape="hv",
+        color_discrete_sequence=colors,
+        render_mode="auto",
+    )
+    fig_0.update_layout(xaxis_title="Timestamp", yaxis_title="System powers (W)")
+    if "SOC_opt" in df.columns.to_list():
+        fig_1 = px.line(
+            df_plot["SOC_opt"],
+            title="Battery state of charge schedule after optimization results",
+            template="presentation",
+            line_shape="hv",
+            color_discrete_sequence=colors,
+            render_mode="auto",
+        )
+        fig_1.update_layout(xaxis_title="Timestamp", yaxis_title="Battery SOC (%)")
+    cols_cost = [i for i in df.columns.to_list() if "cost_" in i or "unit_" in i]
+    n_colors = len(cols_cost)
+    colors = px.colors.sample_colorscale(
+        "jet", [n / (n_colors - 1) for n in range(n_colors)]
+    )
+    fig_2 = px.line(
+        df_plot[cols_cost],
+        title="Systems costs obtained from optimization results",
+        template="presentation",
+        line_shape="hv",
+        color_discrete_sequence=colors,
+        render_mode="auto",
+    )
+    fig_2.update_layout(xaxis_title="Timestamp", yaxis_title="System costs (currency)")
+    # The figures are rendered by the browser, plotly.js is only embedded once
+    image_path_0 = fig_0.to_html(
+        full_html=False, default_width="75%", include_plotlyjs=True
+    )
+    if "SOC_opt" in df.columns.to_list():
+        image_path_1 = fig_1.to_html(
+            full_html=False, default_width="75%", include_plotlyjs=False
+        )
+    image_path_2 = fig_2.to_html(
+        full_html=False, default_width="75%", include_plotlyjs=False
+    )
+    # The tables
+    table1 = get_results_table_page(df, 0, table_page_size)
+    cost_cols = [i for i in df.columns if "cost_" in i]
+    table2 = df[cost_cols].reset_index().sum(numeric_only=True)
+    table2["optim_status"] = optim_status
+    table2 = (
+        table2.to_frame(name="Value")
+        .reset_index(names="Variable")
+        .to_html(classes="mystyle", index=False)
+    )
+    # The dict of plots
+    injection_dict = {}
+    injection_dict["title"] = "<h2>EMHASS optimization results</h2>"
+    injection_dict["subsubtitle0"] = "<h4>Plotting latest optimization results</h4>"
+    injection_dict["figure_0"] = image_path_0
+    if "SOC_opt" in df.columns.to_list():
+        injection_dict["figure_1"] = image_path_1
+    injection_dict["figure_2"] = image_path_2
+    injection_dict["subsubtitle1"] = "<h4>Last run optimization results table</h4>"
+    injection_dict["table1"] = table1["table"]
+    if table1["pages"] > 1:
+        injection_dict["table1_pages"] = table1["pages"]
+    injection_dict["subsubtitle2"] = (
+        "<h4>Summary table for latest optimization results</h4>"
+    )
+    injection_dict["table2"] = table2
+    if len(_render_cache) >= RENDER_CACHE_SIZE:
+        _render_cache.pop(next(iter(_render_cache)))
+    _render_cache[key] = injection_dict
+    return dict(injection_dict)
+
+
+def get_injection_dict_forecast_model_fit(
+    df_fit_pred: pd.DataFrame, mlf: MLForecaster
+) -> dict:
+    """
+    Build a dictionary with graphs and tables for the webui for special MLF fit case.
+
+    :param df_fit_pred: The fit result DataFrame
+    :type df_fit_pred: pd.DataFrame
+    :param mlf: The MLForecaster object
+    :type mlf: MLForecaster
+    :return: A dictionary containing the graphs and tables in html format
+    :rtype: dict
+    """
+    fig = df_fit_pred.plot()
+    fig.layout.template = "presentation"
+    fig.update_yaxes(title_text=mlf.model_type)
+    fig.update_xaxes(title_text="Time")
+    image_path_0 = fig.to_html(full_html=False, default_width="75%")
+    # The dict of plots
+    injection_dict = {}
+    injection_dict["title"] = "<h2>Custom machine learning forecast model fit</h2>"
+    injection_dict["subsubtitle0"] = (
+        "<h4>Plotting train/test forecast model results for " + mlf.model_type + "</h4>"
+    )
+    injection_dict["subsubtitle0"] = (
+        "<h4>Forecasting variable " + mlf.var_model + "</h4>"
+    )
+    injection_dict["figure_0"] = image_path_0
+    return injection_dict
+
+
+def get_injection_dict_forecast_model_tune(
+    df_pred_optim: pd.DataFrame, mlf: MLForecaster
+) -> dict:
+    """
+    Build a dictionary with graphs and tables for the webui for special MLF tune case.
+
+    :param df_pred_optim: The tune result DataFrame
+    :type df_pred_optim: pd.DataFrame
+    :param mlf: The MLForecaster object
+    :type mlf: MLForecaster
+    :return: A dictionary containing the graphs and tables in html format
+    :rtype: dict
+    """
+    fig = df_pred_optim.plot()
+    fig.layout.template = "presentation"
+    fig.update_yaxes(title_text=mlf.model_type)
+    fig.update_xaxes(title_text="Time")
+    image_path_0 = fig.to_html(full_html=False, default_width="75%")
+    # The dict of plots
+    injection_dict = {}
+    injection_dict["title"] = "<h2>Custom machine learning forecast model tune</h2>"
+    injection_dict["subsubtitle0"] = (
+        "<h4>Performed a tuning routine using bayesian optimization for "
+        + mlf.model_type
+        + "</h4>"
+    )
+    injection_dict["subsubtitle0"] = (
+        "<h4>Forecasting variable " + mlf.var_model + "</h4>"
+    )
+    injection_dict["figure_0"] = image_path_0
+    return injection_dict
@@ -0,0 +1,137 @@
+"""
+Opt-in profiling of single actions.
+
+``profile_action`` runs an action under ``cProfile`` and writes the profile to \
+``data_path/profiles``, named by timestamp and action, along with the MPS file of \
+the optimization model when one is solved. Only the most recent profiles are kept.
+"""
+
+from __future__ import annotations
+
+import contextvars
+import cProfile
+import datetime
+import logging
+import pathlib
+import re
+from collections.abc import Iterator
+from contextlib import contextmanager
+from dataclasses import dataclass
+
+PROFILE_DIR = "profiles"
+# Number of profiles kept in PROFILE_DIR, the oldest are removed first
+PROFILE_MAX_COUNT = 10
+
+# The profile of the running action, read by the optimization to dump its model
+_current_profile = contextvars.ContextVar("current_profile", default=None)
+
+
+@dataclass
+class ProfileRun:
+    """
+    Output paths of a profiled action.
+    """
+
+    action: str
+    stats_path: pathlib.Path | None
+    mps_path: pathlib.Path | None = None
+
+
+def get_current_profile() -> ProfileRun | None:
+    """
+    Get the profile of the running action.
+
+    :return: The running profile, None when the action is not profiled
+    :rtype: ProfileRun | None
+    """
+    return _current_profile.get()
+
+
+def prune_profiles(profile_dir: pathlib.Path, max_count: int) -> list[pathlib.Path]:
+    """
+    Remove the oldest profiles, keeping the ``max_count`` most recent ones.
+
+    :param profile_dir: The profiles folder
+    :type profile_dir: pathlib.Path
+    :param max_count: The number of profiles to keep
+    :type max_count: int
+    :return: The removed files
+    :rtype: list
+    """
+    # The names start with the timestamp, so they sort by age
+    runs = sorted(
+        {path.stem for path in profile_dir.iterdir() if path.suffix in [".prof", ".mps"]}
+    )
+    removed = []
+    for stem in runs[: max(len(runs) - max_count, 0)]:
+        for path in profile_dir.glob(f"{stem}.*"):
+            path.unlink(missing_ok=True)
+            removed.append(path)
+    return removed
+
+
+@contextmanager
+def profile_action(
+    action: str,
+    data_path: str | pathlib.Path,
+    logger: logging.Logger,
+    enabled: bool = True,
+    max_count: int = PROFILE_MAX_COUNT,
+    dump_mps: bool = True,
+) -> Iterator[ProfileRun | None]:
+    """
+    Profile the action run inside the ``with`` block.
+
+    The profile is written to ``data_path/profiles/<timestamp>_<action>.prof`` \
+    (read it with ``pstats`` or snakeviz), and the optimization model to the same \
+    name with the ``.mps`` extension.
+
+    :param action: The action name (dayahead-optim, naive-mpc-optim, ...)
+    :type action: str
+    :param data_path: The data folder
+    :type data_path: str | pathlib.Path
+    :param logger: The logger object
+    :type logger: logging.Logger
+    :param enabled: Profile the action, else only run it
+    :type enabled: bool
+    :param max_count: The number of profiles to keep
+    :type max_count: int
+    :param dump_mps: Dump the optimization model in MPS format
+    :type dump_mps: bool
+    :return: The profile paths, None when not enabled
+    :rtype: ProfileRun | None
+    """
+    if not enabled:
+        yield None
+        return
+    profile_dir = pathlib.Path(data_path) / PROFILE_DIR
+    profile_dir.mkdir(parents=True, exist_ok=True)
+    timestamp = datetime.datetime.now().strftime("%Y%m%d-%H%M%S-%f")
+    stem = f"{timestamp}_{re.sub(r'[^A-Za-z0-9-]+', '_', action)}"
+    run = ProfileRun(
+        action=action,
+        stats_path=profile_dir / f"{stem}.prof",
+        mps_path=profile_dir / f"{stem}.mps" if dump_mps else None,
+    )
+    token = _current_profile.set(run)
+    profiler = cProfile.Profile()
+    try:
+        profiler.enable()
+    except ValueError as e:
+        # Another profiler is already running in this thread
+        logger.warning(f"Unable to profile {action}: {e}")
+        profiler = None
+    try:
+        yield run
+    finally:
+        _current_profile.reset(token)
+        if profiler is not None:
+            profiler.disable()
+            profiler.dump_stats(run.stats_path)
+            logger.info(f"Profile of {action} written to {run.stats_path}")
+        else:
+            run.stats_path = None
+        if run.mps_path is not None and not run.mps_path.exists():
+            # No optimization model was built by the action
+            run.mps_path = None
+        prune_profiles(profile_dir, max_count)
@@ -0,0 +1,373 @@
+"""
+DST-safe helpers for the time indexes built by utils.get_forecast_dates and \
+utils.set_df_index_freq.
+
+The grids are built in UTC, where every time step exists exactly once, and only \
+converted to the local time zone at the end. Naive local timestamps are localized \
+with the ambiguous fall-back hour resolved from the order of the timestamps and \
+the nonexistent spring-forward hour shifted forward.
+"""
+
+from __future__ import annotations
+
+import datetime
+from collections.abc import Iterable, Iterator
+
+import numpy as np
+import pandas as pd
+import pytz
+
+# Errors raised by tz_localize for the DST transitions, depending on the pandas version
+_DST_ERRORS = (
+    ValueError,
+    pytz.exceptions.AmbiguousTimeError,
+    pytz.exceptions.NonExistentTimeError,
+)
+
+
+def now_floor(freq: pd.Timedelta, time_zone: datetime.tzinfo) -> pd.Timestamp:
+    """
+    Get the current local time, floored to the optimization time step.
+
+    During the fall-back hour the floored time keeps the UTC offset of the current time.
+
+    :param freq: The time step
+    :type freq: pd.Timedelta
+    :param time_zone: The time zone
+    :type time_zone: datetime.tzinfo
+    :return: The current time step start
+    :rtype: pd.Timestamp
+    """
+    now = pd.Timestamp.now(tz=time_zone)
+    return now.floor(freq, ambiguous=bool(now.dst()), nonexistent="shift_forward")
+
+
+def make_time_grid(
+    start: pd.Timestamp,
+    freq: pd.Timedelta,
+    time_zone: datetime.tzinfo,
+    end: pd.Timestamp | None = None,
+    periods: int | None = None,
+) -> pd.DatetimeIndex:
+    """
+    Build a regular tz-aware time grid.
+
+    The dates are generated and rounded to the time step in UTC, then converted \
+    to the local time zone, so the grid keeps a constant step across the DST changes.
+
+    :param start: The first date, naive dates are local times
+    :type start: pd.Timestamp
+    :param freq: The time step
+    :type freq: pd.Timedelta
+    :param time_zone: The time zone
+    :type time_zone: datetime.tzinfo
+    :param end: The last date (included), naive dates are local times
+    :type end: pd.Timestamp, optional
+    :param periods: The number of dates, used when end is not given
+    :type periods: int, optional
+    :return: The time grid
+    :rtype: pd.DatetimeIndex
+    """
+    start, end = (
+        None if date is None else _localize_timestamp(date, time_zone).tz_convert("UTC")
+        for date in (start, end)
+    )
+    return (
+        pd.date_range(start=start, end=end, periods=periods, freq=freq)
+        .round(freq)
+        .tz_convert(time_zone)
+    )
+
+
+def _localize_timestamp(date, time_zone: datetime.tzinfo) -> pd.Timestamp:
+    date = pd.Timestamp(date)
+    if date.tz is not None:
+        return date.tz_convert(time_zone)
+    return localize_index(pd.DatetimeIndex([date]), time_zone)[0]
+
+
+def localize_index(
+    index: pd.DatetimeIndex, time_zone: datetime.tzinfo
+) -> pd.DatetimeIndex:
+    """
+    Localize a naive local time index, or convert an aware one, to the time zone.
+
+    The ambiguous times of the fall-back hour are inferred from the order of the \
+    timestamps. When this is not possible (irregular index, a single occurrence), \
+    the first occurrence of a repeated time is taken as summer time and the second \
+    as winter time. The nonexistent times of the spring-forward hour are shifted forward.
+
+    :param index: The index to localize
+    :type index: pd.DatetimeIndex
+    :param time_zone: The time zone
+    :type time_zone: datetime.tzinfo
+    :return: The tz-aware index
+    :rtype: pd.DatetimeIndex
+    """
+    index = pd.DatetimeIndex(index)
+    if index.tz is not None:
+        return index.tz_convert(time_zone)
+    try:
+        return index.tz_localize(
+            time_zone, ambiguous="infer", nonexistent="shift_forward"
+        )
+    except _DST_ERRORS:
+        is_dst = ~index.duplicated(keep="first")
+        return index.tz_localize(
+            time_zone, ambiguous=is_dst, nonexistent="shift_forward"
+        )
+
+
+def clean_index(index: pd.DatetimeIndex) -> pd.DatetimeIndex:
+    """
+    Remove the NaT and the duplicated dates of an index, and sort it.
+
+    :param index: The index to clean
+    :type index: pd.DatetimeIndex
+    :return: The cleaned index, the same object when nothing was removed
+    :rtype: pd.DatetimeIndex
+    """
+    keep = _valid_positions(index)
+    if keep is not None:
+        index = index[keep]
+    if not index.is_monotonic_increasing:
+        index = index.sort_values()
+    return index
+
+
+def clean_df_index(df: pd.DataFrame) -> pd.DataFrame:
+    """
+    Remove the rows with a NaT or a duplicated date, keeping the first one, and sort them.
+
+    :param df: The DataFrame to clean
+    :type df: pd.DataFrame
+    :return: The cleaned DataFrame, the same object when nothing was changed
+    :rtype: pd.DataFrame
+    """
+    keep = _valid_positions(df.index)
+    if keep is not None:
+        df = df[keep]
+    if not df.index.is_monotonic_increasing:
+        df = df.sort_index()
+    return df
+
+
+def _valid_positions(index: pd.DatetimeIndex) -> np.ndarray | None:
+    """Mask of the dates that are neither NaT nor duplicates, None if all are valid."""
+    if index.is_unique and not index.hasnans:
+        return None
+    return ~(index.isna() | index.duplicated(keep="first"))
+
+
+def reindex(
+    df: pd.DataFrame | pd.Series,
+    target_index: pd.DatetimeIndex,
+    time_zone: datetime.tzinfo | None = None,
+    method: str | None = None,
+) -> pd.DataFrame | pd.Series:
+    """
+    Reindex data on a target index, tolerating the DST artefacts of both indexes.
+
+    The NaT and duplicated dates are removed from both indexes and a naive data \
+    index is localized to the time zone of the target before reindexing.
+
+    :param df: The data to reindex
+    :type df: pd.DataFrame | pd.Series
+    :param target_index: The target index
+    :type target_index: pd.DatetimeIndex
+    :param time_zone: The time zone of a naive data index, defaults to the target time zone
+    :type time_zone: datetime.tzinfo, optional
+    :param method: The fill method passed to reindex
+    :type method: str, optional
+    :return: The reindexed data
+    :rtype: pd.DataFrame | pd.Series
+    """
+    target_index = clean_index(pd.DatetimeIndex(target_index))
+    if target_index.tz is not None:
+        df = df.set_axis(
+            localize_index(df.index, time_zone or target_index.tz).tz_convert(
+                target_index.tz
+            )
+        )
+    return clean_df_index(df).reindex(target_index, method=method)
+
+
+# Number of index steps sampled to detect the sampling period
+SAMPLING_SAMPLE_SIZE = 1000
+_NAT = np.iinfo(np.int64).min
+
+
+def detect_sampling_period(
+    index: pd.DatetimeIndex, sample_size: int | None = SAMPLING_SAMPLE_SIZE
+) -> pd.Timedelta | None:
+    """
+    Detect the sampling period of an index from a bounded sample.
+
+    The median of the positive steps is taken over three windows, at the start, \
+    the middle and the end of the index, so the cost does not grow with the history.
+
+    :param index: The index
+    :type index: pd.DatetimeIndex
+    :param sample_size: The number of steps sampled
+    :type sample_size: int, optional
+    :return: The sampling period, None if the index has less than two distinct dates
+    :rtype: pd.Timedelta | None
+    """
+    step = _detect_step(index.asi8, sample_size)
+    return None if step is None else pd.Timedelta(step, unit=index.unit)
+
+
+def _detect_step(values: np.ndarray, sample_size: int) -> int | None:
+    window = sample_size // 3 + 1
+    if len(values) <= 3 * window:
+        windows = [values]
+    else:
+        middle = (len(values) - window) // 2
+        windows = [values[:window], values[middle : middle + window], values[-window:]]
+    steps = np.concatenate([np.diff(w[w != _NAT]) for w in windows])
+    steps = steps[steps > 0]
+    if len(steps) == 0:
+        return None
+    return int(np.median(steps))
+
+
+def new_index_stats() -> dict:
+    """
+    Get empty regularization statistics, see regularize_index.
+
+    :return: The statistics
+    :rtype: dict
+    """
+    return {
+        "rows": 0,
+        "nat": 0,
+        "duplicates": 0,
+        "off_grid": 0,
+        "gaps": 0,
+        "missing_steps": 0,
+        "sampling": None,
+    }
+
+
+def regularize_index(
+    df: pd.DataFrame,
+    freq: pd.Timedelta | None = None,
+    sample_size: int | None = SAMPLING_SAMPLE_SIZE,
+) -> tuple[pd.DataFrame, dict]:
+    """
+    Put a DataFrame on a regular time grid starting at its first date.
+
+    The NaT, the duplicated dates (the first one is kept) and the dates off the \
+    grid are dropped, and the missing steps are added as NaN rows. The index is \
+    scanned once with boolean masks, without intermediate copies of the data.
+
+    :param df: The DataFrame, with a DateTimeIndex
+    :type df: pd.DataFrame
+    :param freq: The grid step, detected from a sample of the index by default
+    :type freq: pd.Timedelta, optional
+    :param sample_size: The number of steps sampled to detect the grid step
+    :type sample_size: int, optional
+    :return: The regularized DataFrame and the statistics: the input rows, the \
+        dropped nat, duplicates and off_grid rows, the number of gaps and of \
+        missing_steps, and the sampling period
+    :rtype: tuple[pd.DataFrame, dict]
+    """
+    stats = new_index_stats()
+    return _regularize_chunk(df, {}, stats, freq, sample_size), stats
+
+
+def regularize_chunks(
+    chunks: Iterable[pd.DataFrame],
+    freq: pd.Timedelta | None = None,
+    stats: dict | None = None,
+    sample_size: int | None = SAMPLING_SAMPLE_SIZE,
+) -> Iterator[pd.DataFrame]:
+    """
+    Put a history read in chunks on a regular time grid, one chunk at a time.
+
+    The chunks must be in chronological order, e.g. from \
+    pd.read_csv(..., index_col=0, parse_dates=True, chunksize=...). The grid \
+    starts at the first date of the history, the dates already seen in a \
+    previous chunk are counted as duplicates and the gaps between two chunks \
+    are filled at the start of the second one.
+
+    :param chunks: The chunks, with a DateTimeIndex
+    :type chunks: Iterable[pd.DataFrame]
+    :param freq: The grid step, detected from the first chunk by default
+    :type freq: pd.Timedelta, optional
+    :param stats: Statistics updated with each chunk, see regularize_index
+    :type stats: dict, optional
+    :param sample_size: The number of steps sampled to detect the grid step
+    :type sample_size: int, optional
+    :return: The regularized chunks
+    :rtype: Iterator[pd.DataFrame]
+    """
+    stats = stats if stats is not None else new_index_stats()
+    state = {}
+    for chunk in chunks:
+        chunk = _regularize_chunk(chunk, state, stats, freq, sample_size)
+        if len(chunk) > 0:
+            yield chunk
+
+
+def _regularize_chunk(
+    df: pd.DataFrame,
+    state: dict,
+    stats: dict,
+    freq: pd.Timedelta | None,
+    sample_size: int,
+) -> pd.DataFrame:
+    """Regularize one chunk, state holds the grid start, step and position between chunks."""
+    index = df.index
+    values = index.asi8
+    order = None
+    if not index.is_monotonic_increasing:
+        order = np.argsort(values, kind="stable")
+        values = values[order]
+    stats["rows"] += len(values)
+    # Single pass over the sorted dates: NaT, then duplicates, then off-grid dates
+    keep = values != _NAT
+    valid = np.count_nonzero(keep)
+    stats["nat"] += len(values) - valid
+    keep[1:] &= values[1:] != values[:-1]
+    if "last" in state:
+        keep &= values > state["last"]
+    kept = np.count_nonzero(keep)
+    stats["duplicates"] += valid - kept
+    if kept == 0:
+        return df.iloc[:0]
+    if "step" not in state:
+        if freq is not None:
+            step = pd.Timedelta(freq) // pd.Timedelta(1, unit=index.unit)
+        else:
+            step = _detect_step(values, sample_size) or pd.Timedelta(
+                1, unit="s"
+            ) // pd.Timedelta(1, unit=index.unit)
+        stats["sampling"] = pd.Timedelta(step, unit=index.unit)
+        state["step"] = step
+        state["start"] = values[np.argmax(keep)]
+        state["next"] = 0
+    state["last"] = values[len(keep) - 1 - np.argmax(keep[::-1])]
+    offsets = values - state["start"]
+    keep &= offsets % state["step"] == 0
+    stats["off_grid"] += kept - np.count_nonzero(keep)
+    positions = offsets[keep] // state["step"]
+    if len(positions) == 0:
+        return df.iloc[:0]
+    rows = np.flatnonzero(keep) if order is None else order[keep]
+    first = state["next"]
+    size = positions[-1] - first + 1
+    state["next"] = positions[-1] + 1
+    stats["missing_steps"] += size - len(positions)
+    stats["gaps"] += np.count_nonzero(np.diff(positions, prepend=first - 1) > 1)
+    step = pd.Timedelta(state["step"], unit=index.unit)
+    grid = pd.date_range(
+        start=index[rows[0]] - (positions[0] - first) * step, periods=size, freq=step
+    )
+    df = df.iloc[rows]
+    if size == len(rows):
+        return df.set_axis(grid)
+    # Reindexing on row numbers is arithmetic, a reindex on the dates would hash them
+    indexer = np.full(size, -1)
+    indexer[positions - first] = np.arange(len(rows))
+    return df.set_axis(pd.RangeIndex(len(rows))).reindex(indexer).set_axis(grid)
@@ -0,0 +1,102 @@
+"""
+Lightweight timing spans for the optimization and the configuration pipeline.
+
+The durations are measured with ``time.perf_counter`` and kept in milliseconds, \
+in the order the phases ran, so they can be attached to the results and logged \
+as one structured line.
+"""
+
+from __future__ import annotations
+
+import json
+import logging
+import time
+from collections.abc import Iterator
+from contextlib import contextmanager
+
+
+class Timings:
+    r"""
+    Collect the durations of the phases of a run.
+
+    Use ``span`` as a context manager around a phase, or ``mark`` to close the \
+    phase running since the previous mark (or the creation) when wrapping the \
+    code in a ``with`` block is not practical. A phase measured several times \
+    accumulates its durations.
+
+    :param memory: A memory report closing its phases along with the timings
+    :type memory: MemoryReport, optional
+    """
+
+    def __init__(self, memory=None):
+        self.memory = memory
+        self._spans: dict[str, float] = {}
+        self._start = time.perf_counter()
+        self._last = self._start
+
+    @contextmanager
+    def span(self, name: str) -> Iterator[None]:
+        """
+        Time the code run inside the ``with`` block.
+
+        :param name: The phase name
+        :type name: str
+        """
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            end = time.perf_counter()
+            self._add(name, end - start)
+            self._last = end
+
+    def mark(self, name: str) -> float:
+        """
+        Close the phase running since the previous mark.
+
+        :param name: The phase name
+        :type name: str
+        :return: The duration of the phase in seconds
+        :rtype: float
+        """
+        now = time.perf_counter()
+        duration = now - self._last
+        self._add(name, duration)
+        self._last = now
+        return duration
+
+    def _add(self, name: str, duration: float) -> None:
+        self._spans[name] = self._spans.get(name, 0.0) + duration
+        if self.memory is not None:
+            self.memory.phase(name)
+
+    @property
+    def total(self) -> float:
+        """The time elapsed since the creation, in seconds."""
+        return time.perf_counter() - self._start
+
+    def as_dict(self) -> dict[str, float]:
+        """
+        Get the phase durations and the total, in milliseconds.
+
+        :return: The durations by phase name, plus a ``total`` entry
+        :rtype: dict
+        """
+        timings = {name: round(value * 1000, 3) for name, value in self._spans.items()}
+        timings["total"] = round(self.total * 1000, 3)
+        return timings
+
+    def log(self, logger: logging.Logger, label: str) -> dict[str, float]:
+        """
+        Log the durations at INFO as a single structured line.
+
+        :param logger: The logger
+        :type logger: logging.Logger
+        :param label: The name of the timed run
+        :type label: str
+        :return: The logged durations, in milliseconds
+        :rtype: dict
+        """
+        timings = self.as_dict()
+        logger.info("timings %s %s", label, json.dumps(timings))
+        return timings
@@ -1,26 +1,31 @@
 from __future__ import annotations
 
 import ast
+import base64
 import copy
 import csv
+import functools
+import hashlib
+import importlib
 import json
 import logging
 import os
 import pathlib
+import pickle
+import threading
+import time
+from dataclasses import dataclass, field
 from datetime import UTC, datetime, timedelta
-from typing import TYPE_CHECKING
+from logging.handlers import QueueHandler
+from types import MappingProxyType
 
 import numpy as np
 import pandas as pd
-import plotly.express as px
 import pytz
+import requests
 import yaml
-from requests import get
 
-if TYPE_CHECKING:
-    from emhass.machine_learning_forecaster import MLForecaster
-
-pd.options.plotting.backend = "plotly"
+from emhass import logging_utils, metrics, time_index, timing
 
 
 def get_root(file: str, num_parent: int | None = 3) -> str:
@@ -45,21 +50,36 @@ def get_root(file: str, num_parent: int | None = 3) -> str:
     return root
 
 
+LOGGING_LEVELS = {
+    "DEBUG": logging.DEBUG,
+    "INFO": logging.INFO,
+    "WARNING": logging.WARNING,
+    "ERROR": logging.ERROR,
+}
+
+
 def get_logger(
     fun_name: str,
     emhass_conf: dict,
     save_to_file: bool | None = True,
-    logging_level: str | None = "DEBUG",
-) -> tuple[logging.Logger, logging.StreamHandler]:
+    logging_level: str | None = "INFO",
+) -> tuple[logging.Logger, logging.Handler]:
     """
     Create a simple logger object.
 
+    The handler is only attached on the first call for a logger, the next calls \
+    reuse it with the new level. The log file is written by a background thread \
+    from a queue, so logging never waits on the disk.
+
     :param fun_name: The Python function object name where the logger will be used
     :type fun_name: str
     :param emhass_conf: Dictionary containing the needed emhass paths
     :type emhass_conf: dict
     :param save_to_file: Write log to a file, defaults to True
     :type save_to_file: bool, optional
+    :param logging_level: The logging level (DEBUG, INFO, WARNING or ERROR), \
+        defaults to INFO, DEBUG for an unknown level
+    :type logging_level: str, optional
     :return: The logger object and the handler
     :rtype: object
 
@@ -68,33 +88,38 @@ def get_logger(
     logger = logging.getLogger(fun_name)
     logger.propagate = True
     logger.fileSetting = save_to_file
+    formatter = logging.Formatter(
+        "%(asctime)s - %(name)s - %(levelname)s - %(message)s"
+    )
     if save_to_file:
         if os.path.isdir(emhass_conf["data_path"]):
-            ch = logging.FileHandler(emhass_conf["data_path"] / "logger_emhass.log")
+            records = logging_utils.get_log_queue(
+                pathlib.Path(emhass_conf["data_path"]) / "logger_emhass.log", formatter
+            )
         else:
-            raise Exception("Unable to access data_path: " + emhass_conf["data_path"])
+            raise Exception(f"Unable to access data_path: {emhass_conf['data_path']}")
+        target = records
     else:
-        ch = logging.StreamHandler()
-    if logging_level == "DEBUG":
-        logger.setLevel(logging.DEBUG)
-        ch.setLevel(logging.DEBUG)
-    elif logging_level == "INFO":
-        logger.setLevel(logging.INFO)
-        ch.setLevel(logging.INFO)
-    elif logging_level == "WARNING":
-        logger.setLevel(logging.WARNING)
-        ch.setLevel(logging.WARNING)
-    elif logging_level == "ERROR":
-        logger.setLevel(logging.ERROR)
-        ch.setLevel(logging.ERROR)
-    else:
-        logger.setLevel(logging.DEBUG)
-        ch.setLevel(logging.DEBUG)
-    formatter = logging.Formatter(
-        "%(asctime)s - %(name)s - %(levelname)s - %(message)s"
-    )
-    ch.setFormatter(formatter)
-    logger.addHandler(ch)
+        target = "stream"
+    # Reuse the handler of a previous call with the same target
+    ch = None
+    for handler in list(logger.handlers):
+        handler_target = getattr(handler, "emhass_target", None)
+        if handler_target is target:
+            ch = handler
+        elif handler_target is not None:
+            logger.removeHandler(handler)
+    if ch is None:
+        if save_to_file:
+            ch = QueueHandler(records)
+        else:
+            ch = logging.StreamHandler()
+            ch.setFormatter(formatter)
+        ch.emhass_target = target
+        logger.addHandler(ch)
+    level = LOGGING_LEVELS.get(logging_level, logging.DEBUG)
+    logger.setLevel(level)
+    ch.setLevel(level)
 
     return logger, ch
 
@@ -118,48 +143,402 @@ def get_forecast_dates(
     :rtype: pd.core.indexes.datetimes.DatetimeIndex
 
     """
-    freq = pd.to_timedelta(freq, "minutes")
-    start_forecast = (
-        pd.Timestamp(datetime.now(), tz=time_zone)
-        .replace(microsecond=0)
-        .floor(freq=freq)
+    return get_forecast_grid(freq, delta_forecast, time_zone, timedelta_days)[
+        "forecast_dates"
+    ]
+
+
+def get_forecast_grid(
+    freq: int,
+    delta_forecast: int,
+    time_zone: datetime.tzinfo,
+    timedelta_days: int | None = 0,
+    prediction_horizon: int | None = None,
+) -> MappingProxyType:
+    """
+    Get the forecast time grid starting at the current time step.
+
+    The grids are cached by start time step, so the dates are only built once \
+    per optimization time step. The returned values are shared and read-only.
+
+    :param freq: Optimization time step.
+    :type freq: int
+    :param delta_forecast: Number of days to forecast in the future to be used for the optimization.
+    :type delta_forecast: int
+    :param time_zone: The time zone
+    :type time_zone: datetime.tzinfo
+    :param timedelta_days: Number of truncated days needed for each optimization iteration, defaults to 0
+    :type timedelta_days: Optional[int], optional
+    :param prediction_horizon: Number of time steps to keep, defaults to all
+    :type prediction_horizon: Optional[int], optional
+    :return: A read-only mapping with the forecast_dates, their step positions \
+        (steps), the UTC offsets in minutes (utc_offsets) and the positions where \
+        the UTC offset changes (dst_transitions)
+    :rtype: MappingProxyType
+
+    """
+    start_forecast = time_index.now_floor(pd.to_timedelta(freq, "minutes"), time_zone)
+    return _build_forecast_grid(
+        start_forecast, freq, delta_forecast, time_zone, timedelta_days, prediction_horizon
     )
+
+
+@functools.lru_cache(maxsize=32)
+def _build_forecast_grid(
+    start_forecast: pd.Timestamp,
+    freq: int,
+    delta_forecast: int,
+    time_zone: datetime.tzinfo,
+    timedelta_days: int,
+    prediction_horizon: int | None,
+) -> MappingProxyType:
+    """
+    Build the forecast time grid, see get_forecast_grid.
+
+    """
+    freq = pd.to_timedelta(freq, "minutes")
     end_forecast = start_forecast + pd.Timedelta(days=delta_forecast)
-    forecast_dates = (
-        pd.date_range(
-            start=start_forecast,
-            end=end_forecast + timedelta(days=timedelta_days) - freq,
-            freq=freq,
-            tz=time_zone,
-        )
-        .tz_convert("utc")
-        .round(freq, ambiguous="infer", nonexistent="shift_forward")
-        .tz_convert(time_zone)
+    forecast_dates = time_index.make_time_grid(
+        start_forecast,
+        freq,
+        time_zone,
+        end=end_forecast + timedelta(days=timedelta_days) - freq,
+    )[0:prediction_horizon]
+    steps = np.arange(len(forecast_dates))
+    utc_offsets = (
+        forecast_dates.tz_localize(None) - forecast_dates.tz_convert("utc").tz_localize(None)
+    ).total_seconds().to_numpy() // 60
+    dst_transitions = np.flatnonzero(np.diff(utc_offsets)) + 1
+    for array in (steps, utc_offsets, dst_transitions):
+        array.flags.writeable = False
+    # The cached grid is shared by all the callers, so it is returned read-only
+    return MappingProxyType(
+        {
+            "forecast_dates": forecast_dates,
+            "steps": steps,
+            "utc_offsets": utc_offsets,
+            "dst_transitions": dst_transitions,
+        }
     )
-    return forecast_dates
+
+
+metrics.register_cache("time_grid", _build_forecast_grid.cache_info)
+
+
+def json_default(obj) -> object:
+    """
+    Serialize the values json does not support, used as json.dumps default.
+
+    The NumPy arrays (e.g. the passed forecasts) are serialized as lists, any \
+    other value as its string representation.
+
+    :param obj: The value to serialize
+    :type obj: object
+    :return: A json serializable value
+    :rtype: object
+    """
+    if isinstance(obj, np.ndarray):
+        return obj.tolist()
+    if isinstance(obj, np.generic):
+        return obj.item()
+    return str(obj)
+
+
+@dataclass(slots=True)
+class Params:
+    """
+    In-memory container of the built params.
+
+    It can be passed instead of the serialized params to update_params_with_ha_config, \
+    treat_runtimeparams and get_yaml_parse, avoiding a json round trip at each stage. \
+    These functions work on a copy, where only the category dictionaries are copied, \
+    so the runtime parameters never modify the params kept by the server. \
+    Serialize with to_json only when the params leave the process.
+    """
+
+    retrieve_hass_conf: dict = field(default_factory=dict)
+    optim_conf: dict = field(default_factory=dict)
+    plant_conf: dict = field(default_factory=dict)
+    params_secrets: dict = field(default_factory=dict)
+    passed_data: dict = field(default_factory=dict)
+    # Any other top level entry
+    extra: dict = field(default_factory=dict)
+
+    _categories = (
+        "retrieve_hass_conf",
+        "optim_conf",
+        "plant_conf",
+        "params_secrets",
+        "passed_data",
+    )
+
+    @classmethod
+    def from_dict(cls, params: dict) -> Params:
+        """
+        Build the container from a params dictionary (the category dictionaries are not copied).
+
+        :param params: The params dictionary
+        :type params: dict
+        :return: The params container
+        :rtype: Params
+        """
+        return cls(
+            **{key: params[key] for key in cls._categories if key in params},
+            extra={
+                key: value for key, value in params.items() if key not in cls._categories
+            },
+        )
+
+    @classmethod
+    def from_json(cls, params: str) -> Params:
+        """
+        Build the container from serialized params.
+
+        :param params: The serialized params
+        :type params: str
+        :return: The params container
+        :rtype: Params
+        """
+        return cls.from_dict(json.loads(params))
+
+    def to_dict(self) -> dict:
+        """
+        Get the params as a dictionary.
+
+        :return: The params dictionary
+        :rtype: dict
+        """
+        params = {key: getattr(self, key) for key in self._categories}
+        params.update(self.extra)
+        return params
+
+    def to_json(self) -> str:
+        """
+        Serialize the params, as returned by the functions working on serialized params.
+
+        :return: The serialized params
+        :rtype: str
+        """
+        return json.dumps(self.to_dict(), default=json_default)
+
+    def copy(self) -> Params:
+        """
+        Copy the params, copying the category dictionaries but not their values.
+
+        :return: The copied params container
+        :rtype: Params
+        """
+        return Params(
+            **{key: dict(getattr(self, key)) for key in self._categories},
+            extra=dict(self.extra),
+        )
+
+    def __getitem__(self, key: str):
+        if key in self._categories:
+            return getattr(self, key)
+        return self.extra[key]
+
+    def __setitem__(self, key: str, value) -> None:
+        if key in self._categories:
+            setattr(self, key, value)
+        else:
+            self.extra[key] = value
+
+    def __contains__(self, key: str) -> bool:
+        return key in self._categories or key in self.extra
+
+    def get(self, key: str, default=None):
+        return self[key] if key in self else default
+
+    def keys(self) -> list:
+        return list(self._categories) + list(self.extra.keys())
+
+
+# Array types accepted in the binary runtime parameters encoding
+BINARY_ARRAY_DTYPES = {"float32": "<f4", "float64": "<f8", "uint8": "u1"}
+# Runtime parameters sent as binary arrays by default, with their array type
+BINARY_ENCODED_PARAMS = {
+    "pv_power_forecast": "float32",
+    "load_power_forecast": "float32",
+    "load_cost_forecast": "float32",
+    "prod_price_forecast": "float32",
+    "outdoor_temperature_forecast": "float32",
+    "ev_availability": "uint8",
+    "ev_minimum_soc_schedule": "float32",
+    "ev_distance_forecast": "float32",
+}
+
+
+def encode_runtimeparams(runtimeparams: dict, dtypes: dict | None = None) -> str:
+    """
+    Encode runtime parameters with the compact binary encoding.
+
+    The large arrays (forecasts, EV availability and SOC schedules) are stored \
+    as base64 encoded little-endian arrays in the "__arrays__" entry of a json \
+    document, the other values stay as json.
+
+    :param runtimeparams: The runtime parameters
+    :type runtimeparams: dict
+    :param dtypes: The parameters to encode as arrays with their array type \
+        (float32, float64 or uint8), defaults to BINARY_ENCODED_PARAMS
+    :type dtypes: dict, optional
+    :return: The encoded runtime parameters
+    :rtype: str
+    """
+    if dtypes is None:
+        dtypes = BINARY_ENCODED_PARAMS
+    encoded = {"__arrays__": {}}
+    for key, value in runtimeparams.items():
+        if key in dtypes and isinstance(value, (list, np.ndarray)):
+            array = np.ascontiguousarray(value, dtype=BINARY_ARRAY_DTYPES[dtypes[key]])
+            encoded["__arrays__"][key] = {
+                "dtype": dtypes[key],
+                "shape": list(array.shape),
+                "data": base64.b64encode(array.tobytes()).decode(),
+            }
+        else:
+            encoded[key] = value
+    return json.dumps(encoded)
+
+
+def decode_runtimeparams(runtimeparams: str | bytes | dict) -> dict:
+    """
+    Decode runtime parameters, sent as json or with the compact binary encoding.
+
+    The binary arrays are read without copy into read-only NumPy arrays.
+
+    :param runtimeparams: The runtime parameters
+    :type runtimeparams: str | bytes | dict
+    :return: The decoded runtime parameters
+    :rtype: dict
+    """
+    if isinstance(runtimeparams, (str, bytes)):
+        runtimeparams = json.loads(runtimeparams)
+    arrays = runtimeparams.pop("__arrays__", None)
+    if arrays:
+        for key, array in arrays.items():
+            runtimeparams[key] = np.frombuffer(
+                base64.b64decode(array["data"]),
+                dtype=BINARY_ARRAY_DTYPES[array["dtype"]],
+            ).reshape(array["shape"])
+    return runtimeparams
+
+
+def get_forecast_array(
+    forecast_input: list | dict | str | bytes,
+    forecast_dates: pd.DatetimeIndex,
+    optimization_time_step: int,
+    time_zone: datetime.tzinfo,
+    forecast_key: str,
+    logger: logging.Logger,
+) -> np.ndarray | None:
+    """
+    Parse a passed forecast into a float64 array aligned to forecast_dates.
+
+    The forecast can be a list of values, a string containing such a list, a dict \
+    of ISO8601 timestamps to values (resampled to the optimization time step and \
+    aligned to forecast_dates) or the little-endian float64 binary encoding, as \
+    bytes or as a string prefixed with "base64:".
+    Non numeric values are reported and set to nan.
+
+    :param forecast_input: The passed forecast
+    :type forecast_input: list | dict | str | bytes
+    :param forecast_dates: The forecast dates
+    :type forecast_dates: pd.DatetimeIndex
+    :param optimization_time_step: The optimization time step in minutes
+    :type optimization_time_step: int
+    :param time_zone: The time zone
+    :type time_zone: datetime.tzinfo
+    :param forecast_key: The name of the forecast, used in the logs
+    :type forecast_key: str
+    :param logger: The logger object
+    :type logger: logging.Logger
+    :return: The forecast values, None if the forecast could not be parsed
+    :rtype: np.ndarray | None
+    """
+    if isinstance(forecast_input, str):
+        if forecast_input.startswith("base64:"):
+            forecast_input = base64.b64decode(forecast_input[len("base64:") :])
+        else:
+            # Check if string contains list, if so extract
+            try:
+                forecast_input = json.loads(forecast_input)
+            except ValueError:
+                try:
+                    forecast_input = ast.literal_eval(forecast_input)
+                except (ValueError, SyntaxError):
+                    return None
+    if isinstance(forecast_input, (bytes, bytearray)):
+        return np.frombuffer(forecast_input, dtype="<f8").astype(np.float64)
+    if isinstance(forecast_input, dict):
+        times = pd.to_datetime(
+            list(forecast_input.keys()), format="ISO8601", utc=True
+        ).tz_convert(time_zone)
+        values = pd.to_numeric(
+            pd.Series(list(forecast_input.values()), index=times), errors="coerce"
+        )
+        # align index with forecast_dates
+        return (
+            values.resample(pd.to_timedelta(optimization_time_step, "minutes"))
+            .mean()
+            .reindex(forecast_dates, method="nearest")
+            .ffill()
+            .bfill()
+            .to_numpy(dtype=np.float64)
+        )
+    if not isinstance(forecast_input, (list, np.ndarray)):
+        return None
+    try:
+        forecast_array = np.asarray(forecast_input, dtype=np.float64)
+    except (ValueError, TypeError):
+        # Some values are not numbers (strings, dicts, ...)
+        forecast_array = pd.to_numeric(
+            pd.Series(forecast_input, dtype=object), errors="coerce"
+        ).to_numpy(dtype=np.float64)
+    if forecast_array.ndim != 1:
+        return None
+    is_missing = np.isnan(forecast_array)
+    if is_missing.any():
+        logger.warning(
+            f"There are non numeric values on the passed data for {forecast_key}, check for missing values (nans, null, etc)"
+        )
+        for i in np.flatnonzero(is_missing):
+            logger.warning(
+                f"This value in {forecast_key} was detected as non digits: {str(forecast_input[i])}"
+            )
+    return forecast_array
 
 
 def update_params_with_ha_config(
-    params: str,
+    params: str | Params,
     ha_config: dict,
-) -> dict:
+) -> str | Params:
     """
     Update the params with the Home Assistant configuration.
 
     Parameters
     ----------
-    params : str
-        The serialized params.
+    params : str | Params
+        The serialized params, or the params container.
     ha_config : dict
         The Home Assistant configuration.
 
     Returns
     -------
-    dict
-        The updated params.
+    str | Params
+        The updated params, serialized unless a params container was passed.
     """
     # Load serialized params
-    params = json.loads(params)
+    if isinstance(params, Params):
+        return_container = True
+        params = params.copy()
+        params["passed_data"] = {
+            key: dict(value) if isinstance(value, dict) else value
+            for key, value in params["passed_data"].items()
+        }
+    else:
+        return_container = False
+        params = json.loads(params)
     # Update params
     currency_to_symbol = {
         "EUR": "€",
@@ -206,14 +585,16 @@ def update_params_with_ha_config(
     }
     for key, value in updated_passed_dict.items():
         params["passed_data"][key]["unit_of_measurement"] = value["unit_of_measurement"]
+    if return_container:
+        return params
     # Serialize the final params
-    params = json.dumps(params, default=str)
+    params = json.dumps(params, default=json_default)
     return params
 
 
 def treat_runtimeparams(
     runtimeparams: str,
-    params: str,
+    params: str | Params,
     retrieve_hass_conf: dict,
     optim_conf: dict,
     plant_conf: dict,
@@ -226,8 +607,8 @@ def treat_runtimeparams(
 
     :param runtimeparams: Json string containing the runtime parameters dict.
     :type runtimeparams: str
-    :param params: Built configuration parameters
-    :type params: str
+    :param params: Built configuration parameters, serialized or as a params container
+    :type params: str | Params
     :param retrieve_hass_conf: Config dictionary for data retrieving parameters.
     :type retrieve_hass_conf: dict
     :param optim_conf: Config dictionary for optimization parameters.
@@ -240,12 +621,19 @@ def treat_runtimeparams(
     :type logger: logging.Logger
     :param emhass_conf: Dictionary containing the needed emhass paths
     :type emhass_conf: dict
-    :return: Returning the params and optimization parameter container.
-    :rtype: Tuple[str, dict]
+    :return: Returning the params (serialized unless a params container was passed) \
+        and optimization parameter container.
+    :rtype: Tuple[str | Params, dict]
 
     """
+    timings = timing.Timings()
     # Check if passed params is a dict
-    if (params is not None) and (params != "null"):
+    return_container = isinstance(params, Params)
+    if return_container:
+        # Work on a copy, the runtime parameters must not change the server params
+        params = params.copy()
+        params["passed_data"] = dict(params["passed_data"])
+    elif (params is not None) and (params != "null"):
         if type(params) is str:
             params = json.loads(params)
     else:
@@ -356,33 +744,27 @@ def treat_runtimeparams(
             params["passed_data"][key] = value
     else:
         params["passed_data"] = default_passed_dict
+    timings.mark("defaults")
 
     # If any runtime parameters where passed in action call
     if runtimeparams is not None:
-        if type(runtimeparams) is str:
-            runtimeparams = json.loads(runtimeparams)
+        if type(runtimeparams) in (str, bytes) or "__arrays__" in runtimeparams:
+            runtimeparams = decode_runtimeparams(runtimeparams)
+        timings.mark("decode")
 
-        # Loop though parameters stored in association file, Check to see if any stored in runtime
+        # Map the runtime parameters (or their legacy names) to their config categories
         # If true, set runtime parameter to params
-        if emhass_conf["associations_path"].exists():
-            with emhass_conf["associations_path"].open("r") as data:
-                associations = list(csv.reader(data, delimiter=","))
-                # Association file key reference
-                # association[0] = config categories
-                # association[1] = legacy parameter name
-                # association[2] = parameter (config.json/config_defaults.json)
-                # association[3] = parameter list name if exists (not used, from legacy options.json)
-                for association in associations:
-                    # Check parameter name exists in runtime
-                    if runtimeparams.get(association[2], None) is not None:
-                        params[association[0]][association[2]] = runtimeparams[
-                            association[2]
-                        ]
-                    # Check Legacy parameter name runtime
-                    elif runtimeparams.get(association[1], None) is not None:
-                        params[association[0]][association[2]] = runtimeparams[
-                            association[1]
-                        ]
+        associations = get_associations(emhass_conf["associations_path"], logger)
+        if associations is not None:
+            for key, value in runtimeparams.items():
+                if value is None:
+                    continue
+                for category, parameter in associations["by_parameter"].get(key, []):
+                    params[category][parameter] = value
+                # Legacy parameter name, only used if the new name was not passed
+                for category, parameter in associations["by_legacy_name"].get(key, []):
+                    if runtimeparams.get(parameter, None) is None:
+                        params[category][parameter] = value
         else:
             logger.warning(
                 "Cant find associations file (associations.csv) in: "
@@ -539,7 +921,12 @@ def treat_runtimeparams(
                 "optim_conf"
             ].get("end_timesteps_of_each_deferrable_load", None)
 
-            forecast_dates = copy.deepcopy(forecast_dates)[0:prediction_horizon]
+            forecast_dates = get_forecast_grid(
+                optimization_time_step,
+                delta_forecast,
+                time_zone,
+                prediction_horizon=prediction_horizon,
+            )["forecast_dates"]
 
             # Load the default config
             if "def_load_config" in runtimeparams:
@@ -547,6 +934,10 @@ def treat_runtimeparams(
                     "def_load_config"
                 ]
             if "def_load_config" in params["optim_conf"]:
+                # Copied as the thermal configs are updated in place
+                params["optim_conf"]["def_load_config"] = copy.deepcopy(
+                    params["optim_conf"]["def_load_config"]
+                )
                 for k in range(len(params["optim_conf"]["def_load_config"])):
                     if "thermal_config" in params["optim_conf"]["def_load_config"][k]:
                         if (
@@ -571,6 +962,7 @@ def treat_runtimeparams(
             params["passed_data"]["prediction_horizon"] = None
             params["passed_data"]["soc_init"] = None
             params["passed_data"]["soc_final"] = None
+        timings.mark("forecast_dates")
 
         # Treat passed forecast data lists
         list_forecast_key = [
@@ -588,36 +980,21 @@ def treat_runtimeparams(
             "outdoor_temperature_forecast_method",
         ]
 
-        # Loop forecasts, check if value is a list and greater than or equal to forecast_dates
+        # Loop forecasts, parse them to arrays and check they cover forecast_dates
         for method, forecast_key in enumerate(list_forecast_key):
             if forecast_key in runtimeparams.keys():
-                forecast_input = runtimeparams[forecast_key]
-                if isinstance(forecast_input, dict):
-                    forecast_data_df = pd.DataFrame.from_dict(
-                        forecast_input, orient="index"
-                    ).reset_index()
-                    forecast_data_df.columns = ["time", "value"]
-                    forecast_data_df["time"] = pd.to_datetime(
-                        forecast_data_df["time"], format="ISO8601", utc=True
-                    ).dt.tz_convert(time_zone)
-
-                    # align index with forecast_dates
-                    forecast_data_df = (
-                        forecast_data_df.resample(
-                            pd.to_timedelta(optimization_time_step, "minutes"),
-                            on="time",
-                        )
-                        .aggregate({"value": "mean"})
-                        .reindex(forecast_dates, method="nearest")
-                    )
-                    forecast_data_df["value"] = (
-                        forecast_data_df["value"].ffill().bfill()
-                    )
-                    forecast_input = forecast_data_df["value"].tolist()
-                if isinstance(forecast_input, list) and len(forecast_input) >= len(
+                forecast_array = get_forecast_array(
+                    runtimeparams[forecast_key],
+                    forecast_dates,
+                    optimization_time_step,
+                    time_zone,
+                    forecast_key,
+                    logger,
+                )
+                if forecast_array is not None and len(forecast_array) >= len(
                     forecast_dates
                 ):
-                    params["passed_data"][forecast_key] = forecast_input
+                    params["passed_data"][forecast_key] = forecast_array
                     params["optim_conf"][forecast_methods[method]] = "list"
                 else:
                     logger.error(
@@ -626,26 +1003,9 @@ def treat_runtimeparams(
                     logger.error(
                         f"Passed type is {str(type(runtimeparams[forecast_key]))} and length is {str(len(runtimeparams[forecast_key]))}"
                     )
-                # Check if string contains list, if so extract
-                if isinstance(forecast_input, str):
-                    if isinstance(ast.literal_eval(forecast_input), list):
-                        forecast_input = ast.literal_eval(forecast_input)
-                        runtimeparams[forecast_key] = forecast_input
-                list_non_digits = [
-                    x
-                    for x in forecast_input
-                    if not (isinstance(x, int) or isinstance(x, float))
-                ]
-                if len(list_non_digits) > 0:
-                    logger.warning(
-                        f"There are non numeric values on the passed data for {forecast_key}, check for missing values (nans, null, etc)"
-                    )
-                    for x in list_non_digits:
-                        logger.warning(
-                            f"This value in {forecast_key} was detected as non digits: {str(x)}"
-                        )
             else:
                 params["passed_data"][forecast_key] = None
+        timings.mark("forecasts")
 
         # Treat passed data for forecast model fit/predict/tune at runtime
         if (
@@ -880,22 +1240,30 @@ def treat_runtimeparams(
                 "custom_predicted_temperature_id"
             ]
 
+    timings.mark("runtime_params")
     # split config categories from params
     retrieve_hass_conf = params["retrieve_hass_conf"]
     optim_conf = params["optim_conf"]
     plant_conf = params["plant_conf"]
 
+    if return_container:
+        last_timings["treat_runtimeparams"] = timings.log(logger, "treat_runtimeparams")
+        return params, retrieve_hass_conf, optim_conf, plant_conf
     # Serialize the final params
-    params = json.dumps(params, default=str)
+    with timings.span("serialize"):
+        params = json.dumps(params, default=json_default)
+    last_timings["treat_runtimeparams"] = timings.log(logger, "treat_runtimeparams")
     return params, retrieve_hass_conf, optim_conf, plant_conf
 
 
-def get_yaml_parse(params: str, logger: logging.Logger) -> tuple[dict, dict, dict]:
+def get_yaml_parse(
+    params: str | Params, logger: logging.Logger
+) -> tuple[dict, dict, dict]:
     """
     Perform parsing of the params into the configuration catagories
 
-    :param params: Built configuration parameters
-    :type params: str
+    :param params: Built configuration parameters, serialized or as a params container
+    :type params: str | Params
     :param logger: The logger object
     :type logger: logging.Logger
     :return: A tuple with the dictionaries containing the parsed data
@@ -905,6 +1273,9 @@ def get_yaml_parse(params: str, logger: logging.Logger) -> tuple[dict, dict, dic
     if params:
         if type(params) is str:
             input_conf = json.loads(params)
+        elif isinstance(params, Params):
+            # Parse copies, the container keeps the values as configured
+            input_conf = params.copy()
         else:
             input_conf = params
     else:
@@ -916,173 +1287,159 @@ def get_yaml_parse(params: str, logger: logging.Logger) -> tuple[dict, dict, dic
     retrieve_hass_conf = input_conf.get("retrieve_hass_conf", {})
     plant_conf = input_conf.get("plant_conf", {})
 
-    # Format time parameters
-    if optim_conf.get("delta_forecast_daily", None) is not None:
+    # Format time parameters (skipping the values already formatted)
+    if optim_conf.get("delta_forecast_daily", None) is not None and not isinstance(
+        optim_conf["delta_forecast_daily"], pd.Timedelta
+    ):
         optim_conf["delta_forecast_daily"] = pd.Timedelta(
             days=optim_conf["delta_forecast_daily"]
         )
-    if retrieve_hass_conf.get("optimization_time_step", None) is not None:
+    if retrieve_hass_conf.get(
+        "optimization_time_step", None
+    ) is not None and not isinstance(
+        retrieve_hass_conf["optimization_time_step"], pd.Timedelta
+    ):
         retrieve_hass_conf["optimization_time_step"] = pd.to_timedelta(
             retrieve_hass_conf["optimization_time_step"], "minutes"
         )
-    if retrieve_hass_conf.get("time_zone", None) is not None:
+    if retrieve_hass_conf.get("time_zone", None) is not None and isinstance(
+        retrieve_hass_conf["time_zone"], str
+    ):
         retrieve_hass_conf["time_zone"] = pytz.timezone(retrieve_hass_conf["time_zone"])
 
     return retrieve_hass_conf, optim_conf, plant_conf
 
 
-def get_injection_dict(df: pd.DataFrame, plot_size: int | None = 1366) -> dict:
-    """
-    Build a dictionary with graphs and tables for the webui.
+# Web UI rendering helpers, imported from the plots module on first access
+_PLOT_FUNCTIONS = (
+    "get_injection_dict",
+    "get_injection_dict_forecast_model_fit",
+    "get_injection_dict_forecast_model_tune",
+    "get_results_table_page",
+    "get_plot_data",
+)
+
+
+def __getattr__(name: str):
+    if name in _PLOT_FUNCTIONS:
+        return getattr(importlib.import_module("emhass.plots"), name)
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
+
+
+# Parsed configuration files, keyed by path: (modification time, parsed content)
+_config_file_cache = {}
+# Last merged configuration: (signature of its source files, pickled config)
+_config_cache = {}
+_config_cache_stats = metrics.register_cache("config")
+
+# Phase durations in milliseconds of the last build_config, build_params and
+# treat_runtimeparams calls, keyed by function name
+last_timings = {}
+
+# Default location of the EV configuration, overridden by emhass_conf["ev_config_path"]
+DEFAULT_EV_CONFIG_PATH = pathlib.Path("/share/emhass-ev/config.json")
 
-    :param df: The optimization result DataFrame
-    :type df: pd.DataFrame
-    :param plot_size: Size of the plot figure in pixels, defaults to 1366
-    :type plot_size: Optional[int], optional
-    :return: A dictionary containing the graphs and tables in html format
-    :rtype: dict
 
+def get_file_signature(path: str | None) -> tuple:
     """
-    cols_p = [i for i in df.columns.to_list() if "P_" in i]
-    # Let's round the data in the DF
-    optim_status = df["optim_status"].unique().item()
-    df.drop("optim_status", axis=1, inplace=True)
-    cols_else = [i for i in df.columns.to_list() if "P_" not in i]
-    df = df.apply(pd.to_numeric)
-    df[cols_p] = df[cols_p].astype(int)
-    df[cols_else] = df[cols_else].round(3)
-    # Create plots
-    n_colors = len(cols_p)
-    colors = px.colors.sample_colorscale(
-        "jet", [n / (n_colors - 1) for n in range(n_colors)]
-    )
-    fig_0 = px.line(
-        df[cols_p],
-        title="Systems powers schedule after optimization results",
-        template="presentation",
-        line_shape="hv",
-        color_discrete_sequence=colors,
-        render_mode="svg",
-    )
-    fig_0.update_layout(xaxis_title="Timestamp", yaxis_title="System powers (W)")
-    if "SOC_opt" in df.columns.to_list():
-        fig_1 = px.line(
-            df["SOC_opt"],
-            title="Battery state of charge schedule after optimization results",
-            template="presentation",
-            line_shape="hv",
-            color_discrete_sequence=colors,
-            render_mode="svg",
-        )
-        fig_1.update_layout(xaxis_title="Timestamp", yaxis_title="Battery SOC (%)")
-    cols_cost = [i for i in df.columns.to_list() if "cost_" in i or "unit_" in i]
-    n_colors = len(cols_cost)
-    colors = px.colors.sample_colorscale(
-        "jet", [n / (n_colors - 1) for n in range(n_colors)]
-    )
-    fig_2 = px.line(
-        df[cols_cost],
-        title="Systems costs obtained from optimization results",
-        template="presentation",
-        line_shape="hv",
-        color_discrete_sequence=colors,
-        render_mode="svg",
-    )
-    fig_2.update_layout(xaxis_title="Timestamp", yaxis_title="System costs (currency)")
-    # Get full path to image
-    image_path_0 = fig_0.to_html(full_html=False, default_width="75%")
-    if "SOC_opt" in df.columns.to_list():
-        image_path_1 = fig_1.to_html(full_html=False, default_width="75%")
-    image_path_2 = fig_2.to_html(full_html=False, default_width="75%")
-    # The tables
-    table1 = df.reset_index().to_html(classes="mystyle", index=False)
-    cost_cols = [i for i in df.columns if "cost_" in i]
-    table2 = df[cost_cols].reset_index().sum(numeric_only=True)
-    table2["optim_status"] = optim_status
-    table2 = (
-        table2.to_frame(name="Value")
-        .reset_index(names="Variable")
-        .to_html(classes="mystyle", index=False)
-    )
-    # The dict of plots
-    injection_dict = {}
-    injection_dict["title"] = "<h2>EMHASS optimization results</h2>"
-    injection_dict["subsubtitle0"] = "<h4>Plotting latest optimization results</h4>"
-    injection_dict["figure_0"] = image_path_0
-    if "SOC_opt" in df.columns.to_list():
-        injection_dict["figure_1"] = image_path_1
-    injection_dict["figure_2"] = image_path_2
-    injection_dict["subsubtitle1"] = "<h4>Last run optimization results table</h4>"
-    injection_dict["table1"] = table1
-    injection_dict["subsubtitle2"] = (
-        "<h4>Summary table for latest optimization results</h4>"
-    )
-    injection_dict["table2"] = table2
-    return injection_dict
+    Get the signature of a file used to invalidate the configuration cache.
 
+    :param path: The file path
+    :type path: str
+    :return: The file path and its modification time, None if the file does not exist
+    :rtype: tuple
+    """
+    if not path:
+        return (None, None)
+    try:
+        return (str(path), os.stat(path).st_mtime_ns)
+    except OSError:
+        return (str(path), None)
 
-def get_injection_dict_forecast_model_fit(
-    df_fit_pred: pd.DataFrame, mlf: MLForecaster
-) -> dict:
+
+def read_config_file(path: str, logger: logging.Logger) -> dict:
     """
-    Build a dictionary with graphs and tables for the webui for special MLF fit case.
+    Parse a json or yaml configuration file, reusing the parsed content until \
+    the file is modified.
+
+    The returned object is shared with the cache and must not be modified.
 
-    :param df_fit_pred: The fit result DataFrame
-    :type df_fit_pred: pd.DataFrame
-    :param mlf: The MLForecaster object
-    :type mlf: MLForecaster
-    :return: A dictionary containing the graphs and tables in html format
+    :param path: The configuration file path
+    :type path: str
+    :param logger: The logger object
+    :type logger: logging.Logger
+    :return: The parsed file content
     :rtype: dict
     """
-    fig = df_fit_pred.plot()
-    fig.layout.template = "presentation"
-    fig.update_yaxes(title_text=mlf.model_type)
-    fig.update_xaxes(title_text="Time")
-    image_path_0 = fig.to_html(full_html=False, default_width="75%")
-    # The dict of plots
-    injection_dict = {}
-    injection_dict["title"] = "<h2>Custom machine learning forecast model fit</h2>"
-    injection_dict["subsubtitle0"] = (
-        "<h4>Plotting train/test forecast model results for " + mlf.model_type + "</h4>"
-    )
-    injection_dict["subsubtitle0"] = (
-        "<h4>Forecasting variable " + mlf.var_model + "</h4>"
-    )
-    injection_dict["figure_0"] = image_path_0
-    return injection_dict
+    key, mtime = get_file_signature(path)
+    cached = _config_file_cache.get(key)
+    if cached is not None and cached[0] == mtime:
+        return cached[1]
+    logger.debug(f"Parsing configuration file {path}")
+    with open(path) as data:
+        if str(path).endswith((".yaml", ".yml")):
+            content = yaml.load(data, Loader=yaml.FullLoader)
+        else:
+            content = json.load(data)
+    _config_file_cache[key] = (mtime, content)
+    return content
 
 
-def get_injection_dict_forecast_model_tune(
-    df_pred_optim: pd.DataFrame, mlf: MLForecaster
-) -> dict:
+# Association registry: (signature of the associations file, indexes)
+_associations_cache = {}
+_associations_cache_stats = metrics.register_cache("associations")
+
+
+def get_associations(associations_path: pathlib.Path, logger: logging.Logger) -> dict:
     """
-    Build a dictionary with graphs and tables for the webui for special MLF tune case.
+    Get the associations between config categories, legacy parameter names, \
+    parameter names and list names, indexed for dictionary lookups.
+
+    The associations file is parsed once and reloaded only when it is modified.
 
-    :param df_pred_optim: The tune result DataFrame
-    :type df_pred_optim: pd.DataFrame
-    :param mlf: The MLForecaster object
-    :type mlf: MLForecaster
-    :return: A dictionary containing the graphs and tables in html format
+    :param associations_path: The path to associations.csv
+    :type associations_path: pathlib.Path
+    :param logger: The logger object
+    :type logger: logging.Logger
+    :return: The association rows and the indexes by_parameter, by_legacy_name, \
+        by_list_name and by_category, mapping a name to its (category, parameter) \
+        pairs. None if the file does not exist.
     :rtype: dict
     """
-    fig = df_pred_optim.plot()
-    fig.layout.template = "presentation"
-    fig.update_yaxes(title_text=mlf.model_type)
-    fig.update_xaxes(title_text="Time")
-    image_path_0 = fig.to_html(full_html=False, default_width="75%")
-    # The dict of plots
-    injection_dict = {}
-    injection_dict["title"] = "<h2>Custom machine learning forecast model tune</h2>"
-    injection_dict["subsubtitle0"] = (
-        "<h4>Performed a tuning routine using bayesian optimization for "
-        + mlf.model_type
-        + "</h4>"
-    )
-    injection_dict["subsubtitle0"] = (
-        "<h4>Forecasting variable " + mlf.var_model + "</h4>"
-    )
-    injection_dict["figure_0"] = image_path_0
-    return injection_dict
+    signature = get_file_signature(associations_path)
+    if signature[1] is None:
+        return None
+    cached = _associations_cache.get(signature[0])
+    if cached is not None and cached[0] == signature:
+        _associations_cache_stats.hit()
+        return cached[1]
+    _associations_cache_stats.miss()
+    logger.debug(f"Parsing associations file {associations_path}")
+    # Association file key reference
+    # association[0] = config categories
+    # association[1] = legacy parameter name
+    # association[2] = parameter (config.json/config_defaults.json)
+    # association[3] = parameter list name if exists (not used, from legacy options.json)
+    with open(associations_path) as data:
+        rows = [row for row in csv.reader(data, delimiter=",") if row]
+    if rows and rows[0][0] == "config_categorie":
+        rows = rows[1:]
+    associations = {
+        "rows": rows,
+        "by_parameter": {},
+        "by_legacy_name": {},
+        "by_list_name": {},
+        "by_category": {},
+    }
+    for row in rows:
+        pair = (row[0], row[2])
+        associations["by_parameter"].setdefault(row[2], []).append(pair)
+        associations["by_legacy_name"].setdefault(row[1], []).append(pair)
+        if len(row) == 4:
+            associations["by_list_name"].setdefault(row[3], []).append(pair)
+        associations["by_category"].setdefault(row[0], []).append(row[2])
+    _associations_cache[signature[0]] = (signature, associations)
+    return associations
 
 
 def build_config(
@@ -1094,7 +1451,13 @@ def build_config(
 ) -> dict:
     """
     Retrieve parameters from configuration files.
-    priority order (low - high) = defaults_path, config_path legacy_config_path
+    priority order (low - high) = defaults_path, config_path legacy_config_path, ev config
+
+    The merged configuration is cached and only rebuilt when one of the source \
+    files is modified. The callers modify the returned dict (build_params shares \
+    its lists with the params, the web server updates and serializes it), so each \
+    call returns a new dict, unpickled from the cache about 3 times faster than a \
+    deep copy.
 
     :param emhass_conf: Dictionary containing the needed emhass paths
     :type emhass_conf: dict
@@ -1109,21 +1472,36 @@ def build_config(
     :return: The built config dictionary
     :rtype: dict
     """
+    timings = timing.Timings()
+    ev_config_path = emhass_conf.get("ev_config_path", DEFAULT_EV_CONFIG_PATH)
+    signature = (
+        get_file_signature(defaults_path),
+        get_file_signature(config_path),
+        get_file_signature(legacy_config_path),
+        get_file_signature(ev_config_path),
+    )
+    if legacy_config_path:
+        signature += (get_file_signature(emhass_conf.get("associations_path")),)
+    cached = _config_cache.get("config")
+    if cached is not None and cached[0] == signature:
+        _config_cache_stats.hit()
+        logger.debug("Configuration files unchanged, using cached config")
+        return pickle.loads(cached[1])
+    _config_cache_stats.miss()
 
     # Read default parameters (default root_path/data/config_defaults.json)
     if defaults_path and pathlib.Path(defaults_path).is_file():
-        with defaults_path.open("r") as data:
-            config = json.load(data)
+        config = copy.deepcopy(read_config_file(defaults_path, logger))
     else:
         logger.error("config_defaults.json. does not exist ")
         return False
+    timings.mark("defaults")
 
     # Read user config parameters if provided (default /share/config.json)
     if config_path and pathlib.Path(config_path).is_file():
-        with config_path.open("r") as data:
-            # Set override default parameters (config_defaults) with user given parameters (config.json)
-            logger.info("Obtaining parameters from config.json:")
-            config.update(json.load(data))
+        # Set override default parameters (config_defaults) with user given parameters (config.json)
+        logger.info("Obtaining parameters from config.json:")
+        config.update(copy.deepcopy(read_config_file(config_path, logger)))
     else:
         logger.info(
             "config.json does not exist, or has not been passed. config parameters may default to config_defaults.json"
@@ -1131,51 +1509,54 @@ def build_config(
         logger.info(
             "you may like to generate the config.json file on the configuration page"
         )
+    timings.mark("config")
 
     # Check to see if legacy config_emhass.yaml was provided (default /app/config_emhass.yaml)
     # Convert legacy parameter definitions/format to match config.json
     if legacy_config_path and pathlib.Path(legacy_config_path).is_file():
-        with open(legacy_config_path) as data:
-            legacy_config = yaml.load(data, Loader=yaml.FullLoader)
-            legacy_config_parameters = build_legacy_config_params(
-                emhass_conf, legacy_config, logger
+        legacy_config = copy.deepcopy(read_config_file(legacy_config_path, logger))
+        legacy_config_parameters = build_legacy_config_params(
+            emhass_conf, legacy_config, logger
+        )
+        if type(legacy_config_parameters) is not bool:
+            logger.info(
+                "Obtaining parameters from config_emhass.yaml: (will overwrite config parameters)"
             )
-            if type(legacy_config_parameters) is not bool:
-                logger.info(
-                    "Obtaining parameters from config_emhass.yaml: (will overwrite config parameters)"
-                )
-                config.update(legacy_config_parameters)
+            config.update(legacy_config_parameters)
+    timings.mark("legacy_config")
 
     # Load EV parameters if they exist
-    ev_config_path = "/share/emhass-ev/config.json"
     if pathlib.Path(ev_config_path).is_file():
         try:
-            with open(ev_config_path, "r") as ev_data:
-                ev_config = json.load(ev_data)
-                logger.info("Loading EV parameters from /share/emhass-ev/config.json")
-
-                # Extract EV parameters from ev_conf section and add to main config
-                if "params" in ev_config and "ev_conf" in ev_config["params"]:
-                    ev_params = ev_config["params"]["ev_conf"]
-                    config["set_use_ev"] = True
-                    config["number_of_ev_loads"] = ev_params.get("number_of_ev_loads", 1)
-                    config["ev_battery_capacity"] = ev_params.get("ev_battery_capacity", [75000])
-                    config["ev_charging_efficiency"] = ev_params.get("ev_charging_efficiency", [0.9])
-                    config["ev_nominal_charging_power"] = ev_params.get("ev_nominal_charging_power", [11000])
-                    config["ev_minimum_charging_power"] = ev_params.get("ev_minimum_charging_power", [1380])
-                    config["ev_consumption_efficiency"] = ev_params.get("ev_consumption_efficiency", [0.2])
-
-                    # NEW: Add runtime EV parameters for dynamic control
-                    config["ev_availability"] = ev_params.get("ev_availability", [[1] * 24])
-                    config["ev_minimum_soc_schedule"] = ev_params.get("ev_minimum_soc_schedule", [[0.2] * 24])
-                    config["ev_initial_soc"] = ev_params.get("ev_initial_soc", [0.2])
-                    config["ev_distance_forecast"] = ev_params.get("ev_distance_forecast", [[0] * 24])
-
-                    logger.info(f"Loaded EV parameters for {config['number_of_ev_loads']} vehicles")
-                    logger.info(f"EV runtime parameters: availability, min_soc, initial_soc, distance_forecast")
+            ev_config = read_config_file(ev_config_path, logger)
+            logger.info(f"Loading EV parameters from {ev_config_path}")
+
+            # Extract EV parameters from ev_conf section and add to main config
+            if "params" in ev_config and "ev_conf" in ev_config["params"]:
+                ev_params = copy.deepcopy(ev_config["params"]["ev_conf"])
+                config["set_use_ev"] = True
+                config["number_of_ev_loads"] = ev_params.get("number_of_ev_loads", 1)
+                config["ev_battery_capacity"] = ev_params.get("ev_battery_capacity", [75000])
+                config["ev_charging_efficiency"] = ev_params.get("ev_charging_efficiency", [0.9])
+                config["ev_nominal_charging_power"] = ev_params.get("ev_nominal_charging_power", [11000])
+                config["ev_minimum_charging_power"] = ev_params.get("ev_minimum_charging_power", [1380])
+                config["ev_consumption_efficiency"] = ev_params.get("ev_consumption_efficiency", [0.2])
+
+                # NEW: Add runtime EV parameters for dynamic control
+                config["ev_availability"] = ev_params.get("ev_availability", [[1] * 24])
+                config["ev_minimum_soc_schedule"] = ev_params.get("ev_minimum_soc_schedule", [[0.2] * 24])
+                config["ev_initial_soc"] = ev_params.get("ev_initial_soc", [0.2])
+                config["ev_distance_forecast"] = ev_params.get("ev_distance_forecast", [[0] * 24])
+
+                logger.info(f"Loaded EV parameters for {config['number_of_ev_loads']} vehicles")
+                logger.info(f"EV runtime parameters: availability, min_soc, initial_soc, distance_forecast")
         except Exception as e:
             logger.warning(f"Failed to load EV parameters: {e}")
+    timings.mark("ev_config")
 
+    _config_cache["config"] = (signature, pickle.dumps(config, pickle.HIGHEST_PROTOCOL))
+    timings.mark("cache")
+    last_timings["build_config"] = timings.log(logger, "build_config")
     return config
 
 
@@ -1210,10 +1591,8 @@ def build_legacy_config_params(
     config = {}
 
     # Use associations list to map legacy parameter name with config.json parameter name
-    if emhass_conf["associations_path"].exists():
-        with emhass_conf["associations_path"].open("r") as data:
-            associations = list(csv.reader(data, delimiter=","))
-    else:
+    associations = get_associations(emhass_conf["associations_path"], logger)
+    if associations is None:
         logger.error(
             "Cant find associations file (associations.csv) in: "
             + str(emhass_conf["associations_path"])
@@ -1222,22 +1601,17 @@ def build_legacy_config_params(
 
     # Loop through all parameters in association file
     # Append config with existing legacy config parameters (converting alternative parameter naming conventions with associations list)
-    for association in associations:
+    for row in associations["rows"]:
         # if legacy config catagories exists and if legacy parameter exists in config catagories
         if (
-            legacy_config.get(association[0], None) is not None
-            and legacy_config[association[0]].get(association[1], None) is not None
+            legacy_config.get(row[0], None) is not None
+            and legacy_config[row[0]].get(row[1], None) is not None
         ):
-            config[association[2]] = legacy_config[association[0]][association[1]]
+            config[row[2]] = legacy_config[row[0]][row[1]]
 
             # If config now has load_peak_hour_periods, extract from list of dict
-            if (
-                association[2] == "load_peak_hour_periods"
-                and type(config[association[2]]) is list
-            ):
-                config[association[2]] = {
-                    key: d[key] for d in config[association[2]] for key in d
-                }
+            if row[2] == "load_peak_hour_periods" and type(config[row[2]]) is list:
+                config[row[2]] = {key: d[key] for d in config[row[2]] for key in d}
 
     return config
     # params['associations_dict'] = associations_dict
@@ -1283,6 +1657,212 @@ def param_to_config(param: dict, logger: logging.Logger) -> dict:
     return return_config
 
 
+# Home Assistant metadata used by build_secrets, with its on-disk cache in data_path
+HA_METADATA_KEYS = ("time_zone", "latitude", "longitude", "elevation")
+HA_METADATA_CACHE_FILE = "ha_config_cache.json"
+# Age in seconds after which the cached metadata is refreshed in the background
+HA_METADATA_TTL = 24 * 3600
+# (connect, read) timeouts in seconds of the Home Assistant requests
+HA_METADATA_TIMEOUT = (3.05, 10)
+
+# Persistent keep-alive session shared by the Home Assistant requests
+_ha_session = None
+_ha_session_lock = threading.Lock()
+# Home Assistant metadata in memory, keyed by url: (fetch time, metadata)
+_ha_metadata_cache = {}
+# Running background refreshes, keyed by url
+_ha_refresh_threads = {}
+
+
+def get_ha_session() -> requests.Session:
+    """
+    Get the keep-alive HTTP session used for the Home Assistant requests.
+
+    :return: The shared session
+    :rtype: requests.Session
+    """
+    global _ha_session
+    with _ha_session_lock:
+        if _ha_session is None:
+            _ha_session = requests.Session()
+            _ha_session.headers.update({"content-type": "application/json"})
+        return _ha_session
+
+
+def fetch_ha_metadata(
+    hass_url: str,
+    long_lived_token: str,
+    logger: logging.Logger,
+    timeout: tuple | None = HA_METADATA_TIMEOUT,
+) -> dict | None:
+    """
+    Request the time zone and location of Home Assistant from its /config endpoint.
+
+    :param hass_url: The Home Assistant API url
+    :type hass_url: str
+    :param long_lived_token: The Home Assistant access token
+    :type long_lived_token: str
+    :param logger: The logger object
+    :type logger: logging.Logger
+    :param timeout: The (connect, read) timeouts in seconds
+    :type timeout: tuple, optional
+    :return: The time_zone, latitude, longitude and elevation, None on error
+    :rtype: dict
+    """
+    headers = {"Authorization": "Bearer " + long_lived_token}
+    try:
+        response = get_ha_session().get(
+            hass_url + "/config", headers=headers, timeout=timeout
+        )
+    except requests.RequestException as e:
+        logger.warning(f"Unable to reach Home Assistant at {hass_url}: {e}")
+        return None
+    if response.status_code >= 400:
+        logger.warning(
+            f"Home Assistant returned status {response.status_code} for {hass_url}/config"
+        )
+        return None
+    try:
+        config_hass = response.json()
+        return {key: config_hass[key] for key in HA_METADATA_KEYS}
+    except (ValueError, KeyError, TypeError):
+        logger.warning(f"Unexpected Home Assistant response from {hass_url}/config")
+        return None
+
+
+def _ha_metadata_cache_path(data_path: str | None) -> pathlib.Path | None:
+    if data_path is None or not pathlib.Path(data_path).is_dir():
+        return None
+    return pathlib.Path(data_path) / HA_METADATA_CACHE_FILE
+
+
+def _read_ha_metadata_cache(
+    hass_url: str, data_path: str | None, logger: logging.Logger
+) -> tuple | None:
+    cached = _ha_metadata_cache.get(hass_url)
+    if cached is not None:
+        return cached
+    cache_path = _ha_metadata_cache_path(data_path)
+    if cache_path is None or not cache_path.is_file():
+        return None
+    try:
+        with open(cache_path) as data:
+            content = json.load(data)
+        if content["hass_url"] != hass_url:
+            return None
+        cached = (float(content["fetched_at"]), content["metadata"])
+    except (OSError, ValueError, KeyError, TypeError):
+        logger.warning(f"Ignoring invalid Home Assistant metadata cache {cache_path}")
+        return None
+    _ha_metadata_cache[hass_url] = cached
+    return cached
+
+
+def _write_ha_metadata_cache(
+    hass_url: str, metadata: dict, data_path: str | None, logger: logging.Logger
+) -> None:
+    fetched_at = time.time()
+    _ha_metadata_cache[hass_url] = (fetched_at, metadata)
+    cache_path = _ha_metadata_cache_path(data_path)
+    if cache_path is None:
+        return
+    tmp_path = cache_path.with_suffix(".tmp")
+    try:
+        with open(tmp_path, "w") as data:
+            json.dump(
+                {"hass_url": hass_url, "fetched_at": fetched_at, "metadata": metadata},
+                data,
+            )
+        os.replace(tmp_path, cache_path)
+    except OSError as e:
+        logger.warning(f"Unable to save the Home Assistant metadata cache: {e}")
+
+
+def refresh_ha_metadata(
+    hass_url: str,
+    long_lived_token: str,
+    data_path: str | None,
+    logger: logging.Logger,
+    timeout: tuple | None = HA_METADATA_TIMEOUT,
+) -> threading.Thread:
+    """
+    Refresh the cached Home Assistant metadata in a background thread.
+
+    Only one refresh runs at a time for a given url.
+
+    :param hass_url: The Home Assistant API url
+    :type hass_url: str
+    :param long_lived_token: The Home Assistant access token
+    :type long_lived_token: str
+    :param data_path: The folder of the on-disk cache
+    :type data_path: str
+    :param logger: The logger object
+    :type logger: logging.Logger
+    :param timeout: The (connect, read) timeouts in seconds
+    :type timeout: tuple, optional
+    :return: The running refresh thread
+    :rtype: threading.Thread
+    """
+
+    def refresh():
+        metadata = fetch_ha_metadata(hass_url, long_lived_token, logger, timeout)
+        if metadata is not None:
+            _write_ha_metadata_cache(hass_url, metadata, data_path, logger)
+
+    with _ha_session_lock:
+        thread = _ha_refresh_threads.get(hass_url)
+        if thread is None or not thread.is_alive():
+            thread = threading.Thread(
+                target=refresh, name="ha-metadata-refresh", daemon=True
+            )
+            _ha_refresh_threads[hass_url] = thread
+            thread.start()
+    return thread
+
+
+def get_ha_metadata(
+    hass_url: str,
+    long_lived_token: str,
+    data_path: str | None,
+    logger: logging.Logger,
+    ttl: float | None = HA_METADATA_TTL,
+    timeout: tuple | None = HA_METADATA_TIMEOUT,
+) -> dict | None:
+    """
+    Get the time zone and location of Home Assistant, from the cache when possible.
+
+    A cached copy is returned at once, even when older than the TTL, in which \
+    case it is refreshed in the background. Home Assistant is only requested \
+    synchronously when no copy has ever been cached.
+
+    :param hass_url: The Home Assistant API url
+    :type hass_url: str
+    :param long_lived_token: The Home Assistant access token
+    :type long_lived_token: str
+    :param data_path: The folder of the on-disk cache
+    :type data_path: str
+    :param logger: The logger object
+    :type logger: logging.Logger
+    :param ttl: The age in seconds after which the cache is refreshed
+    :type ttl: float, optional
+    :param timeout: The (connect, read) timeouts in seconds
+    :type timeout: tuple, optional
+    :return: The time_zone, latitude, longitude and elevation, None if unavailable
+    :rtype: dict
+    """
+    cached = _read_ha_metadata_cache(hass_url, data_path, logger)
+    if cached is None:
+        metadata = fetch_ha_metadata(hass_url, long_lived_token, logger, timeout)
+        if metadata is not None:
+            _write_ha_metadata_cache(hass_url, metadata, data_path, logger)
+        return metadata
+    fetched_at, metadata = cached
+    if time.time() - fetched_at > ttl:
+        logger.debug("Refreshing the cached Home Assistant metadata in background")
+        refresh_ha_metadata(hass_url, long_lived_token, data_path, logger, timeout)
+    return metadata
+
+
 def build_secrets(
     emhass_conf: dict,
     logger: logging.Logger,
@@ -1366,17 +1946,15 @@ def build_secrets(
             ):
                 params_secrets["long_lived_token"] = os.getenv("SUPERVISOR_TOKEN", None)
                 params_secrets["hass_url"] = "http://supervisor/core/api"
-                headers = {
-                    "Authorization": "Bearer " + params_secrets["long_lived_token"],
-                    "content-type": "application/json",
-                }
-                # Obtain secrets from Home Assistant via API
+                # Obtain secrets from Home Assistant via API, or its cached copy
                 logger.debug("Obtaining secrets from Home Assistant Supervisor API")
-                response = get(
-                    (params_secrets["hass_url"] + "/config"), headers=headers
+                config_hass = get_ha_metadata(
+                    params_secrets["hass_url"],
+                    params_secrets["long_lived_token"],
+                    emhass_conf.get("data_path"),
+                    logger,
                 )
-                if response.status_code < 400:
-                    config_hass = response.json()
+                if config_hass is not None:
                     params_secrets = {
                         "hass_url": params_secrets["hass_url"],
                         "long_lived_token": params_secrets["long_lived_token"],
@@ -1495,6 +2073,7 @@ def build_params(
     :return: The built param dictionary
     :rtype: dict
     """
+    timings = timing.Timings()
     if type(params_secrets) is not dict:
         params_secrets = {}
 
@@ -1506,17 +2085,20 @@ def build_params(
     params["plant_conf"] = {}
 
     # Obtain associations to categorize parameters to their corresponding config catagories
-    if emhass_conf.get(
-        "associations_path", get_root(__file__, num_parent=2) / "data/associations.csv"
-    ).exists():
-        with emhass_conf["associations_path"].open("r") as data:
-            associations = list(csv.reader(data, delimiter=","))
-    else:
+    associations = get_associations(
+        emhass_conf.get(
+            "associations_path",
+            get_root(__file__, num_parent=2) / "data/associations.csv",
+        ),
+        logger,
+    )
+    if associations is None:
         logger.error(
             "Unable to obtain the associations file (associations.csv) in: "
             + str(emhass_conf["associations_path"])
         )
         return False
+    timings.mark("associations")
 
     # Association file key reference
     # association[0] = config catagories
@@ -1524,7 +2106,7 @@ def build_params(
     # association[2] = parameter (config.json/config_defaults.json)
     # association[3] = parameter list name if exists (not used, from legacy options.json)
     # Use association list to append parameters from config into params (with corresponding config catagories)
-    for association in associations:
+    for association in associations["rows"]:
         # If parameter has list_ name and parameter in config is presented with its list name
         # (ie, config parameter is in legacy options.json format)
         if len(association) == 4 and config.get(association[3], None) is not None:
@@ -1647,6 +2229,7 @@ def build_params(
             )
     else:
         logger.warning("unable to obtain parameter: historic_days_to_retrieve")
+    timings.mark("config")
 
     # Configure secrets, set params to correct config categorie
     # retrieve_hass_conf
@@ -1712,6 +2295,8 @@ def build_params(
         "beta": None,
         "ignore_pv_feedback_during_curtailment": None,
     }
+    timings.mark("secrets")
+    last_timings["build_params"] = timings.log(logger, "build_params")
 
     return params
 
@@ -1768,6 +2353,99 @@ def get_days_list(days_to_retrieve: int) -> pd.date_range:
     return days_list
 
 
+# Date features computed per index: (index values hash, features) -> read-only arrays
+_date_features_cache = {}
+_date_features_cache_stats = metrics.register_cache("date_features")
+DATE_FEATURES_CACHE_SIZE = 16
+DATE_FEATURES = ("year", "month", "day_of_week", "day_of_year", "day", "hour")
+
+
+def _civil_from_days(days: np.ndarray) -> tuple:
+    """Convert days since 1970-01-01 to (year, month, day), proleptic Gregorian calendar."""
+    days = days + 719468
+    era = np.floor_divide(days, 146097)
+    day_of_era = days - era * 146097
+    year_of_era = (
+        day_of_era - day_of_era // 1460 + day_of_era // 36524 - day_of_era // 146096
+    ) // 365
+    day_of_year = day_of_era - (365 * year_of_era + year_of_era // 4 - year_of_era // 100)
+    month_index = (5 * day_of_year + 2) // 153
+    day = day_of_year - (153 * month_index + 2) // 5 + 1
+    month = np.where(month_index < 10, month_index + 3, month_index - 9)
+    year = year_of_era + era * 400 + (month <= 2)
+    return year, month, day
+
+
+def get_date_features(
+    index: pd.DatetimeIndex, date_features: list[str] | None = None
+) -> pd.DataFrame:
+    """
+    Compute date-related features from a DateTimeIndex.
+
+    The features are computed with integer arithmetic on the local epoch seconds \
+    and cached per index values and feature list, so repeated calls on the same \
+    history skip the work. The returned columns share the cached read-only arrays.
+
+    :param index: The DateTimeIndex, the features of an aware index use its local time
+    :type index: pd.DatetimeIndex
+    :param date_features: List of date features to extract (default: all).
+    :type date_features: Optional[List[str]]
+    :return: A DataFrame with one column per date feature, on the same index.
+    :rtype: pd.DataFrame
+    """
+    date_features = tuple(date_features or DATE_FEATURES)
+    local_dates = index.tz_localize(None) if index.tz is not None else index
+    seconds = local_dates.to_numpy().astype("datetime64[s]").astype(np.int64)
+    # A collision of the builtin hash would return the features of another index
+    digest = hashlib.blake2b(seconds.tobytes(), digest_size=16).digest()
+    key = (digest, len(seconds), date_features)
+    features = _date_features_cache.get(key)
+    if features is None:
+        _date_features_cache_stats.miss()
+        if index.hasnans:
+            # The NaT dates give NaN features, as with the pandas accessors
+            features = {
+                name: getattr(local_dates, name).to_numpy()
+                for name in date_features
+                if name in DATE_FEATURES
+            }
+        else:
+            days, seconds_of_day = np.divmod(seconds, 86400)
+            year, month, day = _civil_from_days(days)
+            computed = {
+                "year": year,
+                "month": month,
+                # 1970-01-01 was a Thursday
+                "day_of_week": (days + 3) % 7,
+                "day_of_year": days - _days_from_civil_new_year(year) + 1,
+                "day": day,
+                "hour": seconds_of_day // 3600,
+            }
+            features = {
+                name: computed[name].astype(np.int32)
+                for name in date_features
+                if name in computed
+            }
+        for values in features.values():
+            values.flags.writeable = False
+        if len(_date_features_cache) >= DATE_FEATURES_CACHE_SIZE:
+            _date_features_cache.pop(next(iter(_date_features_cache)))
+        _date_features_cache[key] = features
+    else:
+        _date_features_cache_stats.hit()
+    return pd.DataFrame(features, index=index, copy=False)
+
+
+def _days_from_civil_new_year(year: np.ndarray) -> np.ndarray:
+    """Days since 1970-01-01 of the 1st of January of each year."""
+    year = year - 1
+    era = np.floor_divide(year, 400)
+    year_of_era = year - era * 400
+    # The 1st of January is day 306 of the year starting on the 1st of March
+    day_of_era = 365 * year_of_era + year_of_era // 4 - year_of_era // 100 + 306
+    return era * 146097 + day_of_era - 719468
+
+
 def add_date_features(
     data: pd.DataFrame,
     timestamp: str | None = None,
@@ -1775,6 +2453,9 @@ def add_date_features(
 ) -> pd.DataFrame:
     """Add date-related features from a DateTimeIndex or a timestamp column.
 
+    The input data is not copied, the returned DataFrame is a shallow copy with \
+    the feature columns added (see get_date_features).
+
     :param data: The input DataFrame.
     :type data: pd.DataFrame
     :param timestamp: The column containing the timestamp (optional if DataFrame has a DateTimeIndex).
@@ -1785,16 +2466,12 @@ def add_date_features(
     :rtype: pd.DataFrame
     """
 
-    df = copy.deepcopy(data)  # Avoid modifying the original DataFrame
-
-    # If no specific features are requested, extract all by default
-    default_features = ["year", "month", "day_of_week", "day_of_year", "day", "hour"]
-    date_features = date_features or default_features
+    df = data.copy(deep=False)  # Avoid modifying the original DataFrame
 
     # Determine whether to use index or a timestamp column
     if timestamp:
         df[timestamp] = pd.to_datetime(df[timestamp], utc=True)
-        source = df[timestamp].dt
+        source = pd.DatetimeIndex(df[timestamp])
     else:
         if not isinstance(df.index, pd.DatetimeIndex):
             raise ValueError(
@@ -1802,36 +2479,42 @@ def add_date_features(
             )
         source = df.index
 
-    # Extract date features
-    if "year" in date_features:
-        df["year"] = source.year
-    if "month" in date_features:
-        df["month"] = source.month
-    if "day_of_week" in date_features:
-        df["day_of_week"] = source.dayofweek
-    if "day_of_year" in date_features:
-        df["day_of_year"] = source.dayofyear
-    if "day" in date_features:
-        df["day"] = source.day
-    if "hour" in date_features:
-        df["hour"] = source.hour
+    # Extract date features, copied as the cached arrays are read-only
+    features = get_date_features(source, date_features)
+    for name in features.columns:
+        df[name] = features[name].to_numpy().copy()
 
     return df
 
 
-def set_df_index_freq(df: pd.DataFrame) -> pd.DataFrame:
+def set_df_index_freq(
+    df: pd.DataFrame, logger: logging.Logger | None = None
+) -> pd.DataFrame:
     """
     Set the freq of a DataFrame DateTimeIndex.
 
+    The NaT, duplicated and off-grid dates are dropped and the missing steps \
+    added as NaN rows, see time_index.regularize_index for the statistics. \
+    The dropped and filled counts are logged at WARNING when not zero.
+
     :param df: Input DataFrame
     :type df: pd.DataFrame
+    :param logger: The logger, the logger of this module by default
+    :type logger: logging.Logger, optional
     :return: Input DataFrame with freq defined
     :rtype: pd.DataFrame
 
     """
-    idx_diff = np.diff(df.index)
-    # Sometimes there are zero values in this list.
-    idx_diff = idx_diff[np.nonzero(idx_diff)]
-    sampling = pd.to_timedelta(np.median(idx_diff))
-    df = df[~df.index.duplicated()]
-    return df.asfreq(sampling)
+    df, stats = time_index.regularize_index(df)
+    dropped = stats["nat"] + stats["duplicates"] + stats["off_grid"]
+    if dropped or stats["missing_steps"]:
+        (logger or logging.getLogger(__name__)).warning(
+            "Irregular time index: dropped %s NaT, %s duplicated and %s off-grid dates, "
+            "filled %s missing steps in %s gaps",
+            stats["nat"],
+            stats["duplicates"],
+            stats["off_grid"],
+            stats["missing_steps"],
+            stats["gaps"],
+        )
+    return df
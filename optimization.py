@@ -1,8 +1,10 @@
 import bz2
-import copy
+import itertools
 import logging
 import os
 import pickle as cPickle
+import re
+import tempfile
 from math import ceil
 
 import numpy as np
@@ -10,6 +12,57 @@ import pandas as pd
 import pulp as plp
 from pulp import COIN_CMD, GLPK_CMD, PULP_CBC_CMD, HiGHS
 
+from emhass import metrics, profiling
+from emhass.logging_utils import Lazy
+from emhass.memory import MemoryReport
+from emhass.timing import Timings
+
+
+def _constraint_family(name: str) -> str:
+    """
+    Get the family of a constraint, its name without the timestep suffixes.
+
+    :param name: The constraint name
+    :type name: str
+    :return: The family name
+    :rtype: str
+    """
+    return re.sub(r"(_\d+)+$", "", name).removeprefix("constraint_")
+
+
+class ModelConstraints(dict):
+    r"""
+    The constraints of the optimization model, added family by family.
+
+    In low memory mode the constraints are keyed by short index names instead \
+    of their descriptive names, and the rows of each family are counted for the \
+    solve statistics. With a memory report, the memory allocated to build each \
+    family is charged to it on ``update``.
+
+    :param low_memory: Key the constraints by index
+    :type low_memory: bool
+    :param memory: The memory report of the optimization
+    :type memory: MemoryReport, optional
+    """
+
+    def __init__(self, low_memory: bool = False, memory: MemoryReport | None = None):
+        super().__init__()
+        self.low_memory = low_memory
+        self.memory = memory
+        self.families = {}
+
+    def update(self, constraints: dict) -> None:
+        if self.memory is not None and constraints:
+            # The family was built before the call
+            self.memory.family(_constraint_family(next(iter(constraints))))
+        if not self.low_memory:
+            super().update(constraints)
+            return
+        for name, constraint in constraints.items():
+            family = _constraint_family(name)
+            self.families[family] = self.families.get(family, 0) + 1
+            self[f"c{len(self)}"] = constraint
+
 
 class Optimization:
     r"""
@@ -27,6 +80,8 @@ class Optimization:
 
     - perform_naive_mpc_optim
 
+    - perform_ev_session_update
+
     """
 
     def __init__(
@@ -86,6 +141,19 @@ class Optimization:
         self.var_load_cost = var_load_cost
         self.var_prod_price = var_prod_price
         self.optim_status = None
+        # Inputs and results of the last optimization, reused by the EV session updates
+        self.last_optim_inputs = None
+        self.last_optim_results = None
+        # Durations of the phases of the last optimization, in milliseconds
+        self.last_timings = None
+        # Model size and solver statistics of the last MILP solve
+        self.last_solve_stats = None
+        # Memory traced in the phases of the last optimization, with memory_report
+        self.last_memory_report = None
+        self.ev_sessions = {}
+        # EV powers fixed at the start of the horizon by a session update, by EV index
+        self.ev_fixed_power = {}
+        self.feasibility_diagnostics = []
         if "num_threads" in optim_conf.keys():
             if optim_conf["num_threads"] == 0:
                 self.num_threads = int(os.cpu_count())
@@ -112,15 +180,49 @@ class Optimization:
                 "lp_solver=COIN_CMD but lp_solver_path=empty, attempting to use lp_solver_path=/usr/bin/cbc"
             )
             self.lp_solver_path = "/usr/bin/cbc"
+        if "optimization_engine" in optim_conf.keys():
+            self.optimization_engine = optim_conf["optimization_engine"]
+        else:
+            self.optimization_engine = "milp"
+        if self.optimization_engine not in ["milp", "greedy", "auto"]:
+            self.logger.warning(
+                "Optimization engine %s unknown, using milp", self.optimization_engine
+            )
+            self.optimization_engine = "milp"
+        if "feasibility_check" in optim_conf.keys():
+            self.feasibility_check = optim_conf["feasibility_check"]
+        else:
+            self.feasibility_check = "warn"
+        if self.feasibility_check not in ["warn", "reject", "relax"]:
+            self.logger.warning(
+                "Feasibility check %s unknown, using warn", self.feasibility_check
+            )
+            self.feasibility_check = "warn"
+        # Short model names and an LP file for the solver, for the small hosts
+        self.low_memory_mode = optim_conf.get("low_memory_mode", False)
+        self.memory_report = optim_conf.get("memory_report", False)
+        # Serve the metrics of this process, started by the first optimization
+        if optim_conf.get("metrics_port"):
+            try:
+                metrics.ensure_http_server(int(optim_conf["metrics_port"]))
+            except OSError as e:
+                # The metrics never block the optimization
+                self.logger.warning(
+                    "Unable to serve the metrics on port %s: %s",
+                    optim_conf["metrics_port"],
+                    e,
+                )
         self.logger.debug(
-            f"Initialized Optimization with retrieve_hass_conf: {retrieve_hass_conf}"
+            "Initialized Optimization with retrieve_hass_conf: %s", retrieve_hass_conf
         )
-        self.logger.debug(f"Optimization configuration: {optim_conf}")
-        self.logger.debug(f"Plant configuration: {plant_conf}")
+        self.logger.debug("Optimization configuration: %s", optim_conf)
+        self.logger.debug("Plant configuration: %s", plant_conf)
         self.logger.debug(
-            f"Solver configuration: lp_solver={self.lp_solver}, lp_solver_path={self.lp_solver_path}"
+            "Solver configuration: lp_solver=%s, lp_solver_path=%s",
+            self.lp_solver,
+            self.lp_solver_path,
         )
-        self.logger.debug(f"Number of threads: {self.num_threads}")
+        self.logger.debug("Number of threads: %s", self.num_threads)
 
     def perform_optimization(
         self,
@@ -176,6 +278,55 @@ class Optimization:
             optimization appended
         :rtype: pd.DataFrame
 
+        """
+        timings = Timings(MemoryReport() if self.memory_report else None)
+        optim_conf = self.optim_conf
+        try:
+            return self._perform_optimization(
+                timings,
+                data_opt,
+                P_PV,
+                P_load,
+                unit_load_cost,
+                unit_prod_price,
+                soc_init,
+                soc_final,
+                def_total_hours,
+                def_total_timestep,
+                def_start_timestep,
+                def_end_timestep,
+                debug,
+            )
+        finally:
+            # The requirements relaxed by the feasibility check only apply to this call
+            self.optim_conf = optim_conf
+            # Stop tracing when the build or the solve raised
+            if timings.memory is not None:
+                timings.memory.stop()
+
+    def _perform_optimization(
+        self,
+        timings: Timings,
+        data_opt: pd.DataFrame,
+        P_PV: np.array,
+        P_load: np.array,
+        unit_load_cost: np.array,
+        unit_prod_price: np.array,
+        soc_init: float | None,
+        soc_final: float | None,
+        def_total_hours: list | None,
+        def_total_timestep: list | None,
+        def_start_timestep: list | None,
+        def_end_timestep: list | None,
+        debug: bool | None,
+    ) -> pd.DataFrame:
+        """
+        Build, solve and extract the MILP problem, see ``perform_optimization``.
+
+        :param timings: The timings (and memory report) of the phases
+        :type timings: Timings
+        :return: The input DataFrame with the optimization results appended
+        :rtype: pd.DataFrame
         """
         # Prepare some data in the case of a battery
         if self.optim_conf["set_use_battery"]:
@@ -190,7 +341,9 @@ class Optimization:
                 else:
                     soc_final = self.plant_conf["battery_target_state_of_charge"]
             self.logger.debug(
-                f"Battery usage enabled. Initial SOC: {soc_init}, Final SOC: {soc_final}"
+                "Battery usage enabled. Initial SOC: %s, Final SOC: %s",
+                soc_init,
+                soc_final,
             )
 
         # If def_total_timestep os set, bypass def_total_hours
@@ -227,12 +380,97 @@ class Optimization:
             num_deferrable_loads - len(def_end_timestep)
         )
 
+        # Check the requirements can be reached before building the model
+        self.feasibility_diagnostics = self.check_feasibility(
+            P_PV,
+            P_load,
+            def_total_hours,
+            def_total_timestep,
+            def_start_timestep,
+            def_end_timestep,
+            len(data_opt.index),
+        )
+        for diagnostic in self.feasibility_diagnostics:
+            self.logger.warning(
+                "Unreachable requirement for %s: %s of %.3f at timestep %s, at most %.3f reachable",
+                diagnostic["load"],
+                diagnostic["requirement"],
+                diagnostic["required"],
+                diagnostic["timestep"],
+                diagnostic["reachable"],
+            )
+        if self.feasibility_diagnostics:
+            if self.feasibility_check == "reject":
+                self.logger.error("Optimization rejected, the requirements cannot be met")
+                self.optim_status = "Infeasible"
+                self.last_optim_results = None
+                timings.mark("inputs")
+                self._set_timings(timings)
+                return
+            elif self.feasibility_check == "relax":
+                self.logger.warning("Relaxing the requirements to the reachable values")
+                def_total_hours = list(def_total_hours)
+                if def_total_timestep is not None:
+                    def_total_timestep = list(def_total_timestep)
+                # Restored by perform_optimization once the call returns
+                self.optim_conf = dict(self.optim_conf)
+                self.relax_requirements(
+                    self.feasibility_diagnostics, def_total_hours, def_total_timestep
+                )
+
+        self.last_optim_inputs = {
+            "data_opt": data_opt,
+            "P_PV": P_PV,
+            "P_load": P_load,
+            "unit_load_cost": unit_load_cost,
+            "unit_prod_price": unit_prod_price,
+            "soc_init": soc_init,
+            "soc_final": soc_final,
+            "def_total_hours": def_total_hours,
+            "def_total_timestep": def_total_timestep,
+            "def_start_timestep": def_start_timestep,
+            "def_end_timestep": def_end_timestep,
+        }
+
+        # Use the greedy engine when selected (or auto-detected) and the problem allows it
+        if self.optimization_engine in ["greedy", "auto"]:
+            greedy_applicable, reason = self.check_greedy_applicable(
+                unit_load_cost, unit_prod_price
+            )
+            if greedy_applicable:
+                self.last_optim_results = self.perform_greedy_optimization(
+                    data_opt,
+                    P_PV,
+                    P_load,
+                    unit_load_cost,
+                    unit_prod_price,
+                    def_total_hours=def_total_hours,
+                    def_total_timestep=def_total_timestep,
+                    def_start_timestep=def_start_timestep,
+                    def_end_timestep=def_end_timestep,
+                )
+                timings.mark("greedy")
+                self._set_timings(timings, self.last_optim_results)
+                return self.last_optim_results
+            elif self.optimization_engine == "greedy":
+                self.logger.warning(
+                    "Greedy engine not applicable (%s), using the MILP engine", reason
+                )
+            else:
+                self.logger.debug("Greedy engine not applicable: %s", reason)
+        timings.mark("inputs")
+
         #### The LP problem using Pulp ####
         opt_model = plp.LpProblem("LP_Model", plp.LpMaximize)
 
         n = len(data_opt.index)
         set_I = range(n)
         M = 10e10
+        # In low memory mode the variables get short index names
+        var_index = itertools.count()
+
+        def var_name(name: str) -> str:
+            return f"x{next(var_index)}" if self.low_memory_mode else name
 
         ## Add decision variables
         P_grid_neg = {
@@ -240,7 +478,7 @@ class Optimization:
                 cat="Continuous",
                 lowBound=-self.plant_conf["maximum_power_to_grid"],
                 upBound=0,
-                name=f"P_grid_neg{i}",
+                name=var_name(f"P_grid_neg{i}"),
             )
             for i in set_I
         }
@@ -249,7 +487,7 @@ class Optimization:
                 cat="Continuous",
                 lowBound=0,
                 upBound=self.plant_conf["maximum_power_from_grid"],
-                name=f"P_grid_pos{i}",
+                name=var_name(f"P_grid_pos{i}"),
             )
             for i in set_I
         }
@@ -268,7 +506,7 @@ class Optimization:
                 P_deferrable.append(
                     {
                         (i): plp.LpVariable(
-                            cat="Continuous", name=f"P_deferrable{k}_{i}"
+                            cat="Continuous", name=var_name(f"P_deferrable{k}_{i}")
                         )
                         for i in set_I
                     }
@@ -280,14 +518,14 @@ class Optimization:
                             cat="Continuous",
                             lowBound=0,
                             upBound=upBound,
-                            name=f"P_deferrable{k}_{i}",
+                            name=var_name(f"P_deferrable{k}_{i}"),
                         )
                         for i in set_I
                     }
                 )
             P_def_bin1.append(
                 {
-                    (i): plp.LpVariable(cat="Binary", name=f"P_def{k}_bin1_{i}")
+                    (i): plp.LpVariable(cat="Binary", name=var_name(f"P_def{k}_bin1_{i}"))
                     for i in set_I
                 }
             )
@@ -296,25 +534,25 @@ class Optimization:
         for k in range(self.optim_conf["number_of_deferrable_loads"]):
             P_def_start.append(
                 {
-                    (i): plp.LpVariable(cat="Binary", name=f"P_def{k}_start_{i}")
+                    (i): plp.LpVariable(cat="Binary", name=var_name(f"P_def{k}_start_{i}"))
                     for i in set_I
                 }
             )
             P_def_bin2.append(
                 {
-                    (i): plp.LpVariable(cat="Binary", name=f"P_def{k}_bin2_{i}")
+                    (i): plp.LpVariable(cat="Binary", name=var_name(f"P_def{k}_bin2_{i}"))
                     for i in set_I
                 }
             )
-        D = {(i): plp.LpVariable(cat="Binary", name=f"D_{i}") for i in set_I}
-        E = {(i): plp.LpVariable(cat="Binary", name=f"E_{i}") for i in set_I}
+        D = {(i): plp.LpVariable(cat="Binary", name=var_name(f"D_{i}")) for i in set_I}
+        E = {(i): plp.LpVariable(cat="Binary", name=var_name(f"E_{i}")) for i in set_I}
         if self.optim_conf["set_use_battery"]:
             P_sto_pos = {
                 (i): plp.LpVariable(
                     cat="Continuous",
                     lowBound=0,
                     upBound=self.plant_conf["battery_discharge_power_max"],
-                    name=f"P_sto_pos_{i}",
+                    name=var_name(f"P_sto_pos_{i}"),
                 )
                 for i in set_I
             }
@@ -323,7 +561,7 @@ class Optimization:
                     cat="Continuous",
                     lowBound=-self.plant_conf["battery_charge_power_max"],
                     upBound=0,
-                    name=f"P_sto_neg_{i}",
+                    name=var_name(f"P_sto_neg_{i}"),
                 )
                 for i in set_I
             }
@@ -336,25 +574,20 @@ class Optimization:
         P_ev = []
         SOC_ev = []
         P_ev_bin = []
+        # The compact encoding bounds the cumulated charging power instead of the SOC
+        ev_compact_soc = self.optim_conf.get("ev_compact_soc_encoding", False)
 
         for k in range(num_ev_loads):
-            # EV charging power variables (0 to nominal power)
+            # EV charging power variables (0 to nominal power), the fixed powers of
+            # a session update are both bounds
+            P_ev_max = self.optim_conf["ev_nominal_charging_power"][k]
+            P_ev_fixed = np.clip(self.ev_fixed_power.get(k, []), 0, P_ev_max)
             P_ev.append({
                 (i): plp.LpVariable(
                     cat="Continuous",
-                    lowBound=0,
-                    upBound=self.optim_conf["ev_nominal_charging_power"][k],
-                    name=f"P_ev{k}_{i}"
-                ) for i in set_I
-            })
-
-            # EV State of Charge variables (0 to 1)
-            SOC_ev.append({
-                (i): plp.LpVariable(
-                    cat="Continuous",
-                    lowBound=0,
-                    upBound=1,
-                    name=f"SOC_ev{k}_{i}"
+                    lowBound=P_ev_fixed[i] if i < len(P_ev_fixed) else 0,
+                    upBound=P_ev_fixed[i] if i < len(P_ev_fixed) else P_ev_max,
+                    name=var_name(f"P_ev{k}_{i}")
                 ) for i in set_I
             })
 
@@ -362,24 +595,37 @@ class Optimization:
             P_ev_bin.append({
                 (i): plp.LpVariable(
                     cat="Binary",
-                    name=f"P_ev{k}_bin_{i}"
+                    name=var_name(f"P_ev{k}_bin_{i}")
                 ) for i in set_I
             })
 
+            # EV State of Charge variables (0 to 1), not needed by the compact encoding
+            if not ev_compact_soc:
+                SOC_ev.append({
+                    (i): plp.LpVariable(
+                        cat="Continuous",
+                        lowBound=0,
+                        upBound=1,
+                        name=var_name(f"SOC_ev{k}_{i}")
+                    ) for i in set_I
+                })
+
         if self.costfun == "self-consumption":
-            SC = {(i): plp.LpVariable(cat="Continuous", name=f"SC_{i}") for i in set_I}
+            SC = {(i): plp.LpVariable(cat="Continuous", name=var_name(f"SC_{i}")) for i in set_I}
         if self.plant_conf["inverter_is_hybrid"]:
             P_hybrid_inverter = {
-                (i): plp.LpVariable(cat="Continuous", name=f"P_hybrid_inverter{i}")
+                (i): plp.LpVariable(cat="Continuous", name=var_name(f"P_hybrid_inverter{i}"))
                 for i in set_I
             }
         P_PV_curtailment = {
             (i): plp.LpVariable(
-                cat="Continuous", lowBound=0, name=f"P_PV_curtailment{i}"
+                cat="Continuous", lowBound=0, name=var_name(f"P_PV_curtailment{i}")
             )
             for i in set_I
         }
 
+        timings.mark("variables")
+
         ## Define objective
         P_def_sum = []
         for i in set_I:
@@ -482,54 +728,62 @@ class Optimization:
                     )
 
         opt_model.setObjective(objective)
+        timings.mark("objective")
 
         ## Setting constraints
+        constraints = ModelConstraints(self.low_memory_mode, timings.memory)
         # The main constraint: power balance
         if self.plant_conf["inverter_is_hybrid"]:
-            constraints = {
-                f"constraint_main1_{i}": plp.LpConstraint(
-                    e=P_hybrid_inverter[i]
-                    - P_def_sum[i]
-                    - P_load[i]
-                    + P_grid_neg[i]
-                    + P_grid_pos[i],
-                    sense=plp.LpConstraintEQ,
-                    rhs=0,
-                )
-                for i in set_I
-            }
-        else:
-            if self.plant_conf["compute_curtailment"]:
-                constraints = {
-                    f"constraint_main2_{i}": plp.LpConstraint(
-                        e=P_PV[i]
-                        - P_PV_curtailment[i]
+            constraints.update(
+                {
+                    f"constraint_main1_{i}": plp.LpConstraint(
+                        e=P_hybrid_inverter[i]
                         - P_def_sum[i]
                         - P_load[i]
                         + P_grid_neg[i]
-                        + P_grid_pos[i]
-                        + P_sto_pos[i]
-                        + P_sto_neg[i],
+                        + P_grid_pos[i],
                         sense=plp.LpConstraintEQ,
                         rhs=0,
                     )
                     for i in set_I
                 }
+            )
+        else:
+            if self.plant_conf["compute_curtailment"]:
+                constraints.update(
+                    {
+                        f"constraint_main2_{i}": plp.LpConstraint(
+                            e=P_PV[i]
+                            - P_PV_curtailment[i]
+                            - P_def_sum[i]
+                            - P_load[i]
+                            + P_grid_neg[i]
+                            + P_grid_pos[i]
+                            + P_sto_pos[i]
+                            + P_sto_neg[i],
+                            sense=plp.LpConstraintEQ,
+                            rhs=0,
+                        )
+                        for i in set_I
+                    }
+                )
             else:
-                constraints = {
-                    f"constraint_main3_{i}": plp.LpConstraint(
-                        e=P_PV[i]
-                        - P_def_sum[i]
-                        - P_load[i]
-                        + P_grid_neg[i]
-                        + P_grid_pos[i]
-                        + P_sto_pos[i]
-                        + P_sto_neg[i],
-                        sense=plp.LpConstraintEQ,
-                        rhs=0,
-                    )
-                    for i in set_I
-                }
+                constraints.update(
+                    {
+                        f"constraint_main3_{i}": plp.LpConstraint(
+                            e=P_PV[i]
+                            - P_def_sum[i]
+                            - P_load[i]
+                            + P_grid_neg[i]
+                            + P_grid_pos[i]
+                            + P_sto_pos[i]
+                            + P_sto_neg[i],
+                            sense=plp.LpConstraintEQ,
+                            rhs=0,
+                        )
+                        for i in set_I
+                    }
+                )
 
         if self.plant_conf["inverter_is_hybrid"]:
             P_nom_inverter_output = self.plant_conf.get("inverter_ac_output_max", None)
@@ -590,7 +844,7 @@ class Optimization:
                     cat="Continuous",
                     lowBound=0,
                     upBound=P_dc_ac_max,
-                    name=f"P_dc_ac_{i}",
+                    name=var_name(f"P_dc_ac_{i}"),
                 )
                 for i in set_I
             }
@@ -599,13 +853,13 @@ class Optimization:
                     cat="Continuous",
                     lowBound=0,
                     upBound=P_ac_dc_max,
-                    name=f"P_ac_dc_{i}",
+                    name=var_name(f"P_ac_dc_{i}"),
                 )
                 for i in set_I
             }
             # Binary variable to enforce unidirectional flow
             is_dc_sourcing = {
-                (i): plp.LpVariable(cat="Binary", name=f"is_dc_sourcing_{i}")
+                (i): plp.LpVariable(cat="Binary", name=var_name(f"is_dc_sourcing_{i}"))
                 for i in set_I
             }
 
@@ -633,7 +887,7 @@ class Optimization:
                     {
                         f"constraint_ac_bus_balance_{i}": plp.LpConstraint(
                             e=P_hybrid_inverter[i]
-                            - ((P_dc_ac[i] * eff_dc_ac) - (P_ac_dc[i] / eff_ac_dc)),
+                            - ((P_dc_ac[i] * eff_dc_ac) - (P_ac_dc[i] * (1 / eff_ac_dc))),
                             sense=plp.LpConstraintEQ,
                             rhs=0,
                         )
@@ -719,12 +973,14 @@ class Optimization:
         # Treat deferrable loads constraints
         predicted_temps = {}
         for k in range(self.optim_conf["number_of_deferrable_loads"]):
-            self.logger.debug(f"Processing deferrable load {k}")
+            self.logger.debug("Processing deferrable load %s", k)
             if isinstance(
                 self.optim_conf["nominal_power_of_deferrable_loads"][k], list
             ):
                 self.logger.debug(
-                    f"Load {k} is sequence-based. Sequence: {self.optim_conf['nominal_power_of_deferrable_loads'][k]}"
+                    "Load %s is sequence-based. Sequence: %s",
+                    k,
+                    self.optim_conf["nominal_power_of_deferrable_loads"][k],
                 )
                 # Constraint for sequence of deferrable
                 # WARNING: This is experimental, formulation seems correct but feasibility problems.
@@ -744,7 +1000,9 @@ class Optimization:
                     f"y{k}", (i for i in range(len(matrix))), cat="Binary"
                 )
                 self.logger.debug(
-                    f"Load {k}: Created binary variables for sequence placement: y = {list(y.keys())}"
+                    "Load %s: Created binary variables for sequence placement: y = %s",
+                    k,
+                    Lazy(list, y.keys()),
                 )
                 constraints.update(
                     {
@@ -784,7 +1042,7 @@ class Optimization:
                             for i in set_I
                         }
                     )
-                self.logger.debug(f"Load {k}: Sequence-based constraints set.")
+                self.logger.debug("Load %s: Sequence-based constraints set.", k)
 
             # --- Thermal deferrable load logic first ---
             elif (
@@ -792,7 +1050,7 @@ class Optimization:
                 and len(self.optim_conf["def_load_config"]) > k
                 and "thermal_config" in self.optim_conf["def_load_config"][k]
             ):
-                self.logger.debug(f"Load {k} is a thermal deferrable load.")
+                self.logger.debug("Load %s is a thermal deferrable load.", k)
                 def_load_config = self.optim_conf["def_load_config"][k]
                 if def_load_config and "thermal_config" in def_load_config:
                     hc = def_load_config["thermal_config"]
@@ -808,7 +1066,12 @@ class Optimization:
                     sense_coeff = 1 if sense == "heat" else -1
 
                     self.logger.debug(
-                        f"Load {k}: Thermal parameters: start_temperature={start_temperature}, cooling_constant={cooling_constant}, heating_rate={heating_rate}, overshoot_temperature={overshoot_temperature}"
+                        "Load %s: Thermal parameters: start_temperature=%s, cooling_constant=%s, heating_rate=%s, overshoot_temperature=%s",
+                        k,
+                        start_temperature,
+                        cooling_constant,
+                        heating_rate,
+                        overshoot_temperature,
                     )
 
                     predicted_temp = [start_temperature]
@@ -836,7 +1099,7 @@ class Optimization:
                             )
                         )
 
-                        is_overshoot = plp.LpVariable(f"defload_{k}_overshoot_{Id}")
+                        is_overshoot = plp.LpVariable(var_name(f"defload_{k}_overshoot_{Id}"))
                         constraints.update(
                             {
                                 f"constraint_defload{k}_overshoot_{Id}_1": plp.LpConstraint(
@@ -877,7 +1140,7 @@ class Optimization:
                                 * sense_coeff
                             )
                             penalty_var = plp.LpVariable(
-                                f"defload_{k}_thermal_penalty_{Id}",
+                                var_name(f"defload_{k}_thermal_penalty_{Id}"),
                                 cat="Continuous",
                                 upBound=0,
                             )
@@ -893,16 +1156,18 @@ class Optimization:
                             opt_model.setObjective(opt_model.objective + penalty_var)
 
                     predicted_temps[k] = predicted_temp
-                    self.logger.debug(f"Load {k}: Thermal constraints set.")
+                    self.logger.debug("Load %s: Thermal constraints set.", k)
 
             # --- Standard/non-thermal deferrable load logic comes after thermal ---
             elif (def_total_timestep and def_total_timestep[k] > 0) or (
                 len(def_total_hours) > k and def_total_hours[k] > 0
             ):
-                self.logger.debug(f"Load {k} is standard/non-thermal.")
+                self.logger.debug("Load %s is standard/non-thermal.", k)
                 if def_total_timestep and def_total_timestep[k] > 0:
                     self.logger.debug(
-                        f"Load {k}: Using total timesteps constraint: {def_total_timestep[k]}"
+                        "Load %s: Using total timesteps constraint: %s",
+                        k,
+                        def_total_timestep[k],
                     )
                     constraints.update(
                         {
@@ -920,7 +1185,9 @@ class Optimization:
                     )
                 else:
                     self.logger.debug(
-                        f"Load {k}: Using total hours constraint: {def_total_hours[k]}"
+                        "Load %s: Using total hours constraint: %s",
+                        k,
+                        def_total_hours[k],
                     )
                     constraints.update(
                         {
@@ -936,11 +1203,14 @@ class Optimization:
                             )
                         }
                     )
-                self.logger.debug(f"Load {k}: Standard load constraints set.")
+                self.logger.debug("Load %s: Standard load constraints set.", k)
 
             # Ensure deferrable loads consume energy between def_start_timestep & def_end_timestep
             self.logger.debug(
-                f"Deferrable load {k}: Proposed optimization window: {def_start_timestep[k]} --> {def_end_timestep[k]}"
+                "Deferrable load %s: Proposed optimization window: %s --> %s",
+                k,
+                def_start_timestep[k],
+                def_end_timestep[k],
             )
             if def_total_timestep and def_total_timestep[k] > 0:
                 def_start, def_end, warning = Optimization.validate_def_timewindow(
@@ -957,9 +1227,12 @@ class Optimization:
                     n,
                 )
             if warning is not None:
-                self.logger.warning(f"Deferrable load {k} : {warning}")
+                self.logger.warning("Deferrable load %s : %s", k, warning)
             self.logger.debug(
-                f"Deferrable load {k}: Validated optimization window: {def_start} --> {def_end}"
+                "Deferrable load %s: Validated optimization window: %s --> %s",
+                k,
+                def_start,
+                def_end,
             )
             if def_start > 0:
                 constraints.update(
@@ -991,7 +1264,11 @@ class Optimization:
             # Constraint for the minimum power of deferrable loads using the big-M method.
             # This enforces: P_deferrable = 0 OR P_deferrable >= min_power.
             if min_power_of_deferrable_loads[k] > 0:
-                self.logger.debug(f"Applying minimum power constraint for deferrable load {k}: {min_power_of_deferrable_loads[k]} W")
+                self.logger.debug(
+                    "Applying minimum power constraint for deferrable load %s: %s W",
+                    k,
+                    min_power_of_deferrable_loads[k],
+                )
                 constraints.update(
                     {
                         f"constraint_pdef{k}_min_power_{i}": plp.LpConstraint(
@@ -1222,16 +1499,19 @@ class Optimization:
                     for i in set_I
                 }
             )
+            # The energy stored up to each timestep makes these rows quadratic in the
+            # horizon, their terms are built directly with shared coefficients
+            def stored_energy_terms(i: int, sign: int):
+                coef_pos = sign / self.plant_conf["battery_discharge_efficiency"]
+                coef_neg = sign * self.plant_conf["battery_charge_efficiency"]
+                for j in range(i):
+                    yield P_sto_pos[j], coef_pos
+                    yield P_sto_neg[j], coef_neg
+
             constraints.update(
                 {
                     f"constraint_socmax_{i}": plp.LpConstraint(
-                        e=-plp.lpSum(
-                            P_sto_pos[j]
-                            * (1 / self.plant_conf["battery_discharge_efficiency"])
-                            + self.plant_conf["battery_charge_efficiency"]
-                            * P_sto_neg[j]
-                            for j in range(i)
-                        ),
+                        e=stored_energy_terms(i, -1),
                         sense=plp.LpConstraintLE,
                         rhs=(
                             self.plant_conf["battery_nominal_energy_capacity"]
@@ -1248,13 +1528,7 @@ class Optimization:
             constraints.update(
                 {
                     f"constraint_socmin_{i}": plp.LpConstraint(
-                        e=plp.lpSum(
-                            P_sto_pos[j]
-                            * (1 / self.plant_conf["battery_discharge_efficiency"])
-                            + self.plant_conf["battery_charge_efficiency"]
-                            * P_sto_neg[j]
-                            for j in range(i)
-                        ),
+                        e=stored_energy_terms(i, 1),
                         sense=plp.LpConstraintLE,
                         rhs=(
                             self.plant_conf["battery_nominal_energy_capacity"]
@@ -1293,7 +1567,7 @@ class Optimization:
                 for i in set_I:
                     constraints.update({
                         f"constraint_ev_availability_{k}_{i}": plp.LpConstraint(
-                            e=P_ev[k][i] - self.optim_conf["ev_availability"][k][i] * self.optim_conf["ev_nominal_charging_power"][k],
+                            e=P_ev[k][i] - float(self.optim_conf["ev_availability"][k][i]) * self.optim_conf["ev_nominal_charging_power"][k],
                             sense=plp.LpConstraintLE,
                             rhs=0
                         )
@@ -1321,74 +1595,153 @@ class Optimization:
                         )
                     })
 
-            # 4. EV SOC initial conditions
-            for k in range(num_ev_loads):
-                constraints.update({
-                    f"constraint_ev_soc_initial_{k}": plp.LpConstraint(
-                        e=SOC_ev[k][0],
-                        sense=plp.LpConstraintEQ,
-                        rhs=self.optim_conf["ev_initial_soc"][k]
-                    )
-                })
-
-            # 5. EV SOC evolution over time
-            for k in range(num_ev_loads):
-                for i in range(1, len(set_I)):
+            if ev_compact_soc:
+                # 4. EV minimum SOC requirements as cumulated charging power bounds:
+                # SOC_ev[i] = ev_soc_init + soc_per_power * sum(P_ev[j] for j < i)
+                for k in range(num_ev_loads):
+                    ev_soc_init = self.optim_conf["ev_initial_soc"][k]
+                    soc_per_power = self._ev_soc_per_power(k)
+                    required = (
+                        np.asarray(self.optim_conf["ev_minimum_soc_schedule"][k][:n], dtype=float)
+                        - ev_soc_init
+                    ) / soc_per_power
+                    if required[0] > 0:
+                        self.logger.warning(
+                            "EV %s initial SOC is below its minimum SOC at the first timestep",
+                            k,
+                        )
+                        # Nothing is charged before the first timestep, skip its
+                        # requirement so that it does not hide the next ones
+                        required[0] = 0
+                    # The cumulated power never decreases, only the rising requirements bind
+                    running_max = np.maximum.accumulate(required)
+                    deadlines = np.flatnonzero(np.diff(running_max, prepend=0) > 0)
+                    for i in deadlines[deadlines > 0]:
+                        constraints.update({
+                            f"constraint_ev_min_soc_{k}_{i}": plp.LpConstraint(
+                                e=plp.lpSum(P_ev[k][j] for j in range(i)),
+                                sense=plp.LpConstraintGE,
+                                rhs=required[i]
+                            )
+                        })
+                    # 5. EV maximum SOC, binding at the last timestep only
                     constraints.update({
-                        f"constraint_ev_soc_evolution_{k}_{i}": plp.LpConstraint(
-                            e=SOC_ev[k][i] - SOC_ev[k][i-1] - (
-                                P_ev[k][i-1] * self.optim_conf.get("ev_charging_efficiency", [0.9] * num_ev_loads)[k] * self.timeStep
-                                / self.optim_conf["ev_battery_capacity"][k]
-                            ),
-                            sense=plp.LpConstraintEQ,
-                            rhs=0
+                        f"constraint_ev_max_soc_{k}": plp.LpConstraint(
+                            e=plp.lpSum(P_ev[k][j] for j in range(n - 1)),
+                            sense=plp.LpConstraintLE,
+                            rhs=(1 - ev_soc_init) / soc_per_power
                         )
                     })
-
-            # 6. EV minimum SOC requirements
-            for k in range(num_ev_loads):
-                for i in set_I:
+            else:
+                # 4. EV SOC initial conditions
+                for k in range(num_ev_loads):
                     constraints.update({
-                        f"constraint_ev_min_soc_{k}_{i}": plp.LpConstraint(
-                            e=SOC_ev[k][i],
-                            sense=plp.LpConstraintGE,
-                            rhs=self.optim_conf["ev_minimum_soc_schedule"][k][i]
+                        f"constraint_ev_soc_initial_{k}": plp.LpConstraint(
+                            e=SOC_ev[k][0],
+                            sense=plp.LpConstraintEQ,
+                            rhs=float(self.optim_conf["ev_initial_soc"][k])
                         )
                     })
 
+                # 5. EV SOC evolution over time
+                for k in range(num_ev_loads):
+                    for i in range(1, len(set_I)):
+                        constraints.update({
+                            f"constraint_ev_soc_evolution_{k}_{i}": plp.LpConstraint(
+                                e=SOC_ev[k][i] - SOC_ev[k][i-1] - (
+                                    P_ev[k][i-1] * self.optim_conf.get("ev_charging_efficiency", [0.9] * num_ev_loads)[k] * self.timeStep
+                                    / self.optim_conf["ev_battery_capacity"][k]
+                                ),
+                                sense=plp.LpConstraintEQ,
+                                rhs=0
+                            )
+                        })
+
+                # 6. EV minimum SOC requirements
+                for k in range(num_ev_loads):
+                    # Copied, the schedule can be a read-only array of the runtime params
+                    min_soc = np.array(self.optim_conf["ev_minimum_soc_schedule"][k][:n], dtype=float)
+                    # The first SOC is the initial SOC, its requirement is skipped when
+                    # above it, as in the compact encoding
+                    min_soc[0] = min(min_soc[0], self.optim_conf["ev_initial_soc"][k])
+                    for i in set_I:
+                        constraints.update({
+                            f"constraint_ev_min_soc_{k}_{i}": plp.LpConstraint(
+                                e=SOC_ev[k][i],
+                                sense=plp.LpConstraintGE,
+                                rhs=float(min_soc[i])
+                            )
+                        })
+
         opt_model.constraints = constraints
 
+        timings.mark("constraints")
+
+        # Dump the model of a profiled action, for an offline reproduction
+        profile = profiling.get_current_profile()
+        if profile is not None and profile.mps_path is not None:
+            opt_model.writeMPS(str(profile.mps_path))
+            self.logger.info("Optimization model written to %s", profile.mps_path)
+            timings.mark("mps_dump")
+
         ## Finally, we call the solver to solve our optimization model:
         timeout = self.optim_conf["lp_solver_timeout"]
+        # The CBC log is kept to read the node count and the gap of the solve
+        log_path = None
+        if self.lp_solver not in ["GLPK_CMD", "HiGHS"]:
+            fd, log_path = tempfile.mkstemp(prefix="emhass_cbc_", suffix=".log")
+            os.close(fd)
         # solving with default solver CBC
         if self.lp_solver == "PULP_CBC_CMD":
-            opt_model.solve(
-                PULP_CBC_CMD(msg=0, timeLimit=timeout, threads=self.num_threads)
+            solver = PULP_CBC_CMD(
+                msg=0, timeLimit=timeout, threads=self.num_threads, logPath=log_path
             )
         elif self.lp_solver == "GLPK_CMD":
-            opt_model.solve(GLPK_CMD(msg=0, timeLimit=timeout))
+            solver = GLPK_CMD(msg=0, timeLimit=timeout)
         elif self.lp_solver == "HiGHS":
-            opt_model.solve(HiGHS(msg=0, timeLimit=timeout))
+            solver = HiGHS(msg=0, timeLimit=timeout)
         elif self.lp_solver == "COIN_CMD":
-            opt_model.solve(
-                COIN_CMD(
-                    msg=0,
-                    path=self.lp_solver_path,
-                    timeLimit=timeout,
-                    threads=self.num_threads,
-                )
+            solver = COIN_CMD(
+                msg=0,
+                path=self.lp_solver_path,
+                timeLimit=timeout,
+                threads=self.num_threads,
+                logPath=log_path,
             )
         else:
             self.logger.warning("Solver %s unknown, using default", self.lp_solver)
-            opt_model.solve(
-                PULP_CBC_CMD(msg=0, timeLimit=timeout, threads=self.num_threads)
+            solver = PULP_CBC_CMD(
+                msg=0, timeLimit=timeout, threads=self.num_threads, logPath=log_path
             )
+        try:
+            with timings.span("solve"):
+                if self.low_memory_mode and isinstance(solver, COIN_CMD):
+                    # CBC reads an LP file written row by row, the MPS writer of
+                    # PuLP holds the whole matrix and its lines in memory
+                    opt_model.solve(solver, use_mps=False)
+                else:
+                    opt_model.solve(solver)
+            self.last_solve_stats = self.get_solve_stats(opt_model, n, log_path)
+            metrics.record_solve_stats(self.last_solve_stats)
+        finally:
+            if log_path is not None and os.path.exists(log_path):
+                os.remove(log_path)
+        self.logger.info(
+            "Model size: %d continuous and %d integer variables, %d constraints, %d nonzeros",
+            self.last_solve_stats["variables"]["continuous"],
+            self.last_solve_stats["variables"]["binary"]
+            + self.last_solve_stats["variables"]["integer"],
+            self.last_solve_stats["constraints"],
+            self.last_solve_stats["nonzeros"],
+        )
 
         # The status of the solution is printed to the screen
         self.optim_status = plp.LpStatus[opt_model.status]
         self.logger.info("Status: " + self.optim_status)
         if plp.value(opt_model.objective) is None:
             self.logger.warning("Cost function cannot be evaluated")
+            self.last_optim_results = None
+            self._set_timings(timings)
             return
         else:
             self.logger.info(
@@ -1396,182 +1749,1202 @@ class Optimization:
                 plp.value(opt_model.objective),
             )
 
-        # Build results Dataframe
-        opt_tp = pd.DataFrame()
-        opt_tp["P_PV"] = [P_PV[i] for i in set_I]
-        opt_tp["P_Load"] = [P_load[i] for i in set_I]
-        for k in range(self.optim_conf["number_of_deferrable_loads"]):
-            opt_tp[f"P_deferrable{k}"] = [P_deferrable[k][i].varValue for i in set_I]
+        # Build results Dataframe, pulling the solution in one array
+        num_deferrable_loads = self.optim_conf["number_of_deferrable_loads"]
+        variables = {
+            "P_deferrable": P_deferrable,
+            "P_ev": P_ev,
+            "P_grid_pos": P_grid_pos,
+            "P_grid_neg": P_grid_neg,
+        }
+        if not ev_compact_soc:
+            variables["SOC_ev"] = SOC_ev
+        if self.optim_conf["set_use_battery"]:
+            variables["P_sto_pos"] = P_sto_pos
+            variables["P_sto_neg"] = P_sto_neg
+        if self.plant_conf["inverter_is_hybrid"]:
+            variables["P_hybrid_inverter"] = P_hybrid_inverter
+        if self.plant_conf["compute_curtailment"]:
+            variables["P_PV_curtailment"] = P_PV_curtailment
+        if self.costfun == "self-consumption" and type_self_conso == "maxmin":
+            variables["SC"] = SC
+        if debug:
+            variables["P_def_start"] = P_def_start
+            variables["P_def_bin2"] = P_def_bin2
+        solution = self._get_solution(n, variables)
+        predicted_temps = {
+            i: [
+                round(pt.value(), 2) if isinstance(pt, plp.LpAffineExpression) else pt
+                for pt in predicted_temp
+            ]
+            for i, predicted_temp in predicted_temps.items()
+        }
+        # The solution is extracted, release the model before building the results
+        del opt_model, constraints
+
+        P_PV = np.asarray(P_PV[:n], dtype=float)
+        P_load = np.asarray(P_load[:n], dtype=float)
+        unit_load_cost = np.asarray(unit_load_cost[:n], dtype=float)
+        unit_prod_price = np.asarray(unit_prod_price[:n], dtype=float)
+        results = {"P_PV": P_PV, "P_Load": P_load}
+        for k in range(num_deferrable_loads):
+            results[f"P_deferrable{k}"] = solution["P_deferrable"][k]
 
         # Add EV results to output
         for k in range(num_ev_loads):
-            opt_tp[f"P_ev{k}"] = [P_ev[k][i].varValue for i in set_I]
-            opt_tp[f"SOC_ev{k}"] = [SOC_ev[k][i].varValue for i in set_I]
-
-        opt_tp["P_grid_pos"] = [P_grid_pos[i].varValue for i in set_I]
-        opt_tp["P_grid_neg"] = [P_grid_neg[i].varValue for i in set_I]
-        opt_tp["P_grid"] = [
-            P_grid_pos[i].varValue + P_grid_neg[i].varValue for i in set_I
-        ]
-        if self.optim_conf["set_use_battery"]:
-            opt_tp["P_batt"] = [
-                P_sto_pos[i].varValue + P_sto_neg[i].varValue for i in set_I
-            ]
-            SOC_opt_delta = [
-                (
-                    P_sto_pos[i].varValue
-                    * (1 / self.plant_conf["battery_discharge_efficiency"])
-                    + self.plant_conf["battery_charge_efficiency"]
-                    * P_sto_neg[i].varValue
+            results[f"P_ev{k}"] = solution["P_ev"][k]
+            if ev_compact_soc:
+                soc_per_power = self._ev_soc_per_power(k)
+                results[f"SOC_ev{k}"] = self.optim_conf["ev_initial_soc"][
+                    k
+                ] + soc_per_power * (
+                    np.concatenate(([0.0], np.cumsum(solution["P_ev"][k])[:-1]))
                 )
-                * (self.timeStep / (self.plant_conf["battery_nominal_energy_capacity"]))
-                for i in set_I
-            ]
-            SOCinit = copy.copy(soc_init)
-            SOC_opt = []
-            for i in set_I:
-                SOC_opt.append(SOCinit - SOC_opt_delta[i])
-                SOCinit = SOC_opt[i]
-            opt_tp["SOC_opt"] = SOC_opt
+            else:
+                results[f"SOC_ev{k}"] = solution["SOC_ev"][k]
+
+        results["P_grid_pos"] = solution["P_grid_pos"]
+        results["P_grid_neg"] = solution["P_grid_neg"]
+        results["P_grid"] = solution["P_grid_pos"] + solution["P_grid_neg"]
+        if self.optim_conf["set_use_battery"]:
+            results["P_batt"] = solution["P_sto_pos"] + solution["P_sto_neg"]
+            SOC_opt_delta = (
+                solution["P_sto_pos"]
+                * (1 / self.plant_conf["battery_discharge_efficiency"])
+                + self.plant_conf["battery_charge_efficiency"] * solution["P_sto_neg"]
+            ) * (self.timeStep / (self.plant_conf["battery_nominal_energy_capacity"]))
+            results["SOC_opt"] = soc_init - np.cumsum(SOC_opt_delta)
         if self.plant_conf["inverter_is_hybrid"]:
-            opt_tp["P_hybrid_inverter"] = [P_hybrid_inverter[i].varValue for i in set_I]
+            results["P_hybrid_inverter"] = solution["P_hybrid_inverter"]
         if self.plant_conf["compute_curtailment"]:
-            opt_tp["P_PV_curtailment"] = [P_PV_curtailment[i].varValue for i in set_I]
-        opt_tp.index = data_opt.index
+            results["P_PV_curtailment"] = solution["P_PV_curtailment"]
 
         # Lets compute the optimal cost function
-        P_def_sum_tp = []
-        for i in set_I:
-            def_sum = sum(
-                P_deferrable[k][i].varValue
-                for k in range(self.optim_conf["number_of_deferrable_loads"])
+        P_def_sum_tp = solution["P_deferrable"].sum(axis=0) + solution["P_ev"].sum(
+            axis=0
+        )
+        results["unit_load_cost"] = unit_load_cost
+        results["unit_prod_price"] = unit_prod_price
+        results.update(
+            self.get_cost_columns(
+                P_load,
+                P_def_sum_tp,
+                solution["P_grid_pos"],
+                solution["P_grid_neg"],
+                unit_load_cost,
+                unit_prod_price,
+                SC=solution.get("SC"),
             )
-            ev_sum = sum(
-                P_ev[k][i].varValue for k in range(num_ev_loads)
-            ) if num_ev_loads > 0 else 0
+        )
+
+        # Add the optimization status
+        results["optim_status"] = self.optim_status
+
+        # Debug variables
+        if debug:
+            for k in range(num_deferrable_loads):
+                results[f"P_def_start_{k}"] = solution["P_def_start"][k]
+                results[f"P_def_bin2_{k}"] = solution["P_def_bin2"][k]
+        for i, predicted_temp in predicted_temps.items():
+            results[f"predicted_temp_heater{i}"] = predicted_temp
+            results[f"target_temp_heater{i}"] = self.optim_conf["def_load_config"][i][
+                "thermal_config"
+            ]["desired_temperatures"]
+        opt_tp = pd.DataFrame(results, index=data_opt.index)
+        timings.mark("extraction")
+        self._set_timings(timings, opt_tp)
+        opt_tp.attrs["solve_stats"] = self.last_solve_stats
+
+        # Battery initialization logging
+        if self.optim_conf["set_use_battery"]:
+            self.logger.debug(
+                "Battery usage enabled. Initial SOC: %s, Final SOC: %s",
+                soc_init,
+                soc_final,
+            )
+
+        # Deferrable load initialization logging
+        self.logger.debug("Deferrable load operating hours: %s", def_total_hours)
+        self.logger.debug("Deferrable load timesteps: %s", def_total_timestep)
+        self.logger.debug("Deferrable load start timesteps: %s", def_start_timestep)
+        self.logger.debug("Deferrable load end timesteps: %s", def_end_timestep)
+
+        # Objective function logging
+        self.logger.debug("Selected cost function type: %s", self.costfun)
+
+        # Solver execution logging
+        self.logger.debug("Solver selected: %s", self.lp_solver)
+        self.logger.info("Optimization status: %s", self.optim_status)
+        self.last_optim_results = opt_tp
+        return opt_tp
+
+    def check_feasibility(
+        self,
+        P_PV: np.array,
+        P_load: np.array,
+        def_total_hours: list,
+        def_total_timestep: list | None,
+        def_start_timestep: list,
+        def_end_timestep: list,
+        n: int,
+    ) -> list:
+        r"""
+        Check that the EV and deferrable load requirements can be reached before \
+        building the optimization model.
+
+        The energy each load can receive is bounded by its nominal power, its \
+        availability and the power the grid (plus PV and battery) can supply on top \
+        of the fixed load. These are optimistic bounds: a reported requirement can \
+        never be met, but passing the check does not guarantee a feasible problem.
+
+        :param P_PV: The photovoltaic power values
+        :type P_PV: np.array
+        :param P_load: The load power consumption values
+        :type P_load: np.array
+        :param def_total_hours: The functioning hours for each deferrable load
+        :type def_total_hours: list
+        :param def_total_timestep: The functioning timesteps for each deferrable load
+        :type def_total_timestep: list
+        :param def_start_timestep: The timestep as from which each deferrable load is allowed to operate.
+        :type def_start_timestep: list
+        :param def_end_timestep: The timestep before which each deferrable load should operate.
+        :type def_end_timestep: list
+        :param n: The number of timesteps of the optimization
+        :type n: int
+        :return: A list of diagnostics, one dict per unreachable requirement with \
+            the load, the requirement, the timestep where it binds, the required \
+            and the reachable values
+        :rtype: list
+
+        """
+        tol = 1e-6
+        diagnostics = []
+        # Power available for the flexible loads at each timestep
+        supply = (
+            self.plant_conf["maximum_power_from_grid"]
+            + np.asarray(P_PV, dtype=float)[:n]
+            - np.asarray(P_load, dtype=float)[:n]
+        )
+        if self.optim_conf["set_use_battery"]:
+            supply = supply + self.plant_conf["battery_discharge_power_max"]
+        supply = np.maximum(supply, 0)
 
-            P_def_sum_tp.append(def_sum + ev_sum)
-        opt_tp["unit_load_cost"] = [unit_load_cost[i] for i in set_I]
-        opt_tp["unit_prod_price"] = [unit_prod_price[i] for i in set_I]
+        def_load_config = self.optim_conf.get("def_load_config", [])
+        for k in range(self.optim_conf["number_of_deferrable_loads"]):
+            P_nom = self.optim_conf["nominal_power_of_deferrable_loads"][k]
+            if isinstance(P_nom, list) or (
+                len(def_load_config) > k and "thermal_config" in def_load_config[k]
+            ):
+                continue
+            if def_total_timestep and def_total_timestep[k] > 0:
+                steps_needed = def_total_timestep[k]
+            else:
+                steps_needed = def_total_hours[k] / self.timeStep
+            if steps_needed <= 0:
+                continue
+            def_start, def_end, _ = Optimization.validate_def_timewindow(
+                def_start_timestep[k], def_end_timestep[k], ceil(steps_needed), n
+            )
+            window_supply = supply[def_start : def_end if def_end > 0 else n]
+            if (
+                self.optim_conf["treat_deferrable_load_as_semi_cont"][k]
+                or self.optim_conf["set_deferrable_load_single_constant"][k]
+            ):
+                steps_reachable = float(np.sum(window_supply >= P_nom - tol))
+            else:
+                steps_reachable = float(np.minimum(window_supply, P_nom).sum() / P_nom)
+            if steps_needed > steps_reachable + tol:
+                diagnostics.append(
+                    {
+                        "load": f"deferrable{k}",
+                        "requirement": "operating_timesteps",
+                        "timestep": def_end if def_end > 0 else n,
+                        "required": steps_needed,
+                        "reachable": steps_reachable,
+                    }
+                )
+
+        num_ev_loads = self.optim_conf.get("number_of_ev_loads", 0)
+        for k in range(num_ev_loads):
+            soc_init = self.optim_conf["ev_initial_soc"][k]
+            P_max = np.minimum(
+                self.optim_conf["ev_nominal_charging_power"][k]
+                * np.asarray(self.optim_conf["ev_availability"][k][:n], dtype=float),
+                supply,
+            )
+            # The SOC reachable at each timestep, charging as much as possible before it
+            soc_reachable = np.minimum(
+                soc_init
+                + self._ev_soc_per_power(k)
+                * np.concatenate(([0.0], np.cumsum(P_max)[:-1])),
+                1,
+            )
+            min_soc = np.asarray(self.optim_conf["ev_minimum_soc_schedule"][k][:n], dtype=float)
+            unreachable = np.flatnonzero(min_soc > soc_reachable + tol)
+            if len(unreachable) > 0:
+                i = int(unreachable[0])
+                diagnostics.append(
+                    {
+                        "load": f"ev{k}",
+                        "requirement": "minimum_soc",
+                        "timestep": i,
+                        "required": float(min_soc[i]),
+                        "reachable": float(soc_reachable[i]),
+                        "soc_reachable": soc_reachable.tolist(),
+                    }
+                )
+        return diagnostics
+
+    def relax_requirements(
+        self,
+        diagnostics: list,
+        def_total_hours: list,
+        def_total_timestep: list | None,
+    ) -> None:
+        r"""
+        Relax the unreachable requirements reported by check_feasibility to the \
+        reachable values.
+
+        The deferrable load functioning hours (or timesteps) are updated in place, \
+        the EV minimum SOC schedules are replaced in optim_conf. perform_optimization \
+        relaxes a copy of optim_conf, so the configured schedules are left unchanged.
+
+        :param diagnostics: The diagnostics returned by check_feasibility
+        :type diagnostics: list
+        :param def_total_hours: The functioning hours for each deferrable load
+        :type def_total_hours: list
+        :param def_total_timestep: The functioning timesteps for each deferrable load
+        :type def_total_timestep: list
+
+        """
+        for diagnostic in diagnostics:
+            if diagnostic["requirement"] == "operating_timesteps":
+                k = int(diagnostic["load"][len("deferrable") :])
+                if def_total_timestep and def_total_timestep[k] > 0:
+                    def_total_timestep[k] = int(diagnostic["reachable"])
+                else:
+                    def_total_hours[k] = int(diagnostic["reachable"]) * self.timeStep
+            elif diagnostic["requirement"] == "minimum_soc":
+                k = int(diagnostic["load"][len("ev") :])
+                # Copied, the schedule can be a read-only array of the runtime params
+                min_soc = np.array(self.optim_conf["ev_minimum_soc_schedule"][k], dtype=float)
+                n = len(diagnostic["soc_reachable"])
+                min_soc[:n] = np.minimum(min_soc[:n], diagnostic["soc_reachable"])
+                self._set_ev_conf("ev_minimum_soc_schedule", k, min_soc.tolist())
+
+    def get_greedy_marginal_costs(
+        self, unit_load_cost: np.array, unit_prod_price: np.array
+    ) -> tuple[np.array, np.array]:
+        r"""
+        Get the marginal cost of consuming power at each timestep, for the two \
+        tranches that can supply an additional load: the PV surplus (lost injection) \
+        and the power imported from the grid.
+
+        :param unit_load_cost: The cost of power consumption for each unit of time.
+        :type unit_load_cost: np.array
+        :param unit_prod_price: The price of power injected to the grid each unit of time.
+        :type unit_prod_price: np.array
+        :return: The marginal cost of the PV surplus and of the grid import
+        :rtype: tuple(np.array, np.array)
+
+        """
+        unit_load_cost = np.asarray(unit_load_cost, dtype=float)
+        unit_prod_price = np.asarray(unit_prod_price, dtype=float)
+        if self.costfun == "cost":
+            cost_surplus = np.zeros(len(unit_load_cost))
+        else:
+            cost_surplus = unit_prod_price
+        if self.costfun == "self-consumption":
+            cost_grid = 1e3 * unit_load_cost  # Same bigm as in perform_optimization
+        else:
+            cost_grid = unit_load_cost
+        return cost_surplus, cost_grid
+
+    def check_greedy_applicable(
+        self, unit_load_cost: np.array, unit_prod_price: np.array
+    ) -> tuple[bool, str]:
+        r"""
+        Check if the problem can be solved by the greedy engine.
+
+        This is the case when no storage or hybrid inverter couples the timesteps \
+        and when every load can be treated as an energy requirement inside a window.
+
+        :param unit_load_cost: The cost of power consumption for each unit of time.
+        :type unit_load_cost: np.array
+        :param unit_prod_price: The price of power injected to the grid each unit of time.
+        :type unit_prod_price: np.array
+        :return: If the greedy engine is applicable, and the reason when it is not
+        :rtype: tuple(bool, str)
+
+        """
+        if self.optim_conf["set_use_battery"]:
+            return False, "a battery is used"
+        if self.plant_conf["inverter_is_hybrid"]:
+            return False, "the inverter is hybrid"
         if self.optim_conf["set_total_pv_sell"]:
-            opt_tp["cost_profit"] = [
-                -0.001
-                * self.timeStep
-                * (
-                    unit_load_cost[i] * (P_load[i] + P_def_sum_tp[i])
-                    + unit_prod_price[i] * P_grid_neg[i].varValue
+            return False, "set_total_pv_sell is enabled"
+        if self.costfun not in ["profit", "cost", "self-consumption"]:
+            return False, f"the cost function {self.costfun} is not supported"
+        startup_penalty = self.optim_conf.get("set_deferrable_startup_penalty") or []
+        min_power = self.optim_conf.get("minimum_power_of_deferrable_loads", [])
+        def_load_config = self.optim_conf.get("def_load_config", [])
+        for k in range(self.optim_conf["number_of_deferrable_loads"]):
+            if isinstance(self.optim_conf["nominal_power_of_deferrable_loads"][k], list):
+                return False, f"deferrable load {k} is sequence-based"
+            if len(def_load_config) > k and "thermal_config" in def_load_config[k]:
+                return False, f"deferrable load {k} is a thermal load"
+            if len(startup_penalty) > k and startup_penalty[k]:
+                return False, f"deferrable load {k} has a startup penalty"
+            if (
+                len(min_power) > k
+                and min_power[k] > 0
+                and not self.optim_conf["treat_deferrable_load_as_semi_cont"][k]
+            ):
+                return False, f"deferrable load {k} has a minimum power"
+        cost_surplus, cost_grid = self.get_greedy_marginal_costs(
+            unit_load_cost, unit_prod_price
+        )
+        if np.any(cost_surplus < 0) or np.any(cost_grid < 0):
+            return False, "some costs or prices are negative"
+        if np.any(cost_surplus > cost_grid):
+            return False, "the production price is higher than the load cost"
+        return True, None
+
+    def perform_greedy_optimization(
+        self,
+        data_opt: pd.DataFrame,
+        P_PV: np.array,
+        P_load: np.array,
+        unit_load_cost: np.array,
+        unit_prod_price: np.array,
+        def_total_hours: list | None = None,
+        def_total_timestep: list | None = None,
+        def_start_timestep: list | None = None,
+        def_end_timestep: list | None = None,
+    ) -> pd.DataFrame:
+        r"""
+        Perform the optimization of deferrable loads and EVs without the LP solver.
+
+        Each load is placed on the cheapest timesteps of its availability window, \
+        sorting the timesteps by their marginal cost. EV minimum SOC requirements are \
+        met deadline by deadline, using the cheapest timesteps before each deadline. \
+        Only valid for the problems accepted by check_greedy_applicable.
+
+        :param data_opt: A DataFrame containing the input data.
+        :type data_opt: pd.DataFrame
+        :param P_PV: The photovoltaic power values.
+        :type P_PV: numpy.array
+        :param P_load: The load power consumption values
+        :type P_load: np.array
+        :param unit_load_cost: The cost of power consumption for each unit of time.
+        :type unit_load_cost: np.array
+        :param unit_prod_price: The price of power injected to the grid each unit of time.
+        :type unit_prod_price: np.array
+        :param def_total_hours: The functioning hours for each deferrable load.
+        :type def_total_hours: list
+        :param def_total_timestep: The functioning timesteps for each deferrable load.
+        :type def_total_timestep: list
+        :param def_start_timestep: The timestep as from which each deferrable load is allowed to operate.
+        :type def_start_timestep: list
+        :param def_end_timestep: The timestep before which each deferrable load should operate.
+        :type def_end_timestep: list
+        :return: The same results DataFrame as perform_optimization
+        :rtype: pd.DataFrame
+
+        """
+        self.logger.debug("Solving with the greedy engine")
+        n = len(data_opt.index)
+        P_PV = np.asarray(P_PV, dtype=float)[:n]
+        P_load = np.asarray(P_load, dtype=float)[:n]
+        unit_load_cost = np.asarray(unit_load_cost, dtype=float)[:n]
+        unit_prod_price = np.asarray(unit_prod_price, dtype=float)[:n]
+        cost_surplus, cost_grid = self.get_greedy_marginal_costs(
+            unit_load_cost, unit_prod_price
+        )
+        slot_left, grid_room, slot_order = self._greedy_slots(
+            P_PV, P_load, cost_surplus, cost_grid
+        )
+        feasible = True
+        tol = 1e-6
+
+        # EV loads first, their SOC deadlines make them the least flexible loads
+        num_ev_loads = self.optim_conf.get("number_of_ev_loads", 0)
+        P_ev = np.zeros((num_ev_loads, n))
+        SOC_ev = np.zeros((num_ev_loads, n))
+        for k in range(num_ev_loads):
+            P_ev[k], SOC_ev[k], ev_feasible = self._greedy_ev_fill(
+                k, slot_left, grid_room, slot_order, cost_surplus, cost_grid
+            )
+            feasible = feasible and ev_feasible
+
+        # Deferrable loads
+        num_deferrable_loads = self.optim_conf["number_of_deferrable_loads"]
+        P_deferrable = np.zeros((num_deferrable_loads, n))
+        for k in range(num_deferrable_loads):
+            P_nom = self.optim_conf["nominal_power_of_deferrable_loads"][k]
+            if def_total_timestep and def_total_timestep[k] > 0:
+                steps_needed = def_total_timestep[k]
+            else:
+                steps_needed = def_total_hours[k] / self.timeStep
+            if steps_needed <= 0:
+                continue
+            def_start, def_end, warning = Optimization.validate_def_timewindow(
+                def_start_timestep[k], def_end_timestep[k], ceil(steps_needed), n
+            )
+            if warning is not None:
+                self.logger.warning("Deferrable load %s : %s", k, warning)
+            window = np.zeros(n, dtype=bool)
+            window[def_start : def_end if def_end > 0 else n] = True
+            if (
+                self.optim_conf["treat_deferrable_load_as_semi_cont"][k]
+                or self.optim_conf["set_deferrable_load_single_constant"][k]
+            ):
+                # The load runs at nominal power: pick the cheapest timesteps (or block)
+                num_on = int(round(steps_needed))
+                from_surplus = np.minimum(P_nom, slot_left[:n])
+                step_cost = from_surplus * cost_surplus + (P_nom - from_surplus) * cost_grid
+                step_cost[(P_nom - from_surplus > slot_left[n:] + tol) | ~window] = np.inf
+                if self.optim_conf["set_deferrable_load_single_constant"][k]:
+                    block_cost = np.convolve(step_cost, np.ones(num_on), mode="valid")
+                    if len(block_cost) == 0 or not np.isfinite(block_cost.min()):
+                        feasible = False
+                        continue
+                    start = int(np.argmin(block_cost))
+                    steps_on = np.arange(start, start + num_on)
+                else:
+                    steps_on = np.argsort(step_cost, kind="stable")[:num_on]
+                    steps_on = steps_on[np.isfinite(step_cost[steps_on])]
+                    if len(steps_on) < num_on:
+                        feasible = False
+                for i in steps_on:
+                    self._greedy_take(slot_left, i, P_nom, n)
+                    P_deferrable[k][i] = P_nom
+            else:
+                # Continuous load: fill the cheapest capacity inside the window
+                P_deferrable[k], energy_left = self._greedy_fill(
+                    steps_needed * P_nom,
+                    np.where(window, P_nom, 0.0),
+                    slot_order,
+                    slot_left,
+                    n,
                 )
-                for i in set_I
+                if energy_left > tol:
+                    feasible = False
+
+        self.optim_status = "Optimal" if feasible else "Infeasible"
+        self.logger.info("Status: " + self.optim_status)
+
+        return self._greedy_results(
+            data_opt,
+            P_PV,
+            P_load,
+            P_deferrable,
+            P_ev,
+            SOC_ev,
+            unit_load_cost,
+            unit_prod_price,
+        )
+
+    def _greedy_slots(
+        self,
+        P_PV: np.array,
+        P_load: np.array,
+        cost_surplus: np.array,
+        cost_grid: np.array,
+    ) -> tuple[np.array, np.array, np.array]:
+        r"""
+        Build the capacity left at each timestep, the PV surplus first then the \
+        grid import, and the order in which the greedy engine uses it.
+
+        :return: The capacity left per slot, the grid import capacity and the \
+            slots sorted by marginal cost
+        :rtype: tuple(np.array, np.array, np.array)
+
+        """
+        n = len(P_load)
+        slot_left = np.concatenate(
+            [
+                np.maximum(P_PV - P_load, 0),
+                np.maximum(
+                    self.plant_conf["maximum_power_from_grid"]
+                    - np.maximum(P_load - P_PV, 0),
+                    0,
+                ),
             ]
-        else:
-            opt_tp["cost_profit"] = [
-                -0.001
-                * self.timeStep
-                * (
-                    unit_load_cost[i] * P_grid_pos[i].varValue
-                    + unit_prod_price[i] * P_grid_neg[i].varValue
+        )
+        grid_room = slot_left[n:].copy()
+        slot_cost = np.concatenate([cost_surplus, cost_grid])
+        # A stable sort keeps the surplus of a timestep before its grid import
+        slot_order = np.argsort(slot_cost, kind="stable")
+        return slot_left, grid_room, slot_order
+
+    def _greedy_results(
+        self,
+        data_opt: pd.DataFrame,
+        P_PV: np.array,
+        P_load: np.array,
+        P_deferrable: np.array,
+        P_ev: np.array,
+        SOC_ev: np.array,
+        unit_load_cost: np.array,
+        unit_prod_price: np.array,
+    ) -> pd.DataFrame:
+        r"""
+        Build the results DataFrame of the greedy engine, with the same columns as \
+        perform_optimization.
+
+        :return: The results DataFrame
+        :rtype: pd.DataFrame
+
+        """
+        num_deferrable_loads = len(P_deferrable)
+        num_ev_loads = len(P_ev)
+        P_def_sum = P_deferrable.sum(axis=0) + P_ev.sum(axis=0)
+        P_grid = P_load + P_def_sum - P_PV
+        P_grid_pos = np.maximum(P_grid, 0)
+        P_grid_neg = np.minimum(P_grid, 0)
+        results = {"P_PV": P_PV, "P_Load": P_load}
+        for k in range(num_deferrable_loads):
+            results[f"P_deferrable{k}"] = P_deferrable[k]
+        for k in range(num_ev_loads):
+            results[f"P_ev{k}"] = P_ev[k]
+            results[f"SOC_ev{k}"] = SOC_ev[k]
+        if self.plant_conf["compute_curtailment"]:
+            # Curtail the PV surplus that cannot be injected
+            P_PV_curtailment = np.maximum(
+                -P_grid_neg - self.plant_conf["maximum_power_to_grid"], 0
+            )
+            P_grid_neg = P_grid_neg + P_PV_curtailment
+        results["P_grid_pos"] = P_grid_pos
+        results["P_grid_neg"] = P_grid_neg
+        results["P_grid"] = P_grid_pos + P_grid_neg
+        if self.plant_conf["compute_curtailment"]:
+            results["P_PV_curtailment"] = P_PV_curtailment
+        results["unit_load_cost"] = unit_load_cost
+        results["unit_prod_price"] = unit_prod_price
+        results.update(
+            self.get_cost_columns(
+                P_load,
+                P_def_sum,
+                P_grid_pos,
+                P_grid_neg,
+                unit_load_cost,
+                unit_prod_price,
+            )
+        )
+        opt_tp = pd.DataFrame(results, index=data_opt.index)
+        opt_tp["optim_status"] = self.optim_status
+        cost_fun_cols = [col for col in opt_tp.columns if col.startswith("cost_fun_")]
+        if cost_fun_cols:
+            self.logger.info(
+                "Total value of the Cost function = %.02f",
+                opt_tp[cost_fun_cols[0]].sum(),
+            )
+        return opt_tp
+
+    def _greedy_ev_fill(
+        self,
+        k: int,
+        slot_left: np.array,
+        grid_room: np.array,
+        slot_order: np.array,
+        cost_surplus: np.array,
+        cost_grid: np.array,
+        start: int = 0,
+        P_ev_start: np.ndarray | None = None,
+    ) -> tuple[np.array, np.array, bool]:
+        r"""
+        Charge one EV with the cheapest capacity left, meeting its minimum SOC \
+        schedule deadline by deadline.
+
+        :param k: The index of the EV
+        :type k: int
+        :param slot_left: The capacity left at each timestep, PV surplus then grid \
+            import. Updated in place with the power taken by the EV.
+        :type slot_left: np.array
+        :param grid_room: The grid import capacity before any load was placed
+        :type grid_room: np.array
+        :param slot_order: The slots sorted by marginal cost
+        :type slot_order: np.array
+        :param cost_surplus: The marginal cost of the PV surplus
+        :type cost_surplus: np.array
+        :param cost_grid: The marginal cost of the grid import
+        :type cost_grid: np.array
+        :param start: The first timestep to plan, the charging before it is kept
+        :type start: int, optional
+        :param P_ev_start: The charging power kept before start, already taken \
+            from slot_left
+        :type P_ev_start: np.array, optional
+        :return: The EV charging power, its SOC and if the schedule could be met
+        :rtype: tuple(np.array, np.array, bool)
+
+        """
+        n = len(grid_room)
+        num_ev_loads = self.optim_conf.get("number_of_ev_loads", 0)
+        feasible = True
+        tol = 1e-6
+        P_ev = np.zeros(n)
+        if start > 0:
+            P_ev[:start] = P_ev_start[:start]
+        P_nom = self.optim_conf["ev_nominal_charging_power"][k]
+        P_min = self.optim_conf.get("ev_minimum_charging_power", [0] * num_ev_loads)[k]
+        soc_init = self.optim_conf["ev_initial_soc"][k]
+        soc_per_power = self._ev_soc_per_power(k)
+        P_max = P_nom * np.asarray(self.optim_conf["ev_availability"][k][:n], dtype=float)
+        P_max[:start] = P_ev[:start]
+        min_soc = np.asarray(self.optim_conf["ev_minimum_soc_schedule"][k][:n], dtype=float)
+        # Cumulated charging power needed before each timestep
+        required = np.maximum(min_soc - soc_init, 0) / soc_per_power
+        if required[start] > P_ev[:start].sum() + tol:
+            feasible = False
+        # The requirements up to start cannot be changed by charging anymore
+        required[: start + 1] = 0
+        running_max = np.maximum.accumulate(required)
+        deadlines = np.flatnonzero(np.diff(running_max, prepend=0) > tol)
+        for i in deadlines[deadlines > 0]:
+            deficit = required[i] - P_ev[:i].sum()
+            if deficit <= tol:
+                continue
+            P_max_left = P_max - P_ev
+            P_max_left[i:] = 0
+            P_added, energy_left = self._greedy_fill(
+                deficit, P_max_left, slot_order, slot_left, n
+            )
+            P_ev += P_added
+            if energy_left > tol:
+                feasible = False
+        # Partially used timesteps are raised to the minimum charging power, and
+        # the same power is removed from the most expensive timestep that allows it
+        for i in np.flatnonzero((P_ev > tol) & (P_ev < P_min - tol)):
+            if i < start:
+                continue
+            lift = self._greedy_take(slot_left, i, P_min - P_ev[i], n)
+            P_ev[i] += lift
+            cumulated = np.cumsum(P_ev)
+            marginal_cost = np.where(slot_left[:n] > tol, cost_surplus, cost_grid)
+            for j in np.argsort(-marginal_cost, kind="stable"):
+                reduced = P_ev[j] - lift
+                if j == i or j < start or reduced < -tol or tol < reduced < P_min - tol:
+                    continue
+                # Moving power later must keep the SOC deadlines in between
+                if j < i and np.any(cumulated[j:i] - lift < required[j + 1 : i + 1] - tol):
+                    continue
+                P_ev[j] = max(reduced, 0)
+                self._greedy_give(slot_left, j, lift, grid_room, n)
+                break
+        SOC_ev = soc_init + soc_per_power * np.concatenate(([0.0], np.cumsum(P_ev)[:-1]))
+        return P_ev, SOC_ev, feasible
+
+    def apply_ev_event(
+        self,
+        k: int,
+        event: str,
+        timestep: int | None = 0,
+        soc: float | None = None,
+        target_soc: float | None = None,
+        departure_timestep: int | None = None,
+    ) -> bool:
+        r"""
+        Update the EV state of one vehicle from a charger event.
+
+        The availability, minimum SOC schedule and initial SOC of the vehicle \
+        are updated in place in optim_conf, the other vehicles are left untouched.
+
+        :param k: The index of the EV
+        :type k: int
+        :param event: The event type: plugged_in, unplugged, soc_update or target_changed
+        :type event: str
+        :param timestep: The timestep at which the event applies. For target_changed \
+            this is the timestep as from which the target SOC is required, for \
+            soc_update the timestep the SOC was read at, defaults to 0
+        :type timestep: int, optional
+        :param soc: The current SOC of the vehicle, for plugged_in and soc_update. \
+            A soc_update after the first timestep sets the initial SOC so that the \
+            last results reach the SOC at the timestep (not below 0).
+        :type soc: float, optional
+        :param target_soc: The new target SOC, for target_changed
+        :type target_soc: float, optional
+        :param departure_timestep: The timestep before which the vehicle leaves, \
+            for plugged_in. Defaults to the end of the horizon.
+        :type departure_timestep: int, optional
+        :return: True if the event was applied
+        :rtype: bool
+
+        """
+        if k >= self.optim_conf.get("number_of_ev_loads", 0):
+            self.logger.error("EV %s is not configured, event %s ignored", k, event)
+            return False
+        availability = list(self.optim_conf["ev_availability"][k])
+        min_soc_schedule = list(self.optim_conf["ev_minimum_soc_schedule"][k])
+        session = self.ev_sessions.setdefault(k, {})
+        if event == "plugged_in":
+            end = len(availability) if departure_timestep is None else departure_timestep
+            availability[timestep:end] = [1] * len(availability[timestep:end])
+            availability[end:] = [0] * len(availability[end:])
+            session["plugged_in"] = True
+            session["departure_timestep"] = departure_timestep
+        elif event == "unplugged":
+            # No charging and no SOC requirement while the vehicle is away
+            availability[timestep:] = [0] * len(availability[timestep:])
+            min_soc_schedule[timestep:] = [0] * len(min_soc_schedule[timestep:])
+            session["plugged_in"] = False
+        elif event == "soc_update":
+            if soc is None:
+                self.logger.error("Event soc_update for EV %s without soc value", k)
+                return False
+            session["soc_timestep"] = timestep
+        elif event == "target_changed":
+            if target_soc is None:
+                self.logger.error(
+                    "Event target_changed for EV %s without target_soc", k
                 )
-                for i in set_I
+                return False
+            min_soc_schedule[timestep:] = [target_soc] * len(min_soc_schedule[timestep:])
+            session["target_soc"] = target_soc
+        else:
+            self.logger.error("Unknown EV event %s, ignored", event)
+            return False
+        if soc is not None:
+            initial_soc = soc
+            if event == "soc_update" and timestep and self.last_optim_results is not None:
+                # The SOC is read at the timestep, after the charging planned before it
+                charged = self.last_optim_results[f"P_ev{k}"].to_numpy()[:timestep].sum()
+                initial_soc = max(soc - self._ev_soc_per_power(k) * charged, 0.0)
+            self._set_ev_conf("ev_initial_soc", k, initial_soc)
+            session["soc"] = soc
+        self._set_ev_conf("ev_availability", k, availability)
+        self._set_ev_conf("ev_minimum_soc_schedule", k, min_soc_schedule)
+        self.logger.debug("EV %s event %s applied, session: %s", k, event, session)
+        return True
+
+    def perform_ev_session_update(self, k: int, event: str, **event_data) -> pd.DataFrame:
+        r"""
+        Apply a charger event and re-optimize only the affected vehicle.
+
+        The other loads keep the powers of the last optimization results. When \
+        the greedy engine is not applicable (e.g. a battery couples the timesteps) \
+        the last optimization is performed again with the updated EV state. In both \
+        cases a soc_update at a timestep keeps the charging planned before it.
+
+        :param k: The index of the EV
+        :type k: int
+        :param event: The event type: plugged_in, unplugged, soc_update or target_changed
+        :type event: str
+        :param event_data: The event values passed to apply_ev_event
+        :type event_data: dict
+        :return: The updated results DataFrame, None if no optimization was performed yet
+        :rtype: pd.DataFrame
+
+        """
+        if not self.apply_ev_event(k, event, **event_data):
+            return self.last_optim_results
+        if self.last_optim_inputs is None or self.last_optim_results is None:
+            self.logger.warning(
+                "No previous optimization results, the EV event is stored for the next optimization"
+            )
+            return None
+        inputs = self.last_optim_inputs
+        greedy_applicable, reason = self.check_greedy_applicable(
+            inputs["unit_load_cost"], inputs["unit_prod_price"]
+        )
+        if self.optimization_engine == "milp" or not greedy_applicable:
+            self.logger.debug("Full re-optimization for the EV %s event %s", k, event)
+            if event == "soc_update" and event_data.get("timestep"):
+                # The SOC is read after the charging planned before the timestep
+                P_ev_prev = self.last_optim_results[f"P_ev{k}"].to_numpy()
+                self.ev_fixed_power = {k: P_ev_prev[: event_data["timestep"]]}
+            try:
+                return self.perform_optimization(**inputs)
+            finally:
+                self.ev_fixed_power = {}
+        opt_tp = self.last_optim_results
+        n = len(opt_tp.index)
+        P_PV = opt_tp["P_PV"].to_numpy()
+        P_load = opt_tp["P_Load"].to_numpy()
+        unit_load_cost = opt_tp["unit_load_cost"].to_numpy()
+        unit_prod_price = opt_tp["unit_prod_price"].to_numpy()
+        P_deferrable = np.array(
+            [
+                opt_tp[f"P_deferrable{j}"].to_numpy()
+                for j in range(self.optim_conf["number_of_deferrable_loads"])
             ]
+        ).reshape(-1, n)
+        num_ev_loads = self.optim_conf.get("number_of_ev_loads", 0)
+        P_ev = np.array([opt_tp[f"P_ev{j}"].to_numpy() for j in range(num_ev_loads)])
+        SOC_ev = np.array([opt_tp[f"SOC_ev{j}"].to_numpy() for j in range(num_ev_loads)])
+        # The other loads are fixed, only the capacity they leave is available
+        P_other = P_deferrable.sum(axis=0) + P_ev.sum(axis=0) - P_ev[k]
+        # The charging before a SOC reading is kept, the EV is planned from there
+        start = (event_data.get("timestep") or 0) if event == "soc_update" else 0
+        P_other[:start] += P_ev[k][:start]
+        cost_surplus, cost_grid = self.get_greedy_marginal_costs(
+            unit_load_cost, unit_prod_price
+        )
+        slot_left, grid_room, slot_order = self._greedy_slots(
+            P_PV, P_load + P_other, cost_surplus, cost_grid
+        )
+        P_ev[k], SOC_ev[k], feasible = self._greedy_ev_fill(
+            k,
+            slot_left,
+            grid_room,
+            slot_order,
+            cost_surplus,
+            cost_grid,
+            start=start,
+            P_ev_start=P_ev[k],
+        )
+        # The other loads are unchanged, the status only depends on this EV
+        self.optim_status = "Optimal" if feasible else "Infeasible"
+        self.logger.info(
+            "EV %s re-optimized after %s, status: %s", k, event, self.optim_status
+        )
+        self.last_optim_results = self._greedy_results(
+            inputs["data_opt"],
+            P_PV,
+            P_load,
+            P_deferrable,
+            P_ev,
+            SOC_ev,
+            unit_load_cost,
+            unit_prod_price,
+        )
+        return self.last_optim_results
+
+    def get_cost_columns(
+        self,
+        P_load: np.array,
+        P_def_sum: np.array,
+        P_grid_pos: np.array,
+        P_grid_neg: np.array,
+        unit_load_cost: np.array,
+        unit_prod_price: np.array,
+        SC: np.ndarray | None = None,
+    ) -> dict:
+        r"""
+        Compute the cost_profit and cost function columns of the results.
+
+        :param P_load: The load power consumption values
+        :type P_load: np.array
+        :param P_def_sum: The sum of the deferrable loads and EV charging powers
+        :type P_def_sum: np.array
+        :param P_grid_pos: The power imported from the grid
+        :type P_grid_pos: np.array
+        :param P_grid_neg: The power injected to the grid
+        :type P_grid_neg: np.array
+        :param unit_load_cost: The cost of power consumption for each unit of time.
+        :type unit_load_cost: np.array
+        :param unit_prod_price: The price of power injected to the grid each unit of time.
+        :type unit_prod_price: np.array
+        :param SC: The self-consumed power of the maxmin self-consumption problem
+        :type SC: np.array, optional
+        :return: A dictionary with the cost columns
+        :rtype: dict
 
+        """
+        if self.optim_conf["set_total_pv_sell"]:
+            cost_profit = (
+                -0.001
+                * self.timeStep
+                * (unit_load_cost * (P_load + P_def_sum) + unit_prod_price * P_grid_neg)
+            )
+            cost_cost = -0.001 * self.timeStep * unit_load_cost * (P_load + P_def_sum)
+        else:
+            cost_profit = (
+                -0.001
+                * self.timeStep
+                * (unit_load_cost * P_grid_pos + unit_prod_price * P_grid_neg)
+            )
+            cost_cost = -0.001 * self.timeStep * unit_load_cost * P_grid_pos
+        cost_columns = {"cost_profit": cost_profit}
         if self.costfun == "profit":
-            if self.optim_conf["set_total_pv_sell"]:
-                opt_tp["cost_fun_profit"] = [
-                    -0.001
-                    * self.timeStep
-                    * (
-                        unit_load_cost[i] * (P_load[i] + P_def_sum_tp[i])
-                        + unit_prod_price[i] * P_grid_neg[i].varValue
-                    )
-                    for i in set_I
-                ]
-            else:
-                opt_tp["cost_fun_profit"] = [
-                    -0.001
-                    * self.timeStep
-                    * (
-                        unit_load_cost[i] * P_grid_pos[i].varValue
-                        + unit_prod_price[i] * P_grid_neg[i].varValue
-                    )
-                    for i in set_I
-                ]
+            cost_columns["cost_fun_profit"] = cost_profit
         elif self.costfun == "cost":
-            if self.optim_conf["set_total_pv_sell"]:
-                opt_tp["cost_fun_cost"] = [
-                    -0.001
-                    * self.timeStep
-                    * unit_load_cost[i]
-                    * (P_load[i] + P_def_sum_tp[i])
-                    for i in set_I
-                ]
-            else:
-                opt_tp["cost_fun_cost"] = [
-                    -0.001 * self.timeStep * unit_load_cost[i] * P_grid_pos[i].varValue
-                    for i in set_I
-                ]
+            cost_columns["cost_fun_cost"] = cost_cost
+        elif self.costfun == "self-consumption" and SC is not None:
+            cost_columns["cost_fun_selfcons"] = -0.001 * self.timeStep * unit_load_cost * SC
         elif self.costfun == "self-consumption":
-            if type_self_conso == "maxmin":
-                opt_tp["cost_fun_selfcons"] = [
-                    -0.001 * self.timeStep * unit_load_cost[i] * SC[i].varValue
-                    for i in set_I
-                ]
-            elif type_self_conso == "bigm":
-                opt_tp["cost_fun_selfcons"] = [
-                    -0.001
-                    * self.timeStep
-                    * (
-                        unit_load_cost[i] * P_grid_pos[i].varValue
-                        + unit_prod_price[i] * P_grid_neg[i].varValue
-                    )
-                    for i in set_I
-                ]
+            cost_columns["cost_fun_selfcons"] = (
+                -0.001
+                * self.timeStep
+                * (unit_load_cost * P_grid_pos + unit_prod_price * P_grid_neg)
+            )
         else:
             self.logger.error("The cost function specified type is not valid")
+        return cost_columns
 
-        # Add the optimization status
-        opt_tp["optim_status"] = self.optim_status
+    def _set_timings(self, timings: Timings, opt_tp: pd.DataFrame | None = None) -> None:
+        """
+        Keep and log the phase durations (and memory) of the last optimization.
 
-        # Debug variables
-        if debug:
-            for k in range(self.optim_conf["number_of_deferrable_loads"]):
-                opt_tp[f"P_def_start_{k}"] = [P_def_start[k][i].varValue for i in set_I]
-                opt_tp[f"P_def_bin2_{k}"] = [P_def_bin2[k][i].varValue for i in set_I]
-        for i, predicted_temp in predicted_temps.items():
-            opt_tp[f"predicted_temp_heater{i}"] = pd.Series(
-                [
-                    round(pt.value(), 2)
-                    if isinstance(pt, plp.LpAffineExpression)
-                    else pt
-                    for pt in predicted_temp
-                ],
-                index=opt_tp.index,
-            )
-            opt_tp[f"target_temp_heater{i}"] = pd.Series(
-                self.optim_conf["def_load_config"][i]["thermal_config"][
-                    "desired_temperatures"
-                ],
-                index=opt_tp.index,
+        :param timings: The timings of the optimization phases
+        :type timings: Timings
+        :param opt_tp: The results, the durations are stored in their ``attrs``
+        :type opt_tp: pd.DataFrame, optional
+        """
+        self.last_timings = timings.log(self.logger, "perform_optimization")
+        metrics.observe_timings(self.last_timings)
+        if timings.memory is not None:
+            self.last_memory_report = timings.memory.log(
+                self.logger, "perform_optimization"
             )
+        if opt_tp is not None:
+            opt_tp.attrs["timings"] = self.last_timings
+            if timings.memory is not None:
+                opt_tp.attrs["memory_report"] = self.last_memory_report
+
+    def get_solve_stats(
+        self, opt_model: plp.LpProblem, n: int, log_path: str | None = None
+    ) -> dict:
+        r"""
+        Get the model size and the solver statistics of a solved problem.
+
+        The node count, iteration count and gap are read from the CBC log or from \
+        the HiGHS model info, they are None for the other solvers.
+
+        :param opt_model: The solved problem
+        :type opt_model: plp.LpProblem
+        :param n: The number of timesteps
+        :type n: int
+        :param log_path: The path of the CBC log of the solve
+        :type log_path: str, optional
+        :return: The statistics: status, variable counts by type, constraint rows, \
+            nonzeros, rows by constraint family (largest first), solve wall time \
+            in seconds, nodes, iterations, gap and the model configuration
+        :rtype: dict
+        """
+        variables = {"continuous": 0, "binary": 0, "integer": 0}
+        # The LP file writer adds a fixed dummy variable to the empty rows
+        dummy = opt_model.dummyVar
+        for var in opt_model.variables():
+            if var is dummy:
+                continue
+            if var.cat == plp.LpContinuous:
+                variables["continuous"] += 1
+            elif var.isBinary():
+                variables["binary"] += 1
+            else:
+                variables["integer"] += 1
+        nonzeros = sum(
+            len(constraint) - (dummy in constraint)
+            for constraint in opt_model.constraints.values()
+        )
+        if getattr(opt_model.constraints, "low_memory", False):
+            # The rows were counted by family when added, their names are dropped
+            families = dict(opt_model.constraints.families)
+        else:
+            families = {}
+            for name in opt_model.constraints:
+                # Drop the timestep (and sub-step) suffixes to group the rows by family
+                family = _constraint_family(name)
+                families[family] = families.get(family, 0) + 1
+        nodes, iterations, gap = None, None, None
+        if log_path is not None:
+            nodes, iterations, gap = self._parse_cbc_log(log_path)
+        elif hasattr(getattr(opt_model, "solverModel", None), "getInfo"):
+            info = opt_model.solverModel.getInfo()
+            nodes = getattr(info, "mip_node_count", None)
+            iterations = getattr(info, "simplex_iteration_count", None)
+            gap = getattr(info, "mip_gap", None)
+        nominal_powers = self.optim_conf["nominal_power_of_deferrable_loads"]
+        def_load_config = self.optim_conf.get("def_load_config", []) or []
+        return {
+            "status": plp.LpStatus[opt_model.status],
+            "solver": self.lp_solver,
+            "variables": variables,
+            "constraints": len(opt_model.constraints),
+            "nonzeros": nonzeros,
+            "constraint_families": dict(
+                sorted(families.items(), key=lambda item: item[1], reverse=True)
+            ),
+            "solve_time": opt_model.solutionTime,
+            "nodes": nodes,
+            "iterations": iterations,
+            "gap": gap,
+            "objective": plp.value(opt_model.objective),
+            "config": {
+                "timesteps": n,
+                "deferrable_loads": len(nominal_powers),
+                "sequence_loads": sum(isinstance(power, list) for power in nominal_powers),
+                "thermal_loads": sum(
+                    bool(config) and "thermal_config" in config
+                    for config in def_load_config[: len(nominal_powers)]
+                ),
+                "ev_loads": self.optim_conf.get("number_of_ev_loads", 0),
+                "battery": self.optim_conf["set_use_battery"],
+                "hybrid_inverter": self.plant_conf["inverter_is_hybrid"],
+                "costfun": self.costfun,
+            },
+        }
 
-        # Battery initialization logging
-        if self.optim_conf["set_use_battery"]:
-            self.logger.debug(
-                f"Battery usage enabled. Initial SOC: {soc_init}, Final SOC: {soc_final}"
-            )
+    @staticmethod
+    def _parse_cbc_log(log_path: str) -> tuple:
+        """
+        Read the node count, the iteration count and the gap from a CBC log.
 
-        # Deferrable load initialization logging
-        self.logger.debug(f"Deferrable load operating hours: {def_total_hours}")
-        self.logger.debug(f"Deferrable load timesteps: {def_total_timestep}")
-        self.logger.debug(f"Deferrable load start timesteps: {def_start_timestep}")
-        self.logger.debug(f"Deferrable load end timesteps: {def_end_timestep}")
+        :param log_path: The path of the CBC log
+        :type log_path: str
+        :return: The enumerated nodes, the total iterations and the relative gap \
+            (0 when the solution is proven optimal), None when not found
+        :rtype: tuple
+        """
+        try:
+            with open(log_path) as log_file:
+                log = log_file.read()
+        except OSError:
+            return None, None, None
+        values = {}
+        for key in ["Result", "Enumerated nodes", "Total iterations", "Gap"]:
+            match = re.search(rf"^{key}\s*[-:]\s*(.+)$", log, re.MULTILINE)
+            values[key] = match.group(1).strip() if match else None
+        nodes = int(values["Enumerated nodes"]) if values["Enumerated nodes"] else None
+        iterations = (
+            int(values["Total iterations"]) if values["Total iterations"] else None
+        )
+        if values["Gap"] is not None:
+            gap = float(values["Gap"])
+        elif values["Result"] is not None and values["Result"].startswith("Optimal"):
+            gap = 0.0
+        else:
+            gap = None
+        return nodes, iterations, gap
 
-        # Objective function logging
-        self.logger.debug(f"Selected cost function type: {self.costfun}")
+    @staticmethod
+    def _get_solution(n: int, variables: dict) -> dict:
+        r"""
+        Pull the values of the solved variables into a single array.
 
-        # Solver execution logging
-        self.logger.debug(f"Solver selected: {self.lp_solver}")
-        self.logger.info(f"Optimization status: {self.optim_status}")
-        return opt_tp
+        :param n: The number of timesteps
+        :type n: int
+        :param variables: The variable families, each a dict of variables per \
+            timestep or a list of such dicts
+        :type variables: dict
+        :return: The values of each family, of shape (n,) or (len(family), n), \
+            as views of one float array (NaN for the variables without value)
+        :rtype: dict
+
+        """
+        shapes = {}
+        solved = []
+        for name, family in variables.items():
+            rows = family if isinstance(family, list) else [family]
+            shapes[name] = (len(rows), n) if isinstance(family, list) else (n,)
+            for row in rows:
+                solved.extend(row[i].varValue for i in range(n))
+        values = np.array(solved, dtype=float)
+        solution = {}
+        start = 0
+        for name, shape in shapes.items():
+            size = int(np.prod(shape))
+            solution[name] = values[start : start + size].reshape(shape)
+            start += size
+        return solution
+
+    def _set_ev_conf(self, name: str, k: int, value) -> None:
+        r"""
+        Set the value of an EV configuration list for EV k.
+
+        The list is replaced rather than modified, as it can be shared with the \
+        params the optim_conf was built from.
+
+        """
+        values = list(self.optim_conf[name])
+        values[k] = value
+        self.optim_conf[name] = values
+
+    def _ev_soc_per_power(self, k: int) -> float:
+        r"""
+        Get the SOC gained by EV k per W charged during one timestep.
+
+        :param k: The index of the EV
+        :type k: int
+        :return: The SOC gained per W and per timestep
+        :rtype: float
+
+        """
+        num_ev_loads = self.optim_conf.get("number_of_ev_loads", 0)
+        efficiency = self.optim_conf.get("ev_charging_efficiency", [0.9] * num_ev_loads)[k]
+        return efficiency * self.timeStep / self.optim_conf["ev_battery_capacity"][k]
+
+    @staticmethod
+    def _greedy_take(slot_left: np.array, i: int, power: float, n: int) -> float:
+        r"""
+        Take power at timestep i from the PV surplus first, then from the grid.
+
+        :return: The power that could be taken
+        :rtype: float
+
+        """
+        from_surplus = min(power, slot_left[i])
+        from_grid = min(power - from_surplus, slot_left[n + i])
+        slot_left[i] -= from_surplus
+        slot_left[n + i] -= from_grid
+        return from_surplus + from_grid
+
+    @staticmethod
+    def _greedy_give(
+        slot_left: np.array, i: int, power: float, grid_room: np.array, n: int
+    ) -> None:
+        r"""
+        Give back power at timestep i to the grid import first, then to the PV surplus.
+
+        """
+        to_grid = min(power, grid_room[i] - slot_left[n + i])
+        slot_left[n + i] += to_grid
+        slot_left[i] += power - to_grid
+
+    @staticmethod
+    def _greedy_fill(
+        energy: float,
+        P_max: np.array,
+        slot_order: np.array,
+        slot_left: np.array,
+        n: int,
+    ) -> tuple[np.array, float]:
+        r"""
+        Fill an energy requirement (in W per timestep) with the cheapest capacity.
+
+        :return: The power allocated at each timestep, and the energy left unserved
+        :rtype: tuple(np.array, float)
+
+        """
+        power = np.zeros(n)
+        for slot in slot_order:
+            if energy <= 0:
+                break
+            i = slot % n
+            room = min(P_max[i] - power[i], slot_left[slot], energy)
+            if room <= 0:
+                continue
+            power[i] += room
+            slot_left[slot] -= room
+            energy -= room
+        return power, energy
+
+    def _profile_action(self, action: str):
+        r"""
+        Profile an action when ``profile_actions`` is set in the optimization config.
+
+        The profile is written to the ``profiles`` folder of the data path, see \
+        ``profiling.profile_action``.
+
+        :param action: The action name (dayahead-optim, naive-mpc-optim, ...)
+        :type action: str
+        :return: The context manager of ``profiling.profile_action``
+        :rtype: contextlib.AbstractContextManager
+        """
+        enabled = self.optim_conf.get("profile_actions", False)
+        if enabled and "data_path" not in self.emhass_conf:
+            self.logger.warning("No data_path to write the profile of %s to", action)
+            enabled = False
+        return profiling.profile_action(
+            action,
+            self.emhass_conf.get("data_path"),
+            self.logger,
+            enabled=enabled,
+            max_count=self.optim_conf.get(
+                "profile_max_count", profiling.PROFILE_MAX_COUNT
+            ),
+        )
 
     def perform_perfect_forecast_optim(
         self, df_input_data: pd.DataFrame, days_list: pd.date_range
@@ -1591,57 +2964,59 @@ class Optimization:
 
         """
         self.logger.info("Perform optimization for perfect forecast scenario")
-        self.days_list_tz = days_list.tz_convert(self.time_zone).round(self.freq)[
-            :-1
-        ]  # Converted to tz and without the current day (today)
-        self.opt_res = pd.DataFrame()
-        for day in self.days_list_tz:
-            self.logger.info(
-                "Solving for day: "
-                + str(day.day)
-                + "-"
-                + str(day.month)
-                + "-"
-                + str(day.year)
-            )
-            # Prepare data
-            if day.tzinfo is None:
-                day = day.replace(tzinfo=self.time_zone)  # Assign timezone if naive
-            else:
-                day = day.astimezone(self.time_zone)
-            day_start = day
-            day_end = day + self.time_delta - self.freq
-            if day_start.tzinfo != day_end.tzinfo:
-                self.logger.warning(
-                    f"Skipping day {day} as days have ddifferent timezone, probably because of DST."
+        with metrics.track_request("perfect-optim"), self._profile_action("perfect-optim"):
+            self.days_list_tz = days_list.tz_convert(self.time_zone).round(self.freq)[
+                :-1
+            ]  # Converted to tz and without the current day (today)
+            days_res = []
+            for day in self.days_list_tz:
+                self.logger.info(
+                    "Solving for day: "
+                    + str(day.day)
+                    + "-"
+                    + str(day.month)
+                    + "-"
+                    + str(day.year)
                 )
-                continue  # Skip this day and move to the next iteration
-            else:
-                day_start = day_start.astimezone(self.time_zone).isoformat()
-                day_end = day_end.astimezone(self.time_zone).isoformat()
-                # Generate the date range for the current day
-                day_range = pd.date_range(start=day_start, end=day_end, freq=self.freq)
-            # Check if all timestamps in the range exist in the DataFrame index
-            if not day_range.isin(df_input_data.index).all():
-                self.logger.warning(
-                    f"Skipping day {day} as some timestamps are missing in the data."
+                # Prepare data
+                if day.tzinfo is None:
+                    day = day.replace(tzinfo=self.time_zone)  # Assign timezone if naive
+                else:
+                    day = day.astimezone(self.time_zone)
+                day_start = day
+                day_end = day + self.time_delta - self.freq
+                if day_start.tzinfo != day_end.tzinfo:
+                    self.logger.warning(
+                        "Skipping day %s as days have ddifferent timezone, probably because of DST.",
+                        day,
+                    )
+                    continue  # Skip this day and move to the next iteration
+                else:
+                    day_start = day_start.astimezone(self.time_zone).isoformat()
+                    day_end = day_end.astimezone(self.time_zone).isoformat()
+                    # Generate the date range for the current day
+                    day_range = pd.date_range(start=day_start, end=day_end, freq=self.freq)
+                # Check if all timestamps in the range exist in the DataFrame index
+                if not day_range.isin(df_input_data.index).all():
+                    self.logger.warning(
+                        "Skipping day %s as some timestamps are missing in the data.", day
+                    )
+                    continue  # Skip this day and move to the next iteration
+                # If all timestamps exist, proceed with the data preparation
+                data_tp = df_input_data.loc[day_range]
+                P_PV = data_tp[self.var_PV].values
+                P_load = data_tp[self.var_load_new].values
+                unit_load_cost = data_tp[self.var_load_cost].values  # €/kWh
+                unit_prod_price = data_tp[self.var_prod_price].values  # €/kWh
+                # Call optimization function
+                opt_tp = self.perform_optimization(
+                    data_tp, P_PV, P_load, unit_load_cost, unit_prod_price
                 )
-                continue  # Skip this day and move to the next iteration
-            # If all timestamps exist, proceed with the data preparation
-            data_tp = df_input_data.copy().loc[day_range]
-            P_PV = data_tp[self.var_PV].values
-            P_load = data_tp[self.var_load_new].values
-            unit_load_cost = data_tp[self.var_load_cost].values  # €/kWh
-            unit_prod_price = data_tp[self.var_prod_price].values  # €/kWh
-            # Call optimization function
-            opt_tp = self.perform_optimization(
-                data_tp, P_PV, P_load, unit_load_cost, unit_prod_price
-            )
-            if len(self.opt_res) == 0:
-                self.opt_res = opt_tp
-            else:
-                self.opt_res = pd.concat([self.opt_res, opt_tp], axis=0)
+                if opt_tp is not None:
+                    days_res.append(opt_tp)
 
+            # Concatenated once, the results of the previous days are not copied each day
+            self.opt_res = pd.concat(days_res, axis=0) if days_res else pd.DataFrame()
         return self.opt_res
 
     def perform_dayahead_forecast_optim(
@@ -1664,16 +3039,17 @@ class Optimization:
 
         """
         self.logger.info("Perform optimization for the day-ahead")
-        unit_load_cost = df_input_data[self.var_load_cost].values  # €/kWh
-        unit_prod_price = df_input_data[self.var_prod_price].values  # €/kWh
-        # Call optimization function
-        self.opt_res = self.perform_optimization(
-            df_input_data,
-            P_PV.values.ravel(),
-            P_load.values.ravel(),
-            unit_load_cost,
-            unit_prod_price,
-        )
+        with metrics.track_request("dayahead-optim"), self._profile_action("dayahead-optim"):
+            unit_load_cost = df_input_data[self.var_load_cost].values  # €/kWh
+            unit_prod_price = df_input_data[self.var_prod_price].values  # €/kWh
+            # Call optimization function
+            self.opt_res = self.perform_optimization(
+                df_input_data,
+                P_PV.values.ravel(),
+                P_load.values.ravel(),
+                unit_load_cost,
+                unit_prod_price,
+            )
         return self.opt_res
 
     def perform_naive_mpc_optim(
@@ -1727,31 +3103,33 @@ class Optimization:
 
         """
         self.logger.info("Perform an iteration of a naive MPC controller")
-        if prediction_horizon < 5:
-            self.logger.error(
-                "Set the MPC prediction horizon to at least 5 times the optimization time step"
+        with metrics.track_request("naive-mpc-optim"), self._profile_action("naive-mpc-optim"):
+            if prediction_horizon < 5:
+                self.logger.error(
+                    "Set the MPC prediction horizon to at least 5 times the optimization time step"
+                )
+                return pd.DataFrame()
+            else:
+                # Only the horizon is copied, not the whole input data
+                df_input_data = df_input_data[
+                    df_input_data.index[0] : df_input_data.index[prediction_horizon - 1]
+                ].copy()
+            unit_load_cost = df_input_data[self.var_load_cost].values  # €/kWh
+            unit_prod_price = df_input_data[self.var_prod_price].values  # €/kWh
+            # Call optimization function
+            self.opt_res = self.perform_optimization(
+                df_input_data,
+                P_PV.values.ravel(),
+                P_load.values.ravel(),
+                unit_load_cost,
+                unit_prod_price,
+                soc_init=soc_init,
+                soc_final=soc_final,
+                def_total_hours=def_total_hours,
+                def_total_timestep=def_total_timestep,
+                def_start_timestep=def_start_timestep,
+                def_end_timestep=def_end_timestep,
             )
-            return pd.DataFrame()
-        else:
-            df_input_data = copy.deepcopy(df_input_data)[
-                df_input_data.index[0] : df_input_data.index[prediction_horizon - 1]
-            ]
-        unit_load_cost = df_input_data[self.var_load_cost].values  # €/kWh
-        unit_prod_price = df_input_data[self.var_prod_price].values  # €/kWh
-        # Call optimization function
-        self.opt_res = self.perform_optimization(
-            df_input_data,
-            P_PV.values.ravel(),
-            P_load.values.ravel(),
-            unit_load_cost,
-            unit_prod_price,
-            soc_init=soc_init,
-            soc_final=soc_final,
-            def_total_hours=def_total_hours,
-            def_total_timestep=def_total_timestep,
-            def_start_timestep=def_start_timestep,
-            def_end_timestep=def_end_timestep,
-        )
         return self.opt_res
 
     @staticmethod
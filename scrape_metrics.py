@@ -0,0 +1,126 @@
+#!/usr/bin/env python3
+"""
+Scrape the /metrics endpoint of an EMHASS instance and check its content.
+
+Usage:
+    python scrape_metrics.py http://localhost:5004/metrics --count 4 --interval 15
+
+Exits with status 1 when the endpoint cannot be read or a metric family is missing.
+"""
+import argparse
+import re
+import sys
+import time
+
+import requests
+
+REQUIRED_FAMILIES = [
+    "emhass_request_duration_seconds",
+    "emhass_solve_duration_seconds",
+    "emhass_model_build_duration_seconds",
+    "emhass_requests_in_progress",
+    "emhass_cache_hits_total",
+    "emhass_cache_misses_total",
+    "process_resident_memory_bytes",
+]
+
+SAMPLE_PATTERN = re.compile(r"^([a-zA-Z_:][a-zA-Z0-9_:]*)(?:\{(.*)\})?\s+(\S+)$")
+LABEL_PATTERN = re.compile(r'(\w+)="((?:[^"\\]|\\.)*)"')
+
+
+def parse_metrics(text):
+    """Parse the text exposition format into {family: {"type": ..., "samples": [...]}}"""
+    families = {}
+    for line in text.splitlines():
+        if line.startswith("# TYPE "):
+            _, _, name, metric_type = line.split(" ", 3)
+            families[name] = {"type": metric_type, "samples": []}
+        elif line and not line.startswith("#"):
+            match = SAMPLE_PATTERN.match(line)
+            if match is None:
+                raise ValueError(f"Invalid sample line: {line}")
+            name, labels, value = match.groups()
+            family = re.sub(r"_(bucket|sum|count)$", "", name)
+            if family not in families:
+                family = name
+            families.setdefault(family, {"type": "untyped", "samples": []})
+            families[family]["samples"].append(
+                (name, dict(LABEL_PATTERN.findall(labels or "")), float(value))
+            )
+    return families
+
+
+def check_metrics(families, required=REQUIRED_FAMILIES):
+    """Return the missing metric families"""
+    return [name for name in required if name not in families]
+
+
+def summarize(families):
+    """Summary lines: request counts and mean latencies, cache hit rates and RSS"""
+    lines = []
+    requests_family = families.get("emhass_request_duration_seconds", {"samples": []})
+    counts = {
+        labels["action"]: value
+        for name, labels, value in requests_family["samples"]
+        if name.endswith("_count")
+    }
+    sums = {
+        labels["action"]: value
+        for name, labels, value in requests_family["samples"]
+        if name.endswith("_sum")
+    }
+    for action, count in counts.items():
+        mean = sums[action] / count if count else float("nan")
+        lines.append(f"{action}: {int(count)} requests, mean {mean * 1000:.1f} ms")
+    hits = {
+        labels["cache"]: value
+        for _, labels, value in families.get("emhass_cache_hits_total", {"samples": []})["samples"]
+    }
+    misses = {
+        labels["cache"]: value
+        for _, labels, value in families.get("emhass_cache_misses_total", {"samples": []})["samples"]
+    }
+    for cache, hit_count in hits.items():
+        total = hit_count + misses.get(cache, 0)
+        rate = hit_count / total if total else float("nan")
+        lines.append(f"cache {cache}: {rate:.1%} hit rate over {int(total)} lookups")
+    for _, _, value in families.get("process_resident_memory_bytes", {"samples": []})["samples"]:
+        lines.append(f"RSS: {value / 2**20:.1f} MiB")
+    return lines
+
+
+def scrape(url, timeout=5):
+    """Read the endpoint, return the parsed families and the scrape duration in seconds"""
+    start = time.perf_counter()
+    response = requests.get(url, timeout=timeout)
+    response.raise_for_status()
+    families = parse_metrics(response.text)
+    return families, time.perf_counter() - start
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("url", nargs="?", default="http://localhost:5004/metrics")
+    parser.add_argument("--count", type=int, default=1, help="Number of scrapes")
+    parser.add_argument("--interval", type=float, default=15, help="Seconds between scrapes")
+    args = parser.parse_args(argv)
+    for i in range(args.count):
+        if i:
+            time.sleep(args.interval)
+        try:
+            families, duration = scrape(args.url)
+        except (requests.RequestException, ValueError) as e:
+            print(f"Scrape failed: {e}")
+            return 1
+        print(f"Scraped {len(families)} metric families in {duration * 1000:.1f} ms")
+        for line in summarize(families):
+            print(f"  {line}")
+        missing = check_metrics(families)
+        if missing:
+            print(f"Missing metric families: {', '.join(missing)}")
+            return 1
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
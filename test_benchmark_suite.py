@@ -0,0 +1,133 @@
+#!/usr/bin/env python3
+"""
+Test the scenario generator and the regression gates of the optimization benchmark
+"""
+import copy
+import sys
+
+sys.path.append('/workspaces/emhass/src')
+
+import benchmark_optimization as benchmark
+import numpy as np
+from emhass.optimization import Optimization
+
+
+def test_scenarios_are_reproducible():
+    for scenario in benchmark.SCENARIOS.values():
+        _, optim_conf, _, data = benchmark.generate_scenario(scenario)
+        _, optim_conf_again, _, data_again = benchmark.generate_scenario(scenario)
+        assert len(data) == scenario.timesteps
+        assert data.equals(data_again)
+        assert optim_conf == optim_conf_again
+        assert optim_conf["number_of_deferrable_loads"] == (
+            scenario.deferrable_loads + scenario.thermal_loads + scenario.sequence_loads
+        )
+        assert len(optim_conf["ev_availability"]) == scenario.ev_loads
+
+
+def test_run_benchmark():
+    scenario = benchmark.Scenario("small_ev", horizon_hours=6, deferrable_loads=1, ev_loads=1)
+    result = benchmark.run_benchmark(scenario, "PULP_CBC_CMD", repeat=1)
+    assert result["status"] == "Optimal"
+    assert result["variables"] > 0 and result["constraints"] > 0
+    assert result["peak_memory_mb"] > 0
+    for metric in benchmark.TIME_METRICS:
+        assert result[metric] >= 0
+    assert benchmark.compare({"results": [result]}, {"results": [result]}) == []
+
+
+def test_hybrid_inverter_efficiencies():
+    scenario = benchmark.Scenario("hybrid", battery=True, hybrid_inverter=True)
+    retrieve_hass_conf, optim_conf, plant_conf, data = benchmark.generate_scenario(scenario)
+    plant_conf.update(inverter_efficiency_dc_ac=0.95, inverter_efficiency_ac_dc=0.9)
+    opt = Optimization(
+        retrieve_hass_conf,
+        optim_conf,
+        plant_conf,
+        "unit_load_cost",
+        "unit_prod_price",
+        scenario.costfun,
+        {},
+        benchmark.logger,
+    )
+    # An empty battery that must be full at the end is also charged from the grid
+    opt_res = opt.perform_optimization(
+        data,
+        data["P_PV"].values,
+        data["P_load"].values,
+        data["unit_load_cost"].values,
+        data["unit_prod_price"].values,
+        soc_init=0.1,
+        soc_final=0.9,
+    )
+    assert opt.optim_status == "Optimal"
+    # The AC power is the DC power after the DC->AC losses, or before the AC->DC losses
+    dc_power = (opt_res["P_PV"] + opt_res["P_batt"]).to_numpy()
+    assert (dc_power > 1).any() and (dc_power < -1).any()
+    expected = np.where(dc_power >= 0, dc_power * 0.95, dc_power / 0.9)
+    np.testing.assert_allclose(opt_res["P_hybrid_inverter"], expected, atol=1e-2)
+
+
+def test_compare_gates():
+    base = {
+        "scenario": "ev_day",
+        "solver": "PULP_CBC_CMD",
+        "status": "Optimal",
+        "objective": -1.5,
+        "variables": 672,
+        "constraints": 962,
+        "nonzeros": 2500,
+        "build_ms": 100.0,
+        "solve_ms": 2.0,
+        "extraction_ms": 4.0,
+        "peak_memory_mb": 2.0,
+    }
+    result = copy.deepcopy(base)
+    # The wall-clock times are not gated by default
+    result.update(build_ms=500.0, solve_ms=15.0, peak_memory_mb=2.3)
+    assert benchmark.compare({"results": [result]}, {"results": [base]}) == []
+
+    result.update(
+        status="Infeasible", constraints=963, objective=-1.4, peak_memory_mb=2.5
+    )
+    failures = benchmark.compare({"results": [result]}, {"results": [base]})
+    assert failures == [
+        "ev_day [PULP_CBC_CMD]: status Infeasible",
+        "ev_day [PULP_CBC_CMD]: constraints changed from 962 to 963",
+        "ev_day [PULP_CBC_CMD]: objective changed from -1.5 to -1.4",
+        "ev_day [PULP_CBC_CMD]: peak_memory_mb 2.5 above 2.4 (baseline 2.0)",
+    ]
+
+
+def test_compare_time_gates():
+    base = {
+        "scenario": "ev_day",
+        "solver": "PULP_CBC_CMD",
+        "status": "Optimal",
+        "objective": -1.5,
+        "variables": 672,
+        "constraints": 962,
+        "nonzeros": 2500,
+        "build_ms": 100.0,
+        "solve_ms": 2.0,
+        "extraction_ms": 4.0,
+        "peak_memory_mb": 2.0,
+    }
+    result = copy.deepcopy(base)
+    # Within the relative tolerance and the absolute timer noise
+    result.update(build_ms=190.0, solve_ms=15.0)
+    assert benchmark.compare(
+        {"results": [result]}, {"results": [base]}, time_tolerance=1.0
+    ) == []
+    result.update(build_ms=210.0)
+    assert benchmark.compare(
+        {"results": [result]}, {"results": [base]}, time_tolerance=1.0
+    ) == ["ev_day [PULP_CBC_CMD]: build_ms 210.0 above 200.0 (baseline 100.0)"]
+
+    # The median of too few repeats is too noisy to be gated
+    try:
+        benchmark.main(["--repeat", "1", "--time-tolerance", "1.0"])
+    except SystemExit as error:
+        assert error.code == 2
+    else:
+        raise AssertionError("The time gates must need a minimum repeat count")
@@ -0,0 +1,92 @@
+#!/usr/bin/env python3
+"""
+Test the compact binary encoding of the runtime parameters
+"""
+import json
+import logging
+import pathlib
+import sys
+import time
+
+import numpy as np
+
+sys.path.append('/workspaces/emhass/src')
+
+from emhass import utils
+
+logger = logging.getLogger("test_binary_request")
+emhass_conf = {
+    "associations_path": pathlib.Path(__file__).parent / "emhass-ev" / "associations.csv",
+    "ev_config_path": pathlib.Path("/nonexistent/config.json"),
+}
+params_secrets = {
+    "time_zone": "Europe/Brussels",
+    "Latitude": 50.8,
+    "Longitude": 4.3,
+    "Altitude": 50,
+    "hass_url": "http://localhost:8123",
+    "long_lived_token": "token",
+}
+
+
+def build_runtimeparams(n=288, num_ev=10):
+    rng = np.random.default_rng(0)
+    return {
+        "prediction_horizon": n,
+        "pv_power_forecast": (rng.random(n) * 5000).tolist(),
+        "load_power_forecast": (rng.random(n) * 1000).tolist(),
+        "load_cost_forecast": (rng.random(n) * 0.3).tolist(),
+        "prod_price_forecast": (rng.random(n) * 0.1).tolist(),
+        "number_of_ev_loads": num_ev,
+        "ev_availability": rng.integers(0, 2, (num_ev, n)).tolist(),
+        "ev_minimum_soc_schedule": (rng.random((num_ev, n)) * 0.8).tolist(),
+        "ev_initial_soc": [0.2] * num_ev,
+    }
+
+
+def test_binary_encoding_round_trip():
+    runtimeparams = build_runtimeparams()
+    payload_json = json.dumps(runtimeparams)
+    payload_binary = utils.encode_runtimeparams(runtimeparams)
+    print(f"json payload {len(payload_json)} bytes, binary payload {len(payload_binary)} bytes")
+    assert len(payload_binary) < len(payload_json) / 2
+
+    start = time.perf_counter()
+    decoded = utils.decode_runtimeparams(payload_binary)
+    print(f"binary payload decoded in {(time.perf_counter() - start) * 1000:.2f} ms")
+    assert decoded["ev_availability"].dtype == np.uint8
+    assert decoded["ev_availability"].shape == (10, 288)
+    assert not decoded["ev_availability"].flags.writeable
+    assert np.array_equal(decoded["ev_availability"], runtimeparams["ev_availability"])
+    assert np.allclose(decoded["pv_power_forecast"], runtimeparams["pv_power_forecast"], atol=1e-3)
+    assert decoded["ev_initial_soc"] == runtimeparams["ev_initial_soc"]
+    assert decoded["prediction_horizon"] == 288
+
+
+def test_treat_runtimeparams_with_binary_encoding():
+    """Both encodings give the same params"""
+    config = utils.build_config(
+        emhass_conf,
+        logger,
+        pathlib.Path(__file__).parent / "emhass-ev" / "config_defaults.json",
+    )
+    params = utils.Params.from_dict(
+        utils.build_params(emhass_conf, params_secrets, config, logger)
+    )
+    runtimeparams = build_runtimeparams(n=48, num_ev=2)
+    results = []
+    for payload in [
+        json.dumps(runtimeparams),
+        utils.encode_runtimeparams(runtimeparams, {key: "float64" for key in runtimeparams if "forecast" in key} | {"ev_availability": "uint8"}),
+    ]:
+        retrieve_hass_conf, optim_conf, plant_conf = utils.get_yaml_parse(params, logger)
+        results.append(
+            utils.treat_runtimeparams(
+                payload, params, retrieve_hass_conf, optim_conf, plant_conf,
+                "naive-mpc-optim", logger, emhass_conf,
+            )
+        )
+    (params_json, _, optim_json, _), (params_binary, _, optim_binary, _) = results
+    assert json.loads(params_binary.to_json()) == json.loads(params_json.to_json())
+    assert isinstance(optim_binary["ev_availability"], np.ndarray)
+    assert np.array_equal(optim_binary["ev_availability"], optim_json["ev_availability"])
@@ -0,0 +1,93 @@
+#!/usr/bin/env python3
+"""
+Test the cached loading of the configuration files
+"""
+import json
+import logging
+import os
+import pathlib
+import sys
+
+sys.path.append('/workspaces/emhass/src')
+
+from emhass import utils
+
+logger = logging.getLogger("test_config_cache")
+defaults_path = pathlib.Path(__file__).parent / "emhass-ev" / "config_defaults.json"
+
+
+def write_ev_config(path, number_of_ev_loads):
+    with open(path, "w") as f:
+        json.dump({"params": {"ev_conf": {"number_of_ev_loads": number_of_ev_loads}}}, f)
+
+
+def test_config_cached_until_modified(tmp_path):
+    """The files are parsed once and reloaded only when their mtime changes"""
+    ev_config_path = tmp_path / "config.json"
+    write_ev_config(ev_config_path, 2)
+    emhass_conf = {"ev_config_path": ev_config_path}
+
+    config = utils.build_config(emhass_conf, logger, defaults_path)
+    assert config["number_of_ev_loads"] == 2
+    assert config["set_use_ev"] is True
+    # Modifying the returned config does not change the cached one
+    config["ev_battery_capacity"].append(1)
+    config["number_of_ev_loads"] = 5
+    cached_content = utils._config_file_cache[str(ev_config_path)][1]
+    config = utils.build_config(emhass_conf, logger, defaults_path)
+    assert config["number_of_ev_loads"] == 2
+    assert config["ev_battery_capacity"] == [75000]
+    assert utils._config_file_cache[str(ev_config_path)][1] is cached_content
+
+    write_ev_config(ev_config_path, 3)
+    stat = os.stat(ev_config_path)
+    os.utime(ev_config_path, ns=(stat.st_atime_ns, stat.st_mtime_ns + 10**9))
+    config = utils.build_config(emhass_conf, logger, defaults_path)
+    assert config["number_of_ev_loads"] == 3
+
+
+def test_config_without_ev_file(tmp_path):
+    emhass_conf = {"ev_config_path": tmp_path / "missing.json"}
+    config = utils.build_config(emhass_conf, logger, defaults_path)
+    assert config["number_of_ev_loads"] == 0
+    assert config["ev_battery_capacity"] == [75000]
+
+
+def test_associations_registry(tmp_path):
+    """The associations file is indexed once and reloaded when modified"""
+    associations_path = tmp_path / "associations.csv"
+    associations_path.write_text(
+        (pathlib.Path(__file__).parent / "emhass-ev" / "associations.csv").read_text()
+    )
+    associations = utils.get_associations(associations_path, logger)
+    assert associations["by_parameter"]["number_of_ev_loads"] == [
+        ("optim_conf", "number_of_ev_loads")
+    ]
+    assert associations["by_legacy_name"]["P_deferrable_nom"] == [
+        ("optim_conf", "nominal_power_of_deferrable_loads")
+    ]
+    assert associations["by_list_name"]["list_ev_initial_soc"] == [
+        ("optim_conf", "ev_initial_soc")
+    ]
+    assert "ev_initial_soc" in associations["by_category"]["optim_conf"]
+    assert utils.get_associations(associations_path, logger) is associations
+
+    with open(associations_path, "a") as f:
+        f.write("optim_conf,new_param,new_param\n")
+    stat = os.stat(associations_path)
+    os.utime(associations_path, ns=(stat.st_atime_ns, stat.st_mtime_ns + 10**9))
+    associations = utils.get_associations(associations_path, logger)
+    assert "new_param" in associations["by_parameter"]
+    assert utils.get_associations(tmp_path / "missing.csv", logger) is None
+
+
+def test_build_params_with_associations():
+    emhass_conf = {
+        "associations_path": pathlib.Path(__file__).parent / "emhass-ev" / "associations.csv",
+        "ev_config_path": pathlib.Path("/nonexistent/config.json"),
+    }
+    config = utils.build_config(emhass_conf, logger, defaults_path)
+    params = utils.build_params(emhass_conf, {}, config, logger)
+    assert params["optim_conf"]["number_of_ev_loads"] == 0
+    assert params["optim_conf"]["optimization_engine"] == "milp"
+    assert params["plant_conf"]["maximum_power_from_grid"] == config["maximum_power_from_grid"]
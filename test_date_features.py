@@ -0,0 +1,86 @@
+#!/usr/bin/env python3
+"""
+Test the cached date features against the pandas date accessors
+"""
+import sys
+import time
+
+import numpy as np
+import pandas as pd
+
+sys.path.append('/workspaces/emhass/src')
+
+from emhass import utils
+
+
+def reference_features(index):
+    return pd.DataFrame(
+        {
+            "year": index.year,
+            "month": index.month,
+            "day_of_week": index.dayofweek,
+            "day_of_year": index.dayofyear,
+            "day": index.day,
+            "hour": index.hour,
+        },
+        index=index,
+    )
+
+
+def test_date_features_match_pandas():
+    """The integer arithmetic gives the pandas values, in local time for aware indexes"""
+    rng = np.random.default_rng(0)
+    seconds = rng.integers(-2_208_988_800, 4_102_444_800, 20000)
+    for time_zone in [None, "Europe/Brussels", "America/St_Johns"]:
+        index = pd.DatetimeIndex(pd.to_datetime(seconds, unit="s"))
+        if time_zone is not None:
+            index = index.tz_localize("UTC").tz_convert(time_zone)
+        features = utils.get_date_features(index)
+        pd.testing.assert_frame_equal(
+            features, reference_features(index), check_dtype=False
+        )
+
+
+def test_add_date_features_leaves_data_untouched():
+    index = pd.date_range("2025-01-01", periods=96, freq="15min", tz="Europe/Brussels")
+    data = pd.DataFrame({"power": np.arange(96.0)}, index=index)
+    df = utils.add_date_features(data, date_features=["hour", "day_of_week"])
+    assert list(data.columns) == ["power"]
+    assert list(df.columns) == ["power", "hour", "day_of_week"]
+    assert np.shares_memory(df["power"].to_numpy(), data["power"].to_numpy())
+    # The added columns are writable copies of the cached features
+    df.loc[index[0], "hour"] = 5
+    assert utils.get_date_features(index, ["hour"])["hour"].iloc[0] == 0
+    # Timestamp column, features in UTC
+    data = data.reset_index(names="timestamp")
+    df = utils.add_date_features(data, timestamp="timestamp", date_features=["hour"])
+    assert df["hour"].iloc[0] == 23
+    assert str(data["timestamp"].dt.tz) == "Europe/Brussels"
+
+
+def test_date_features_cached():
+    """Repeated calls on the same history reuse the computed features"""
+    index = pd.date_range("2024-01-01", periods=60 * 96, freq="15min", tz="UTC")
+    data = pd.DataFrame({"power": np.ones(len(index))}, index=index)
+    utils._date_features_cache.clear()
+    start = time.perf_counter()
+    utils.add_date_features(data)
+    first_call = time.perf_counter() - start
+    start = time.perf_counter()
+    features = utils.get_date_features(data.index.copy())
+    cached_call = time.perf_counter() - start
+    print(f"first call {first_call * 1e3:.2f} ms, cached call {cached_call * 1e3:.2f} ms")
+    assert len(utils._date_features_cache) == 1
+    assert not features["year"].to_numpy().flags.writeable
+    # Another history of the same length gets its own entry, keyed by a digest
+    shifted = utils.get_date_features(index + pd.Timedelta(days=400))
+    assert len(utils._date_features_cache) == 2
+    assert (shifted["year"] == 2025).all()
+    assert all(len(key[0]) == 16 for key in utils._date_features_cache)
+
+
+if __name__ == "__main__":
+    test_date_features_match_pandas()
+    test_add_date_features_leaves_data_untouched()
+    test_date_features_cached()
+    print("🎉 Date features tests PASSED!")
@@ -0,0 +1,127 @@
+#!/usr/bin/env python3
+"""
+Compare the compact EV encoding (no SOC variables) with the SOC encoding
+"""
+import sys
+import time
+
+import numpy as np
+
+sys.path.append('/workspaces/emhass/src')
+
+from benchmark_optimization import Scenario, run_once
+from emhass import utils
+from test_greedy_engine import build_optimization, run_optimization
+
+
+def build_long_horizon(compact, n):
+    """Build a MILP problem with two EVs over n timesteps"""
+    opt, data = build_optimization("milp", n=n)
+    opt.optim_conf.update(
+        {
+            "ev_compact_soc_encoding": compact,
+            "number_of_ev_loads": 2,
+            "ev_battery_capacity": [60000, 40000],
+            "ev_charging_efficiency": [0.9, 0.95],
+            "ev_nominal_charging_power": [7400, 3700],
+            "ev_minimum_charging_power": [1380, 1380],
+            "ev_availability": [[1] * n, [1] * (n // 2) + [0] * (n - n // 2)],
+            "ev_minimum_soc_schedule": [
+                [0.2] * (n // 3) + [0.8] * (n - n // 3),
+                [0.3] * (n // 4) + [0.7] * (n - n // 4),
+            ],
+            "ev_initial_soc": [0.2, 0.3],
+        }
+    )
+    return opt, data
+
+
+def test_compact_encoding_matches_soc_encoding():
+    """Same cost and SOC profiles with and without the SOC variables"""
+    for n in [48, 288]:
+        results = {}
+        for compact in [False, True]:
+            opt, data = build_long_horizon(compact, n)
+            start = time.perf_counter()
+            results[compact] = run_optimization(opt, data)
+            elapsed = time.perf_counter() - start
+            print(f"n={n}, compact={compact}: solved in {elapsed * 1000:.0f} ms")
+            assert opt.optim_status == "Optimal"
+        res_soc, res_compact = results[False], results[True]
+        assert list(res_compact.columns) == list(res_soc.columns)
+        assert np.isclose(
+            res_compact["cost_fun_profit"].sum(),
+            res_soc["cost_fun_profit"].sum(),
+            rtol=1e-3,
+        )
+        for k in range(2):
+            assert (res_compact[f"SOC_ev{k}"] <= 1 + 1e-6).all()
+        assert (res_compact["SOC_ev0"].values[n // 3 :] >= 0.8 - 1e-6).all()
+        assert (res_compact["SOC_ev1"].values[n // 4 :] >= 0.7 - 1e-6).all()
+
+
+def test_initial_soc_below_first_requirement():
+    """The first requirement is skipped, the same requirement later still binds"""
+    n = 48
+    results = {}
+    for compact in [False, True]:
+        opt, data = build_optimization("milp", n=n)
+        opt.optim_conf.update(
+            {
+                "ev_compact_soc_encoding": compact,
+                "ev_availability": [[1] * n],
+                "ev_minimum_soc_schedule": [[0.25] * 16 + [0.8] * 32],
+            }
+        )
+        # Charging is cheaper after the requirement of 0.25
+        data["unit_load_cost"] = np.where(np.arange(n) < 16, 0.5, 0.15)
+        results[compact] = run_optimization(opt, data)
+        assert opt.optim_status == "Optimal"
+        assert results[compact]["SOC_ev0"].iloc[0] == 0.2
+        assert (results[compact]["SOC_ev0"].values[1:16] >= 0.25 - 1e-6).all()
+    assert np.isclose(
+        results[True]["cost_fun_profit"].sum(),
+        results[False]["cost_fun_profit"].sum(),
+        rtol=1e-3,
+    )
+
+
+def test_compact_encoding_with_battery():
+    """The EV initial SOC does not replace the battery one in the results"""
+    scenario = Scenario("battery_ev", horizon_hours=6, timestep_minutes=15, ev_loads=1, battery=True)
+    results = {}
+    for compact in [False, True]:
+        opt = run_once(scenario, "PULP_CBC_CMD", {"ev_compact_soc_encoding": compact})
+        assert opt.optim_status == "Optimal"
+        results[compact] = opt.last_optim_results
+    # The scenario only tells the two initial SOC apart when they differ
+    assert opt.optim_conf["ev_initial_soc"][0] != opt.plant_conf["battery_target_state_of_charge"]
+    np.testing.assert_allclose(results[True]["SOC_opt"], results[False]["SOC_opt"], atol=1e-6)
+    np.testing.assert_allclose(results[True]["SOC_ev0"], results[False]["SOC_ev0"], atol=1e-6)
+
+
+def test_binary_encoded_schedule():
+    """A read-only float64 schedule of the runtime params is left untouched"""
+    n = 48
+    schedule = [0.25] * 16 + [0.8] * 32
+    decoded = utils.decode_runtimeparams(
+        utils.encode_runtimeparams(
+            {"ev_minimum_soc_schedule": [schedule]}, {"ev_minimum_soc_schedule": "float64"}
+        )
+    )
+    assert not decoded["ev_minimum_soc_schedule"].flags.writeable
+    for compact in [False, True]:
+        opt, data = build_optimization("milp", n=n)
+        opt.optim_conf["ev_compact_soc_encoding"] = compact
+        opt.optim_conf["ev_minimum_soc_schedule"] = decoded["ev_minimum_soc_schedule"]
+        run_optimization(opt, data)
+        assert opt.optim_status == "Optimal"
+    assert decoded["ev_minimum_soc_schedule"][0].tolist() == schedule
+
+
+if __name__ == "__main__":
+    test_compact_encoding_matches_soc_encoding()
+    test_initial_soc_below_first_requirement()
+    test_compact_encoding_with_battery()
+    test_binary_encoded_schedule()
+    print("🎉 Compact EV encoding tests PASSED!")
@@ -0,0 +1,90 @@
+#!/usr/bin/env python3
+"""
+Test the incremental EV session updates between optimizations
+"""
+import numpy as np
+
+from test_greedy_engine import build_optimization, run_optimization
+
+
+def test_target_changed_updates_only_the_vehicle():
+    """A new target SOC re-optimizes the EV and keeps the other loads"""
+    opt, data = build_optimization("auto")
+    res = run_optimization(opt, data)
+    res_updated = opt.perform_ev_session_update(
+        0, "target_changed", timestep=40, target_soc=0.95
+    )
+    assert opt.optim_status == "Optimal"
+    assert (res_updated["SOC_ev0"].values[40:] >= 0.95 - 1e-6).all()
+    for col in ["P_deferrable0", "P_deferrable1", "P_PV", "P_Load"]:
+        assert np.allclose(res_updated[col], res[col])
+    assert opt.optim_conf["ev_minimum_soc_schedule"][0][40] == 0.95
+
+
+def test_soc_update_and_unplugged():
+    """A higher SOC needs less charging, an unplugged EV is not charged anymore"""
+    opt, data = build_optimization("auto")
+    res = run_optimization(opt, data)
+    res_soc = opt.perform_ev_session_update(0, "soc_update", soc=0.5)
+    assert res_soc["P_ev0"].sum() < res["P_ev0"].sum()
+    assert np.isclose(res_soc["SOC_ev0"].values[0], 0.5)
+    res_unplugged = opt.perform_ev_session_update(0, "unplugged", timestep=4)
+    assert opt.optim_status == "Optimal"
+    assert res_unplugged["P_ev0"].values[4:].sum() == 0
+    assert opt.ev_sessions[0]["plugged_in"] is False
+
+
+def test_soc_update_at_timestep():
+    """The SOC read at a timestep keeps the charging before it"""
+    opt, data = build_optimization("auto")
+    res = run_optimization(opt, data)
+    res_soc = opt.perform_ev_session_update(0, "soc_update", timestep=10, soc=0.6)
+    assert opt.optim_status == "Optimal"
+    assert np.allclose(res_soc["P_ev0"].values[:10], res["P_ev0"].values[:10])
+    assert np.isclose(res_soc["SOC_ev0"].values[10], 0.6)
+    assert (res_soc["SOC_ev0"].values[16:] >= 0.8 - 1e-6).all()
+    assert opt.ev_sessions[0]["soc_timestep"] == 10
+
+
+def test_soc_update_at_timestep_with_milp_engine():
+    """The MILP re-optimization also keeps the charging before the SOC reading"""
+    opt, data = build_optimization("milp")
+    res = run_optimization(opt, data)
+    res_soc = opt.perform_ev_session_update(0, "soc_update", timestep=10, soc=0.6)
+    assert opt.optim_status == "Optimal"
+    assert np.allclose(res_soc["P_ev0"].values[:10], res["P_ev0"].values[:10])
+    assert np.isclose(res_soc["SOC_ev0"].values[10], 0.6)
+    assert (res_soc["SOC_ev0"].values[16:] >= 0.8 - 1e-6).all()
+    assert opt.ev_fixed_power == {}
+
+
+def test_soc_update_restores_status():
+    """The status follows the new fill, not the previous one"""
+    opt, data = build_optimization("auto")
+    # 0.2 -> 0.95 SOC in 4 timesteps is not reachable at 7.4 kW
+    opt.optim_conf["ev_minimum_soc_schedule"] = [[0.2] * 4 + [0.95] * 44]
+    run_optimization(opt, data)
+    assert opt.optim_status == "Infeasible"
+    opt.perform_ev_session_update(0, "soc_update", soc=0.95)
+    assert opt.optim_status == "Optimal"
+
+
+def test_session_update_with_milp_engine():
+    """With the MILP engine the event triggers a full re-optimization"""
+    opt, data = build_optimization("milp")
+    run_optimization(opt, data)
+    res_updated = opt.perform_ev_session_update(0, "plugged_in", soc=0.3)
+    assert opt.optim_status == "Optimal"
+    assert (res_updated["P_ev0"] <= 7400 + 1e-6).all()
+    assert opt.optim_conf["ev_availability"][0] == [1] * 48
+    assert opt.perform_ev_session_update(0, "unknown") is res_updated
+
+
+if __name__ == "__main__":
+    test_target_changed_updates_only_the_vehicle()
+    test_soc_update_and_unplugged()
+    test_soc_update_at_timestep()
+    test_soc_update_at_timestep_with_milp_engine()
+    test_soc_update_restores_status()
+    test_session_update_with_milp_engine()
+    print("🎉 EV session update tests PASSED!")
@@ -0,0 +1,91 @@
+#!/usr/bin/env python3
+"""
+Test the pre-flight feasibility check of the EV and deferrable load requirements
+"""
+import json
+import sys
+import time
+
+import numpy as np
+
+sys.path.append('/workspaces/emhass/src')
+
+from emhass import utils
+from test_greedy_engine import build_optimization, run_optimization
+
+
+def build_unreachable(engine, feasibility_check):
+    """Build a problem where neither the EV nor deferrable load 0 can be satisfied"""
+    opt, data = build_optimization(engine)
+    opt.feasibility_check = feasibility_check
+    # 0.2 -> 0.95 SOC in 4 timesteps is not reachable at 7.4 kW
+    opt.optim_conf["ev_minimum_soc_schedule"] = [[0.2] * 4 + [0.95] * 44]
+    # 4 hours of operation in a 2 hours window
+    opt.optim_conf["start_timesteps_of_each_deferrable_load"] = [10, 0]
+    opt.optim_conf["end_timesteps_of_each_deferrable_load"] = [14, 0]
+    return opt, data
+
+
+def test_feasibility_diagnostics_and_reject():
+    """Both unreachable requirements are reported and the MILP is not built"""
+    opt, data = build_unreachable("milp", "reject")
+    start = time.perf_counter()
+    res = run_optimization(opt, data)
+    elapsed = time.perf_counter() - start
+    print(f"Rejected in {elapsed * 1000:.1f} ms")
+    assert res is None
+    assert opt.optim_status == "Infeasible"
+    diagnostics = {d["load"]: d for d in opt.feasibility_diagnostics}
+    assert diagnostics["deferrable0"]["requirement"] == "operating_timesteps"
+    assert diagnostics["deferrable0"]["required"] == 8
+    assert diagnostics["deferrable0"]["reachable"] == 4
+    assert diagnostics["ev0"]["requirement"] == "minimum_soc"
+    assert diagnostics["ev0"]["timestep"] == 4
+    assert diagnostics["ev0"]["reachable"] < 0.95
+    assert json.loads(json.dumps(opt.feasibility_diagnostics))[1]["soc_reachable"][0] == 0.2
+
+
+def test_feasibility_relax():
+    """Relaxed requirements give an optimal solution at the reachable values"""
+    for engine in ["milp", "auto"]:
+        opt, data = build_unreachable(engine, "relax")
+        res = run_optimization(opt, data)
+        assert opt.optim_status == "Optimal"
+        assert np.isclose(res["P_deferrable0"].sum(), 4 * 3000)
+        assert (res["SOC_ev0"].values[4:] >= opt.feasibility_diagnostics[1]["reachable"] - 1e-6).all()
+        # Only the call is relaxed, the configured schedule still asks for 0.95
+        assert opt.optim_conf["ev_minimum_soc_schedule"] == [[0.2] * 4 + [0.95] * 44]
+        run_optimization(opt, data)
+        assert len(opt.feasibility_diagnostics) == 2
+
+
+def test_feasibility_relax_binary_params():
+    """The read-only schedules of the binary encoded runtime params are relaxed on a copy"""
+    decoded = utils.decode_runtimeparams(
+        utils.encode_runtimeparams(
+            {"ev_minimum_soc_schedule": [[0.2] * 4 + [0.95] * 44]},
+            {"ev_minimum_soc_schedule": "float64"},
+        )
+    )
+    assert not decoded["ev_minimum_soc_schedule"].flags.writeable
+    for engine in ["milp", "auto"]:
+        opt, data = build_unreachable(engine, "relax")
+        opt.optim_conf["ev_minimum_soc_schedule"] = decoded["ev_minimum_soc_schedule"]
+        res = run_optimization(opt, data)
+        assert opt.optim_status == "Optimal"
+        assert (res["SOC_ev0"].values[4:] >= opt.feasibility_diagnostics[1]["reachable"] - 1e-6).all()
+    assert np.allclose(decoded["ev_minimum_soc_schedule"][0][4:], 0.95)
+
+
+def test_feasible_problem_has_no_diagnostics():
+    opt, data = build_optimization("milp")
+    run_optimization(opt, data)
+    assert opt.feasibility_diagnostics == []
+
+
+if __name__ == "__main__":
+    test_feasibility_diagnostics_and_reject()
+    test_feasibility_relax()
+    test_feasibility_relax_binary_params()
+    test_feasible_problem_has_no_diagnostics()
+    print("🎉 Feasibility check tests PASSED!")
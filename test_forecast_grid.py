@@ -0,0 +1,50 @@
+#!/usr/bin/env python3
+"""
+Test the cached forecast time grid
+"""
+import sys
+import time
+
+import numpy as np
+import pandas as pd
+import pytz
+
+sys.path.append('/workspaces/emhass/src')
+
+from emhass import utils
+
+time_zone = pytz.timezone("Europe/Brussels")
+
+
+def test_forecast_grid_is_cached():
+    start = time.perf_counter()
+    forecast_dates = utils.get_forecast_dates(30, 1, time_zone)
+    first_call = time.perf_counter() - start
+    start = time.perf_counter()
+    grid = utils.get_forecast_grid(30, 1, time_zone)
+    cached_call = time.perf_counter() - start
+    print(f"first call {first_call * 1e6:.0f} us, cached call {cached_call * 1e6:.0f} us")
+    assert grid["forecast_dates"] is forecast_dates
+    assert len(forecast_dates) == 48
+    assert np.array_equal(grid["steps"], np.arange(48))
+    assert not grid["steps"].flags.writeable
+    # A caller cannot replace the entries of the shared cached grid
+    try:
+        grid["forecast_dates"] = forecast_dates[:10]
+    except TypeError:
+        pass
+    else:
+        raise AssertionError("the cached grid should be read-only")
+    assert len(utils.get_forecast_grid(30, 1, time_zone)["forecast_dates"]) == 48
+    horizon = utils.get_forecast_grid(30, 1, time_zone, prediction_horizon=10)
+    assert horizon["forecast_dates"].equals(forecast_dates[:10])
+
+
+def test_forecast_grid_dst_transition():
+    """The grid over the spring DST change has one transition, at 03:00 local time"""
+    start = pd.Timestamp("2025-03-30 00:00", tz=time_zone)
+    grid = utils._build_forecast_grid(start, 30, 1, time_zone, 0, None)
+    assert len(grid["forecast_dates"]) == 48
+    assert list(grid["dst_transitions"]) == [4]
+    assert grid["utc_offsets"][3] == 60 and grid["utc_offsets"][4] == 120
+    assert grid["forecast_dates"][4] == pd.Timestamp("2025-03-30 03:00", tz=time_zone)
@@ -0,0 +1,58 @@
+#!/usr/bin/env python3
+"""
+Test the parsing of the passed forecasts to arrays
+"""
+import base64
+import json
+import logging
+import sys
+import time
+
+import numpy as np
+import pandas as pd
+
+sys.path.append('/workspaces/emhass/src')
+
+from emhass import utils
+
+logger = logging.getLogger("test_forecast_ingestion")
+time_zone = "Europe/Brussels"
+forecast_dates = pd.date_range("2025-06-01", periods=48, freq="30min", tz=time_zone)
+values = np.arange(48, dtype=float) * 10
+
+
+def parse(forecast_input):
+    return utils.get_forecast_array(
+        forecast_input, forecast_dates, 30, forecast_dates.tz, "pv_power_forecast", logger
+    )
+
+
+def test_forecast_formats():
+    """Lists, strings, timestamp dicts and binary payloads give the same array"""
+    from_list = parse(values.tolist())
+    assert from_list.dtype == np.float64
+    assert np.array_equal(from_list, values)
+    assert np.array_equal(parse(json.dumps(values.tolist())), values)
+    assert np.array_equal(parse(str(values.tolist())), values)
+    assert np.array_equal(parse(values.astype("<f8").tobytes()), values)
+    encoded = "base64:" + base64.b64encode(values.astype("<f8").tobytes()).decode()
+    assert np.array_equal(parse(encoded), values)
+    # 15 minutes data is averaged on the 30 minutes time step
+    dates_15min = pd.date_range("2025-06-01", periods=96, freq="15min", tz=time_zone)
+    from_dict = parse({d.isoformat(): float(v) for d, v in zip(dates_15min, np.repeat(values, 2))})
+    assert np.array_equal(from_dict, values)
+    assert parse("not a list") is None
+
+
+def test_non_numeric_values(caplog):
+    forecast = parse([1, None, "abc", 4.5])
+    assert np.array_equal(np.isnan(forecast), [False, True, True, False])
+    assert "non numeric values" in caplog.text
+
+
+def test_list_parsing_time():
+    long_list = np.random.default_rng(0).random(100000).tolist()
+    start = time.perf_counter()
+    forecast = parse(long_list)
+    print(f"100000 values parsed in {(time.perf_counter() - start) * 1000:.1f} ms")
+    assert len(forecast) == 100000
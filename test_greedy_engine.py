@@ -0,0 +1,129 @@
+#!/usr/bin/env python3
+"""
+Compare the greedy engine with the MILP engine on EV and deferrable-only problems
+"""
+import logging
+import sys
+import time
+
+import numpy as np
+import pandas as pd
+
+sys.path.append('/workspaces/emhass/src')
+
+from emhass.optimization import Optimization
+
+logger = logging.getLogger("test_greedy_engine")
+
+
+def build_optimization(engine, costfun="profit", n=48):
+    """Build an Optimization object with one EV and two deferrable loads, no battery"""
+    retrieve_hass_conf = {
+        "optimization_time_step": pd.to_timedelta(30, "minutes"),
+        "time_zone": "UTC",
+        "sensor_power_photovoltaics": "sensor.pv_power",
+        "sensor_power_load_no_var_loads": "sensor.load_power",
+    }
+    optim_conf = {
+        "optimization_engine": engine,
+        "set_use_battery": False,
+        "set_total_pv_sell": False,
+        "number_of_deferrable_loads": 2,
+        "nominal_power_of_deferrable_loads": [3000.0, 750.0],
+        "operating_hours_of_each_deferrable_load": [4, 3],
+        "treat_deferrable_load_as_semi_cont": [True, False],
+        "set_deferrable_load_single_constant": [False, False],
+        "set_deferrable_startup_penalty": [0.0, 0.0],
+        "start_timesteps_of_each_deferrable_load": [0, 0],
+        "end_timesteps_of_each_deferrable_load": [0, 0],
+        "number_of_ev_loads": 1,
+        "ev_battery_capacity": [60000],
+        "ev_charging_efficiency": [0.9],
+        "ev_nominal_charging_power": [7400],
+        "ev_minimum_charging_power": [1380],
+        "ev_availability": [[1] * 28 + [0] * 8 + [1] * 12],
+        "ev_minimum_soc_schedule": [[0.2] * 16 + [0.8] * 32],
+        "ev_initial_soc": [0.2],
+        "lp_solver": "PULP_CBC_CMD",
+        "lp_solver_timeout": 60,
+        "num_threads": 1,
+    }
+    plant_conf = {
+        "maximum_power_from_grid": 20000,
+        "maximum_power_to_grid": 9000,
+        "inverter_is_hybrid": False,
+        "compute_curtailment": False,
+    }
+    index = pd.date_range("2025-06-01", periods=n, freq="30min", tz="UTC")
+    hours = index.hour + index.minute / 60
+    data = pd.DataFrame(
+        {
+            "P_PV": np.clip(5000 * np.sin((hours - 6) / 12 * np.pi), 0, None),
+            "P_load": 400 + 50 * (np.arange(n) % 7),
+            "unit_load_cost": np.where((hours > 7) & (hours < 22), 0.25, 0.15)
+            + 0.001 * (np.arange(n) % 5),
+            "unit_prod_price": 0.05,
+        },
+        index=index,
+    )
+    opt = Optimization(
+        retrieve_hass_conf,
+        optim_conf,
+        plant_conf,
+        "unit_load_cost",
+        "unit_prod_price",
+        costfun,
+        {},
+        logger,
+    )
+    return opt, data
+
+
+def run_optimization(opt, data):
+    return opt.perform_optimization(
+        data,
+        data["P_PV"].values,
+        data["P_load"].values,
+        data["unit_load_cost"].values,
+        data["unit_prod_price"].values,
+    )
+
+
+def test_greedy_matches_milp():
+    """The greedy engine should give the same columns and cost as the MILP engine"""
+    for costfun in ["profit", "cost", "self-consumption"]:
+        opt_milp, data = build_optimization("milp", costfun)
+        res_milp = run_optimization(opt_milp, data)
+        opt_greedy, data = build_optimization("auto", costfun)
+        start = time.perf_counter()
+        res_greedy = run_optimization(opt_greedy, data)
+        elapsed = time.perf_counter() - start
+        print(f"{costfun}: greedy engine solved in {elapsed * 1000:.1f} ms")
+
+        assert opt_greedy.optim_status == "Optimal"
+        assert list(res_greedy.columns) == list(res_milp.columns)
+        cost_col = [col for col in res_milp.columns if col.startswith("cost_fun_")][0]
+        assert np.isclose(
+            res_greedy[cost_col].sum(), res_milp[cost_col].sum(), rtol=1e-3
+        )
+        # Same deferrable energies and the same SOC requirements fulfilled
+        for col in ["P_deferrable0", "P_deferrable1"]:
+            assert np.isclose(res_greedy[col].sum(), res_milp[col].sum(), rtol=1e-3)
+        assert (res_greedy["SOC_ev0"].values[16:] >= 0.8 - 1e-6).all()
+
+
+def test_greedy_not_applicable_with_battery():
+    """The auto engine should keep the MILP when a battery couples the timesteps"""
+    opt, data = build_optimization("auto")
+    opt.optim_conf["set_use_battery"] = True
+    applicable, reason = opt.check_greedy_applicable(
+        data["unit_load_cost"].values, data["unit_prod_price"].values
+    )
+    assert not applicable
+    assert "battery" in reason
+
+
+if __name__ == "__main__":
+    test_greedy_matches_milp()
+    test_greedy_not_applicable_with_battery()
+    print("🎉 Greedy engine tests PASSED!")
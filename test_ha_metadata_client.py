@@ -0,0 +1,126 @@
+#!/usr/bin/env python3
+"""
+Test the cached Home Assistant metadata client against a local stub server
+"""
+import json
+import logging
+import pathlib
+import sys
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+sys.path.append('/workspaces/emhass/src')
+
+from emhass import utils
+
+logger = logging.getLogger("test_ha_metadata_client")
+
+
+class StubHomeAssistant(BaseHTTPRequestHandler):
+    """Answer /config with the server metadata, after an optional delay"""
+
+    protocol_version = "HTTP/1.1"
+
+    def do_GET(self):
+        server = self.server
+        server.requests += 1
+        server.connections.add(self.client_address)
+        time.sleep(server.delay)
+        body = json.dumps(server.metadata).encode()
+        self.send_response(200 if self.path == "/api/config" else 404)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, *args):
+        pass
+
+
+def start_server(delay=0.0):
+    server = ThreadingHTTPServer(("127.0.0.1", 0), StubHomeAssistant)
+    server.daemon_threads = True
+    server.requests = 0
+    server.connections = set()
+    server.delay = delay
+    server.metadata = {
+        "time_zone": "Europe/Brussels",
+        "latitude": 50.85,
+        "longitude": 4.35,
+        "elevation": 13,
+        "location_name": "Home",
+    }
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return server, f"http://127.0.0.1:{server.server_address[1]}/api"
+
+
+def test_metadata_cached_on_disk(tmp_path):
+    """The metadata is fetched once, kept on disk and reused after a restart"""
+    server, url = start_server()
+    try:
+        metadata = utils.get_ha_metadata(url, "token", tmp_path, logger)
+        assert metadata == {
+            "time_zone": "Europe/Brussels",
+            "latitude": 50.85,
+            "longitude": 4.35,
+            "elevation": 13,
+        }
+        assert (tmp_path / utils.HA_METADATA_CACHE_FILE).is_file()
+        # A restart loses the memory cache, the on-disk copy is used instead
+        utils._ha_metadata_cache.clear()
+        assert utils.get_ha_metadata(url, "token", tmp_path, logger) == metadata
+        assert server.requests == 1
+    finally:
+        server.shutdown()
+
+
+def test_stale_metadata_refreshed_in_background(tmp_path):
+    """An expired copy is returned at once while a slow server refreshes it"""
+    server, url = start_server()
+    try:
+        utils.get_ha_metadata(url, "token", tmp_path, logger)
+        server.metadata["time_zone"] = "Europe/Paris"
+        server.delay = 1.0
+        start = time.perf_counter()
+        metadata = utils.get_ha_metadata(url, "token", tmp_path, logger, ttl=0)
+        assert time.perf_counter() - start < 0.5
+        assert metadata["time_zone"] == "Europe/Brussels"
+        utils._ha_refresh_threads[url].join(5)
+        assert utils.get_ha_metadata(url, "token", tmp_path, logger)[
+            "time_zone"
+        ] == "Europe/Paris"
+        # Both requests went through the same keep-alive connection
+        assert server.requests == 2
+        assert len(server.connections) == 1
+    finally:
+        server.shutdown()
+
+
+def test_unreachable_server_times_out(tmp_path):
+    """Without a cached copy a slow server is abandoned after the timeout"""
+    server, url = start_server(delay=2.0)
+    try:
+        start = time.perf_counter()
+        metadata = utils.get_ha_metadata(
+            url, "token", tmp_path, logger, timeout=(0.5, 0.5)
+        )
+        assert metadata is None
+        assert time.perf_counter() - start < 1.5
+        assert not (tmp_path / utils.HA_METADATA_CACHE_FILE).exists()
+    finally:
+        server.shutdown()
+
+
+if __name__ == "__main__":
+    import tempfile
+
+    for test in [
+        test_metadata_cached_on_disk,
+        test_stale_metadata_refreshed_in_background,
+        test_unreachable_server_times_out,
+    ]:
+        utils._ha_metadata_cache.clear()
+        with tempfile.TemporaryDirectory() as tmp_dir:
+            test(pathlib.Path(tmp_dir))
+    print("🎉 Home Assistant metadata client tests PASSED!")
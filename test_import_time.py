@@ -0,0 +1,60 @@
+#!/usr/bin/env python3
+"""
+Check the import time of the core config and optimization modules
+"""
+import os
+import subprocess
+import sys
+
+# Total import time allowed for utils and optimization, in seconds
+IMPORT_TIME_BUDGET = float(os.getenv("EMHASS_IMPORT_TIME_BUDGET", 2.0))
+
+IMPORT_CORE_MODULES = """
+import sys
+sys.path.append('/workspaces/emhass/src')
+import emhass.optimization
+import emhass.utils
+"""
+
+
+def get_import_times(code):
+    """Run code in a fresh interpreter and return the self import time of each module"""
+    result = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", code],
+        capture_output=True,
+        text=True,
+        check=True,
+    )
+    import_times = {}
+    for line in result.stderr.splitlines():
+        if not line.startswith("import time:") or "self [us]" in line:
+            continue
+        self_us, _, name = line[len("import time:") :].split("|")
+        import_times[name.strip()] = int(self_us)
+    return import_times
+
+
+def test_core_import_time():
+    """The core modules stay within the import budget and do not load plotly"""
+    import_times = get_import_times(IMPORT_CORE_MODULES)
+    total = sum(import_times.values()) / 1e6
+    slowest = sorted(import_times.items(), key=lambda item: -item[1])[:5]
+    print(f"Core modules imported in {total:.3f} s, slowest: {slowest}")
+    assert not [name for name in import_times if name.split(".")[0] == "plotly"]
+    assert total < IMPORT_TIME_BUDGET
+
+
+def test_plots_loaded_on_demand():
+    """The web UI helpers are still reachable from utils and bring plotly in"""
+    import_times = get_import_times(
+        IMPORT_CORE_MODULES
+        + "assert 'plotly' not in sys.modules\n"
+        + "emhass.utils.get_injection_dict\n"
+    )
+    assert "plotly.express" in import_times
+
+
+if __name__ == "__main__":
+    test_core_import_time()
+    test_plots_loaded_on_demand()
+    print("🎉 Import time tests PASSED!")
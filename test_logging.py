@@ -0,0 +1,82 @@
+#!/usr/bin/env python3
+"""
+Test the idempotent logger setup, the queued log file and the lazy log arguments
+"""
+import logging
+import logging.handlers
+import sys
+import time
+
+sys.path.append('/workspaces/emhass/src')
+
+from emhass import utils
+
+
+class SlowFormatter(logging.Formatter):
+    """A formatter taking the time of a slow disk write"""
+
+    def format(self, record):
+        time.sleep(0.05)
+        return super().format(record)
+
+
+def test_get_logger_idempotent(tmp_path):
+    emhass_conf = {"data_path": tmp_path}
+    logger, handler = utils.get_logger("test_logging_file", emhass_conf)
+    assert logger.level == logging.INFO
+    for level in ["DEBUG", "INFO"]:
+        logger_again, handler_again = utils.get_logger(
+            "test_logging_file", emhass_conf, logging_level=level
+        )
+        assert logger_again is logger and handler_again is handler
+    assert len(logger.handlers) == 1
+    logger.info("written once")
+    logger.debug("below the level")
+    utils.logging_utils.stop_queue_listeners()
+    lines = (tmp_path / "logger_emhass.log").read_text().splitlines()
+    assert len(lines) == 1
+    assert lines[0].endswith("test_logging_file - INFO - written once")
+
+    # The listener is started again, the handler on the stopped queue is replaced
+    logger, handler_new = utils.get_logger("test_logging_file", emhass_conf)
+    assert handler_new is not handler and logger.handlers == [handler_new]
+    logger, stream_handler = utils.get_logger(
+        "test_logging_file", emhass_conf, save_to_file=False, logging_level="WARNING"
+    )
+    assert logger.handlers == [stream_handler]
+    assert isinstance(stream_handler, logging.StreamHandler)
+    assert stream_handler.level == logging.WARNING
+    utils.logging_utils.stop_queue_listeners()
+
+
+def test_queued_file_does_not_block(tmp_path):
+    records = utils.logging_utils.get_log_queue(tmp_path / "slow.log", SlowFormatter())
+    logger = logging.getLogger("test_logging_slow")
+    logger.propagate = False
+    logger.setLevel(logging.INFO)
+    logger.addHandler(logging.handlers.QueueHandler(records))
+    start = time.perf_counter()
+    for i in range(10):
+        logger.info("record %d", i)
+    elapsed = time.perf_counter() - start
+    print(f"10 records logged in {elapsed * 1000:.2f} ms")
+    assert elapsed < 0.25
+    utils.logging_utils.stop_queue_listeners()
+    assert len((tmp_path / "slow.log").read_text().splitlines()) == 10
+
+
+def test_lazy_arguments(caplog):
+    calls = []
+
+    def expensive():
+        calls.append(1)
+        return "value"
+
+    logger = logging.getLogger("test_logging_lazy")
+    caplog.set_level(logging.INFO, logger="test_logging_lazy")
+    logger.debug("skipped: %s", utils.logging_utils.Lazy(expensive))
+    assert calls == []
+    caplog.set_level(logging.DEBUG, logger="test_logging_lazy")
+    logger.debug("computed: %s", utils.logging_utils.Lazy(expensive))
+    assert calls
+    assert caplog.records[-1].getMessage() == "computed: value"
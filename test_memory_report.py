@@ -0,0 +1,112 @@
+#!/usr/bin/env python3
+"""
+Test the memory report of the optimization and the low memory mode
+"""
+import logging
+import sys
+import tracemalloc
+
+import numpy as np
+import pulp as plp
+
+sys.path.append('/workspaces/emhass/src')
+
+from emhass.memory import MemoryReport
+from emhass.optimization import ModelConstraints
+
+from benchmark_optimization import Scenario, run_once
+
+logger = logging.getLogger("test_memory_report")
+scenario = Scenario("battery_ev", horizon_hours=6, timestep_minutes=15, ev_loads=1, battery=True)
+
+
+def test_low_memory_mode_same_model():
+    opt = run_once(scenario, "PULP_CBC_CMD")
+    opt_low = run_once(scenario, "PULP_CBC_CMD", {"low_memory_mode": True})
+    assert opt_low.optim_status == "Optimal"
+    stats, stats_low = opt.last_solve_stats, opt_low.last_solve_stats
+    for key in ["variables", "constraints", "nonzeros", "constraint_families"]:
+        assert stats_low[key] == stats[key]
+    assert abs(stats_low["objective"] - stats["objective"]) < 1e-6
+    assert stats_low["constraint_families"]["socmax"] == scenario.timesteps
+    np.testing.assert_allclose(
+        opt_low.last_optim_results["P_grid"], opt.last_optim_results["P_grid"], atol=1e-6
+    )
+    assert opt.last_memory_report is None
+
+
+def test_model_constraints():
+    x = plp.LpVariable("x0")
+    constraints = ModelConstraints(low_memory=True)
+    constraints.update({f"constraint_ev_min_soc_0_{i}": x >= i for i in range(3)})
+    constraints.update({"constraint_socfinal_0": x <= 5})
+    assert list(constraints) == ["c0", "c1", "c2", "c3"]
+    assert constraints.families == {"ev_min_soc": 3, "socfinal": 1}
+    constraints = ModelConstraints()
+    constraints.update({"constraint_socfinal_0": x <= 5})
+    assert list(constraints) == ["constraint_socfinal_0"] and constraints.families == {}
+
+
+def test_memory_report():
+    assert not tracemalloc.is_tracing()
+    opt = run_once(scenario, "PULP_CBC_CMD", {"memory_report": True})
+    report = opt.last_memory_report
+    assert not tracemalloc.is_tracing()
+    assert opt.last_optim_results.attrs["memory_report"] == report
+    assert list(report["phases"]) == [
+        "inputs", "variables", "objective", "constraints", "solve", "extraction"
+    ]
+    assert report["peak_mb"] == max(phase["peak_mb"] for phase in report["phases"].values())
+    # The battery energy rows are quadratic in the horizon, the largest families
+    assert set(list(report["families"])[:2]) == {"socmax", "socmin"}
+    assert report["families"]["socmax"] > 0
+    # The model is released once the results are extracted
+    assert report["phases"]["extraction"]["allocated_mb"] < 0
+
+    opt_low = run_once(scenario, "PULP_CBC_CMD", {"memory_report": True, "low_memory_mode": True})
+    assert opt_low.last_memory_report["peak_mb"] < report["peak_mb"]
+
+
+def test_memory_report_stopped_on_error():
+    assert not tracemalloc.is_tracing()
+    options = {"memory_report": True, "lp_solver_path": "/nonexistent/cbc"}
+    try:
+        run_once(scenario, "COIN_CMD", options)
+    except plp.PulpSolverError:
+        pass
+    else:
+        raise AssertionError("the solve should fail without a CBC binary")
+    assert not tracemalloc.is_tracing()
+
+
+def test_memory_report_stop_once():
+    memory = MemoryReport()
+    memory.stop()
+    # A trace started after the report stopped is left running
+    tracemalloc.start()
+    try:
+        memory.stop()
+        memory.phase("late")
+        assert tracemalloc.is_tracing()
+        assert memory.as_dict()["phases"] == {}
+    finally:
+        tracemalloc.stop()
+
+
+def test_memory_report_tracing_started_by_caller():
+    tracemalloc.start()
+    try:
+        memory = MemoryReport()
+        data = [list(range(1000)) for _ in range(100)]
+        memory.family("data")
+        memory.phase("build")
+        del data
+        memory.phase("release")
+        report = memory.log(logger, "test")
+        assert tracemalloc.is_tracing()
+    finally:
+        tracemalloc.stop()
+    assert report["families"]["data"] > 1
+    assert abs(report["phases"]["build"]["allocated_mb"] - report["families"]["data"]) < 0.01
+    assert report["phases"]["release"]["allocated_mb"] < -1
+    assert report["peak_mb"] >= report["phases"]["build"]["peak_mb"]
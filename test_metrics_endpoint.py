@@ -0,0 +1,141 @@
+#!/usr/bin/env python3
+"""
+Test the Prometheus metrics endpoint with the scraper script
+"""
+import logging
+import pathlib
+import sys
+import time
+
+sys.path.append('/workspaces/emhass/src')
+
+from emhass import metrics, utils
+from scrape_metrics import check_metrics, main, parse_metrics, scrape
+from test_greedy_engine import build_optimization, run_optimization
+
+logger = logging.getLogger("test_metrics_endpoint")
+
+
+def test_histogram_buckets():
+    histogram = metrics.Histogram("test_seconds", "Test.", ("action",), buckets=(0.1, 1))
+    for value in [0.05, 0.1, 0.5, 2]:
+        histogram.observe(value, "a")
+    samples = parse_metrics(histogram.render())["test_seconds"]["samples"]
+    buckets = {labels["le"]: value for name, labels, value in samples if name.endswith("_bucket")}
+    assert buckets == {"0.1": 2, "1.0": 3, "+Inf": 4}
+    assert ("test_seconds_count", {"action": "a"}, 4) in samples
+    assert ("test_seconds_sum", {"action": "a"}, 2.65) in samples
+
+
+def test_metrics_endpoint(capsys):
+    for engine in ["milp", "auto"]:
+        opt, data = build_optimization(engine)
+        with metrics.track_request("dayahead-optim"):
+            run_optimization(opt, data)
+    with metrics.track_request("naive-mpc-optim"):
+        assert 'emhass_requests_in_progress{action="naive-mpc-optim"} 1.0' in metrics.get_metrics()
+
+    server = metrics.start_http_server(0, "127.0.0.1")
+    try:
+        url = f"http://127.0.0.1:{server.server_address[1]}/metrics"
+        families, duration = scrape(url)
+        print(f"Scrape of {len(families)} families in {duration * 1000:.1f} ms")
+        assert check_metrics(families) == []
+        samples = families["emhass_request_duration_seconds"]["samples"]
+        assert ("emhass_request_duration_seconds_count", {"action": "dayahead-optim"}, 2) in samples
+        solve_counts = {
+            labels["engine"]: value
+            for name, labels, value in families["emhass_solve_duration_seconds"]["samples"]
+            if name.endswith("_count")
+        }
+        assert solve_counts["milp"] >= 1 and solve_counts["greedy"] >= 1
+        assert families["emhass_model_build_duration_seconds"]["type"] == "histogram"
+        assert families["process_resident_memory_bytes"]["samples"][0][2] > 0
+        assert families["emhass_solve_info"]["samples"][0][1]["status"] == "Optimal"
+
+        assert main([url, "--count", "2", "--interval", "0"]) == 0
+        assert "dayahead-optim: 2 requests" in capsys.readouterr().out
+        assert main([url.replace("/metrics", "/missing")]) == 1
+    finally:
+        server.shutdown()
+        server.server_close()
+
+    # The scrape cost only depends on the number of series
+    start = time.perf_counter()
+    for _ in range(100):
+        metrics.get_metrics()
+    print(f"Metrics rendering: {(time.perf_counter() - start) * 10:.3f} ms")
+
+
+def test_optim_actions_tracked():
+    opt, data = build_optimization("milp")
+    opt.perform_dayahead_forecast_optim(data, data["P_PV"], data["P_load"])
+    opt.perform_naive_mpc_optim(data, data["P_PV"], data["P_load"], len(data))
+    families = parse_metrics(metrics.get_metrics())
+    counts = {
+        labels["action"]: value
+        for name, labels, value in families["emhass_request_duration_seconds"]["samples"]
+        if name.endswith("_count")
+    }
+    assert counts["naive-mpc-optim"] >= 1 and counts["dayahead-optim"] >= 1
+    in_progress = families["emhass_requests_in_progress"]["samples"]
+    assert all(value == 0 for _, _, value in in_progress)
+
+    # The metrics server is started once per process
+    server = metrics.ensure_http_server(0, "127.0.0.1")
+    try:
+        assert metrics.ensure_http_server(0, "127.0.0.1") is server
+        url = f"http://127.0.0.1:{server.server_address[1]}/metrics"
+        families, _ = scrape(url)
+        assert check_metrics(families) == []
+    finally:
+        server.shutdown()
+        server.server_close()
+        metrics._server = None
+
+
+def test_metrics_port_in_use(caplog):
+    """A taken metrics port is logged and the optimization still runs"""
+    server = metrics.start_http_server(0, "127.0.0.1")
+    try:
+        opt, data = build_optimization("milp")
+        with caplog.at_level(logging.WARNING):
+            opt.__init__(
+                opt.retrieve_hass_conf,
+                dict(opt.optim_conf, metrics_port=server.server_address[1]),
+                opt.plant_conf,
+                opt.var_load_cost,
+                opt.var_prod_price,
+                opt.costfun,
+                opt.emhass_conf,
+                logger,
+            )
+        assert "Unable to serve the metrics" in caplog.text
+        run_optimization(opt, data)
+        assert opt.optim_status == "Optimal"
+    finally:
+        server.shutdown()
+        server.server_close()
+        metrics._server = None
+
+
+def test_cache_metrics():
+    emhass_conf = {
+        "associations_path": pathlib.Path(__file__).parent / "emhass-ev" / "associations.csv",
+        "ev_config_path": pathlib.Path("/nonexistent/config.json"),
+    }
+    defaults_path = pathlib.Path(__file__).parent / "emhass-ev" / "config_defaults.json"
+    utils._config_cache.clear()
+    for _ in range(3):
+        utils.build_config(emhass_conf, logger, defaults_path)
+    families = parse_metrics(utils.metrics.get_metrics())
+    hits = {
+        labels["cache"]: value
+        for _, labels, value in families["emhass_cache_hits_total"]["samples"]
+    }
+    misses = {
+        labels["cache"]: value
+        for _, labels, value in families["emhass_cache_misses_total"]["samples"]
+    }
+    assert set(hits) == {"config", "time_grid", "associations", "date_features"}
+    assert hits["config"] >= 2 and misses["config"] >= 1
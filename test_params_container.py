@@ -0,0 +1,87 @@
+#!/usr/bin/env python3
+"""
+Test the in-memory params container against the serialized params
+"""
+import json
+import logging
+import pathlib
+import sys
+import time
+
+import pandas as pd
+
+sys.path.append('/workspaces/emhass/src')
+
+from emhass import utils
+
+logger = logging.getLogger("test_params_container")
+emhass_conf = {
+    "associations_path": pathlib.Path(__file__).parent / "emhass-ev" / "associations.csv",
+    "ev_config_path": pathlib.Path("/nonexistent/config.json"),
+}
+params_secrets = {
+    "time_zone": "Europe/Brussels",
+    "Latitude": 50.8,
+    "Longitude": 4.3,
+    "Altitude": 50,
+    "hass_url": "http://localhost:8123",
+    "long_lived_token": "token",
+}
+
+
+def build_params():
+    config = utils.build_config(
+        emhass_conf,
+        logger,
+        pathlib.Path(__file__).parent / "emhass-ev" / "config_defaults.json",
+    )
+    return utils.build_params(emhass_conf, params_secrets, config, logger)
+
+
+def run_stages(params):
+    """Run the per request stages, as done for an action call"""
+    retrieve_hass_conf, optim_conf, plant_conf = utils.get_yaml_parse(params, logger)
+    runtimeparams = {"number_of_ev_loads": 1, "nominal_power_of_deferrable_loads": [2000, 500]}
+    params, retrieve_hass_conf, optim_conf, plant_conf = utils.treat_runtimeparams(
+        json.dumps(runtimeparams),
+        params,
+        retrieve_hass_conf,
+        optim_conf,
+        plant_conf,
+        "dayahead-optim",
+        logger,
+        emhass_conf,
+    )
+    params = utils.update_params_with_ha_config(params, {"currency": "USD"})
+    return params, retrieve_hass_conf, optim_conf, plant_conf
+
+
+def test_params_container_matches_serialized_params():
+    params_dict = build_params()
+    params = utils.Params.from_dict(params_dict)
+    assert params["optim_conf"] is params_dict["optim_conf"]
+    assert json.loads(params.to_json()) == json.loads(json.dumps(params_dict, default=str))
+
+    start = time.perf_counter()
+    params_json, _, optim_conf_json, _ = run_stages(json.dumps(params_dict, default=str))
+    elapsed_json = time.perf_counter() - start
+    start = time.perf_counter()
+    params_out, retrieve_hass_conf, optim_conf, _ = run_stages(params)
+    elapsed_container = time.perf_counter() - start
+    print(f"serialized: {elapsed_json * 1000:.2f} ms, container: {elapsed_container * 1000:.2f} ms")
+
+    assert isinstance(params_out, utils.Params)
+    assert json.loads(params_out.to_json()) == json.loads(params_json)
+    assert optim_conf == optim_conf_json
+    assert isinstance(retrieve_hass_conf["optimization_time_step"], pd.Timedelta)
+    assert params_out["passed_data"]["custom_cost_fun_id"]["unit_of_measurement"] == "$"
+    # The runtime parameters did not change the params kept in memory
+    assert params["optim_conf"]["number_of_ev_loads"] == 0
+    assert params["optim_conf"]["nominal_power_of_deferrable_loads"] == [3000.0, 750.0]
+    assert "passed_data" not in params_dict or params_dict["passed_data"] == params["passed_data"]
+    assert isinstance(params["retrieve_hass_conf"]["optimization_time_step"], int)
+
+
+if __name__ == "__main__":
+    test_params_container_matches_serialized_params()
+    print("🎉 Params container tests PASSED!")
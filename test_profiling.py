@@ -0,0 +1,101 @@
+#!/usr/bin/env python3
+"""
+Test the opt-in profiling of the actions
+"""
+import json
+import logging
+import pathlib
+import pstats
+import sys
+
+import pulp as plp
+
+sys.path.append('/workspaces/emhass/src')
+
+from emhass import profiling, utils
+from test_greedy_engine import build_optimization, run_optimization
+
+logger = logging.getLogger("test_profiling")
+
+
+def test_profile_action(tmp_path):
+    opt, data = build_optimization("milp")
+    with profiling.profile_action("naive-mpc-optim", tmp_path, logger) as run:
+        assert profiling.get_current_profile() is run
+        opt_res = run_optimization(opt, data)
+    assert profiling.get_current_profile() is None
+    assert run.stats_path.parent == tmp_path / profiling.PROFILE_DIR
+    assert run.stats_path.name.endswith("_naive-mpc-optim.prof")
+    stats = pstats.Stats(str(run.stats_path))
+    assert any(name == "perform_optimization" for _, _, name in stats.stats)
+    assert "mps_dump" in opt_res.attrs["timings"]
+
+    # The dumped model gives the same optimum offline
+    _, model = plp.LpProblem.fromMPS(str(run.mps_path), sense=plp.LpMaximize)
+    model.solve(plp.PULP_CBC_CMD(msg=0))
+    assert plp.LpStatus[model.status] == "Optimal"
+    assert abs(plp.value(model.objective) - opt.last_solve_stats["objective"]) < 1e-6
+
+
+def test_profile_ring_buffer(tmp_path):
+    runs = []
+    for i in range(4):
+        opt, data = build_optimization("auto")
+        with profiling.profile_action(f"action {i}", tmp_path, logger, max_count=2) as run:
+            run_optimization(opt, data)
+        # The greedy engine builds no model
+        assert run.mps_path is None
+        runs.append(run)
+    kept = sorted(path.name for path in (tmp_path / profiling.PROFILE_DIR).iterdir())
+    assert kept == [runs[2].stats_path.name, runs[3].stats_path.name]
+    assert kept[1].endswith("_action_3.prof")
+
+    opt, data = build_optimization("milp")
+    with profiling.profile_action("dayahead-optim", tmp_path, logger, enabled=False) as run:
+        opt_res = run_optimization(opt, data)
+    assert run is None
+    assert "mps_dump" not in opt_res.attrs["timings"]
+
+
+def test_profile_optim_actions(tmp_path):
+    opt, data = build_optimization("milp")
+    opt.emhass_conf = {"data_path": tmp_path}
+    opt.perform_dayahead_forecast_optim(data, data["P_PV"], data["P_load"])
+    assert not (tmp_path / profiling.PROFILE_DIR).exists()
+
+    opt.optim_conf["profile_actions"] = True
+    opt.optim_conf["profile_max_count"] = 1
+    opt.perform_dayahead_forecast_optim(data, data["P_PV"], data["P_load"])
+    opt.perform_naive_mpc_optim(data, data["P_PV"], data["P_load"], len(data))
+    kept = sorted(path.name for path in (tmp_path / profiling.PROFILE_DIR).iterdir())
+    assert len(kept) == 2
+    assert kept[0].endswith("_naive-mpc-optim.mps")
+    assert kept[1].endswith("_naive-mpc-optim.prof")
+    assert profiling.get_current_profile() is None
+
+
+def test_profile_runtime_parameter():
+    emhass_conf = {
+        "associations_path": pathlib.Path(__file__).parent / "emhass-ev" / "associations.csv",
+        "ev_config_path": pathlib.Path("/nonexistent/config.json"),
+    }
+    config = utils.build_config(
+        emhass_conf,
+        logger,
+        pathlib.Path(__file__).parent / "emhass-ev" / "config_defaults.json",
+    )
+    params = utils.build_params(emhass_conf, {"time_zone": "Europe/Brussels"}, config, logger)
+    assert params["optim_conf"]["profile_actions"] is False
+    assert params["optim_conf"]["profile_max_count"] == 10
+    retrieve_hass_conf, optim_conf, plant_conf = utils.get_yaml_parse(params, logger)
+    _, _, optim_conf, _ = utils.treat_runtimeparams(
+        json.dumps({"profile": True}),
+        json.dumps(params, default=str),
+        retrieve_hass_conf,
+        optim_conf,
+        plant_conf,
+        "naive-mpc-optim",
+        logger,
+        emhass_conf,
+    )
+    assert optim_conf["profile_actions"] is True
@@ -0,0 +1,98 @@
+#!/usr/bin/env python3
+"""
+Test the cached rendering of the optimization results page
+"""
+import sys
+
+import numpy as np
+import pandas as pd
+
+sys.path.append('/workspaces/emhass/src')
+
+from emhass import plots, utils
+
+
+def build_results(n=288):
+    rng = np.random.default_rng(0)
+    index = pd.date_range("2025-06-01", periods=n, freq="5min", tz="UTC")
+    columns = ["P_PV", "P_Load", "P_deferrable0", "P_ev0", "P_grid_pos", "P_grid_neg"]
+    df = pd.DataFrame(rng.random((n, len(columns))) * 3000, index=index, columns=columns)
+    df["SOC_opt"] = rng.random(n)
+    df["unit_load_cost"] = 0.25
+    df["cost_profit"] = rng.random(n)
+    df["optim_status"] = "Optimal"
+    return df
+
+
+def test_injection_dict_cached():
+    """An unchanged result is rendered once, without modifying the input"""
+    df = build_results()
+    plots._render_cache.clear()
+    injection_dict = utils.get_injection_dict(df)
+    assert "optim_status" in df.columns
+    assert len(plots._render_cache) == 1
+    assert utils.get_injection_dict(df.copy()) == injection_dict
+    assert len(plots._render_cache) == 1
+    # plotly.js is only embedded in the first figure
+    assert "plotly.js v" in injection_dict["figure_0"]
+    assert "plotly.js v" not in injection_dict["figure_1"]
+    assert "plotly.js v" not in injection_dict["figure_2"]
+    df.iloc[0, 0] += 1
+    utils.get_injection_dict(df)
+    assert len(plots._render_cache) == 2
+
+
+def test_results_table_pages():
+    df = build_results()
+    injection_dict = utils.get_injection_dict(df, table_page_size=100)
+    assert injection_dict["table1_pages"] == 3
+    assert injection_dict["table1"].count("<tr>") == 100
+    page = utils.get_results_table_page(df, 2, 100)
+    assert page["page"] == 2 and page["rows"] == 288
+    assert page["table"].count("<tr>") == 88
+
+
+def test_plot_payload_bounded():
+    """The figures of a long backtest are downsampled, the extremes are kept"""
+    payloads = []
+    for days in [7, 28]:
+        df = build_results(days * 288)
+        injection_dict = utils.get_injection_dict(df)
+        payloads.append(sum(len(injection_dict[f"figure_{i}"]) for i in range(3)))
+    print(f"figures payload: 1 week {payloads[0] / 1e3:.0f} kB, 4 weeks {payloads[1] / 1e3:.0f} kB")
+    assert payloads[1] < 1.1 * payloads[0]
+    df_plot = plots.downsample_minmax(df.drop(columns="optim_status"), 1366)
+    assert len(df_plot) == 2 * 1366
+    assert (df_plot.max() == df.drop(columns="optim_status").max()).all()
+    assert (df_plot.min() == df.drop(columns="optim_status").min()).all()
+
+
+def test_downsample_keeps_order():
+    """A falling series stays falling, the extremes keep their own timestamps"""
+    index = pd.date_range("2025-06-01", periods=10000, freq="5min", tz="UTC")
+    falling = np.repeat(np.linspace(5000, 0, 50), 200)
+    df = pd.DataFrame({"P_deferrable0": falling}, index=index)
+    df_plot = plots.downsample_minmax(df, 100)
+    assert len(df_plot) == 200
+    assert df_plot["P_deferrable0"].is_monotonic_decreasing
+    assert df_plot.index.is_monotonic_increasing
+    assert (df_plot["P_deferrable0"] == df.loc[df_plot.index, "P_deferrable0"]).all()
+    assert df_plot["P_deferrable0"].max() == 5000 and df_plot["P_deferrable0"].min() == 0
+
+
+def test_plot_data_zoom():
+    """A zoomed range is served at full resolution"""
+    df = build_results(28 * 288)
+    data = utils.get_plot_data(df, ["P_PV"], "2025-06-02 00:00", "2025-06-02 23:55")
+    assert len(data["index"]) == 288
+    assert data["columns"]["P_PV"] == df.loc["2025-06-02", "P_PV"].tolist()
+    assert len(utils.get_plot_data(df)["index"]) == 2 * 1366
+
+
+if __name__ == "__main__":
+    test_injection_dict_cached()
+    test_results_table_pages()
+    test_plot_payload_bounded()
+    test_downsample_keeps_order()
+    test_plot_data_zoom()
+    print("🎉 Render cache tests PASSED!")
@@ -0,0 +1,65 @@
+#!/usr/bin/env python3
+"""
+Test the model size and solver statistics of the MILP solves and their metrics
+"""
+import sys
+
+sys.path.append('/workspaces/emhass/src')
+
+from emhass import metrics
+from emhass.optimization import Optimization
+from test_greedy_engine import build_optimization, run_optimization
+
+CBC_TIME_LIMIT_LOG = """Cbc0010I After 1200 nodes, 80 on tree, -6.25 best solution
+Result - Stopped on time limit
+
+Objective value:                -6.25000000
+Lower bound:                    -6.31250000
+Gap:                            0.01
+Enumerated nodes:               1234
+Total iterations:               56789
+Time (CPU seconds):             60.02
+"""
+
+
+def test_solve_stats():
+    opt, data = build_optimization("milp")
+    opt_res = run_optimization(opt, data)
+    stats = opt.last_solve_stats
+    print(f"Solve statistics: {stats}")
+    assert opt_res.attrs["solve_stats"] is stats
+    assert stats["status"] == opt.optim_status == "Optimal"
+    # P_grid_pos, P_grid_neg, 2 deferrable loads and the EV power and SOC
+    assert stats["variables"]["continuous"] == 6 * 48
+    assert stats["variables"]["binary"] > 0
+    assert stats["constraints"] == sum(stats["constraint_families"].values())
+    assert stats["nonzeros"] > stats["constraints"]
+    families = list(stats["constraint_families"].values())
+    assert families == sorted(families, reverse=True)
+    assert stats["constraint_families"]["ev_min_soc"] == 48
+    assert stats["solve_time"] > 0
+    assert stats["nodes"] is not None and stats["iterations"] is not None
+    assert stats["gap"] == 0.0
+    assert stats["config"] == {
+        "timesteps": 48,
+        "deferrable_loads": 2,
+        "sequence_loads": 0,
+        "thermal_loads": 0,
+        "ev_loads": 1,
+        "battery": False,
+        "hybrid_inverter": False,
+        "costfun": "profit",
+    }
+
+    page = metrics.get_metrics()
+    assert '# TYPE emhass_solve_seconds gauge' in page
+    assert 'emhass_solve_variables{solver="PULP_CBC_CMD",type="binary"}' in page
+    assert 'emhass_solve_constraint_family_rows{solver="PULP_CBC_CMD",family="ev_min_soc"} 48.0' in page
+    assert 'status="Optimal"' in page
+
+
+def test_parse_cbc_log(tmp_path):
+    log_path = tmp_path / "cbc.log"
+    log_path.write_text(CBC_TIME_LIMIT_LOG)
+    assert Optimization._parse_cbc_log(str(log_path)) == (1234, 56789, 0.01)
+    assert Optimization._parse_cbc_log(str(tmp_path / "missing.log")) == (None, None, None)
@@ -0,0 +1,221 @@
+#!/usr/bin/env python3
+"""
+Test the DST-safe time index helpers, with a benchmark across both DST changes
+"""
+import logging
+import sys
+import time
+import tracemalloc
+import unittest
+
+import numpy as np
+import pandas as pd
+import pytz
+
+sys.path.append('/workspaces/emhass/src')
+
+from emhass import utils
+
+time_index = utils.time_index
+
+time_zone = pytz.timezone("Europe/Brussels")
+freq = pd.Timedelta(minutes=15)
+
+
+def local_wall_clock(start, end):
+    """Naive local timestamps between two UTC dates, with the repeated fall-back hour"""
+    return (
+        pd.date_range(start, end, freq=freq, tz="UTC", inclusive="left")
+        .tz_convert(time_zone)
+        .tz_localize(None)
+    )
+
+
+def test_time_grid_across_dst():
+    """The grid keeps a constant step through the spring-forward and fall-back days"""
+    spring = time_index.make_time_grid(
+        pd.Timestamp("2025-03-30 00:00"), freq, time_zone, periods=96
+    )
+    fall = time_index.make_time_grid(
+        pd.Timestamp("2025-10-26 00:00"),
+        freq,
+        time_zone,
+        end=pd.Timestamp("2025-10-26 23:45"),
+    )
+    for grid in (spring, fall):
+        assert (grid[1:] - grid[:-1] == freq).all()
+    # 96 steps of 15 minutes end at 00:45 on the next day, the spring-forward day has 23 hours
+    assert spring[-1] == pd.Timestamp("2025-03-31 00:45", tz=time_zone)
+    # The fall-back day has 25 hours
+    assert len(fall) == 100
+
+
+def test_localize_fall_back_hour():
+    """The repeated hour is localized as summer then winter time, also when irregular"""
+    index = local_wall_clock("2025-10-25 22:00", "2025-10-26 04:00")
+    localized = time_index.localize_index(index, time_zone)
+    assert localized.is_unique and localized.is_monotonic_increasing
+    # An ambiguous time seen only once cannot be inferred
+    irregular = index.delete([5, 6, 7, 8, 9, 10, 11, 12])
+    localized = time_index.localize_index(irregular, time_zone)
+    assert localized.is_unique and localized.is_monotonic_increasing
+    spring = pd.DatetimeIndex(["2025-03-30 01:45", "2025-03-30 02:15"])
+    assert time_index.localize_index(spring, time_zone)[1] == pd.Timestamp(
+        "2025-03-30 03:00", tz=time_zone
+    )
+
+
+def test_set_df_index_freq_cleans_index():
+    """NaT and duplicated dates are dropped before setting the freq"""
+    index = pd.date_range("2025-10-26 00:00", periods=12, freq=freq, tz=time_zone)
+    df = pd.DataFrame({"value": np.arange(12.0)}, index=index)
+    nat = pd.DataFrame({"value": [0.0]}, index=pd.DatetimeIndex([pd.NaT], tz=time_zone))
+    df = pd.concat([df, df.iloc[[3]], nat])
+    logger = logging.getLogger("test_time_index")
+    with unittest.TestCase().assertLogs(logger, level="WARNING") as logs:
+        df = utils.set_df_index_freq(df.iloc[::-1], logger)
+    assert "dropped 1 NaT, 1 duplicated and 0 off-grid dates" in logs.output[0]
+    assert df.index.freq == freq
+    assert len(df) == 12 and df.index.is_monotonic_increasing
+    # A regular index is not reported
+    with unittest.TestCase().assertNoLogs(logger, level="WARNING"):
+        utils.set_df_index_freq(df, logger)
+
+
+def test_reindex_naive_data_on_forecast_grid():
+    index = local_wall_clock("2025-10-26 00:00", "2025-10-26 06:00")
+    data = pd.Series(np.arange(len(index), dtype=float), index=index)
+    data = pd.concat([data, data.iloc[[0]]])
+    grid = time_index.make_time_grid(
+        pd.Timestamp("2025-10-26 00:00", tz="UTC"), freq, time_zone, periods=len(index)
+    )
+    reindexed = time_index.reindex(data, grid)
+    assert reindexed.index.equals(grid)
+    assert np.array_equal(reindexed.to_numpy(), np.arange(len(index)))
+
+
+def test_dst_benchmark():
+    """Vectorized localization and cleanup of a year of data versus a per-timestamp loop"""
+    index = local_wall_clock("2025-01-01", "2026-01-01")
+    df = pd.DataFrame({"value": np.random.default_rng(0).random(len(index))}, index=index)
+    start = time.perf_counter()
+    df_local = df.set_axis(time_index.localize_index(df.index, time_zone))
+    df_local = utils.set_df_index_freq(df_local)
+    vectorized = time.perf_counter() - start
+
+    sample = index[: len(index) // 20]
+    start = time.perf_counter()
+    seen = set()
+    for date in sample:
+        time_zone.localize(date.to_pydatetime(), is_dst=date not in seen)
+        seen.add(date)
+    loop = (time.perf_counter() - start) * 20
+    print(
+        f"{len(index)} dates: vectorized {vectorized * 1e3:.1f} ms, "
+        f"estimated loop {loop * 1e3:.1f} ms"
+    )
+    assert len(df_local) == len(index)
+    assert (df_local.index[1:] - df_local.index[:-1] == freq).all()
+    assert vectorized < loop
+
+
+def test_regularize_index_stats():
+    """NaT, duplicated and off-grid dates are dropped, the gaps are reported"""
+    index = pd.date_range("2025-06-01", periods=20, freq="1min", tz="UTC")
+    index = index.delete([5, 6, 12]).append(
+        pd.DatetimeIndex([index[2], pd.NaT, index[3] + pd.Timedelta(seconds=20)])
+    )
+    df = pd.DataFrame({"value": np.arange(len(index), dtype=float)}, index=index)
+    df, stats = time_index.regularize_index(df)
+    assert df.index.equals(pd.date_range("2025-06-01", periods=20, freq="1min", tz="UTC"))
+    assert df.index.freq == pd.Timedelta(minutes=1)
+    assert df["value"].isna().sum() == 3 and df["value"].iloc[2] == 2
+    assert stats == {
+        "rows": 20,
+        "nat": 1,
+        "duplicates": 1,
+        "off_grid": 1,
+        "gaps": 2,
+        "missing_steps": 3,
+        "sampling": pd.Timedelta(minutes=1),
+    }
+
+
+def test_regularize_chunks_from_disk(tmp_path):
+    """A history read from disk in chunks gives the in-memory result"""
+    index = pd.date_range("2025-06-01", periods=7 * 1440, freq="1min")
+    index = index.delete(np.s_[3000:3100]).delete(np.s_[5000:5001])
+    df = pd.DataFrame({"value": np.arange(len(index), dtype=float)}, index=index)
+    df.to_csv(tmp_path / "history.csv")
+    expected, expected_stats = time_index.regularize_index(df)
+    stats = time_index.new_index_stats()
+    chunks = pd.read_csv(
+        tmp_path / "history.csv", index_col=0, parse_dates=True, chunksize=1000
+    )
+    result = pd.concat(time_index.regularize_chunks(chunks, stats=stats))
+    pd.testing.assert_frame_equal(result, expected, check_freq=False)
+    assert stats == expected_stats
+
+
+def one_year_one_minute():
+    rng = np.random.default_rng(0)
+    index = pd.date_range("2025-01-01", periods=525600, freq="1min", tz="Europe/Brussels")
+    # Sensor dropouts and repeated samples
+    index = index.delete(rng.choice(len(index), 2000, replace=False))
+    index = index.append(index[rng.choice(len(index), 500, replace=False)]).sort_values()
+    return pd.DataFrame({"value": rng.random(len(index))}, index=index)
+
+
+def asfreq_set_df_index_freq(df):
+    """The previous implementation, on the median step of the whole index"""
+    df = time_index.clean_df_index(df)
+    sampling = (df.index[1:] - df.index[:-1]).median()
+    return df.asfreq(sampling)
+
+
+def measure(function, *args):
+    tracemalloc.start()
+    start = time.perf_counter()
+    result = function(*args)
+    elapsed = time.perf_counter() - start
+    peak = tracemalloc.get_traced_memory()[1]
+    tracemalloc.stop()
+    return result, elapsed, peak
+
+
+def test_regularize_benchmark():
+    """Regularize a year of 1 minute data in memory and in chunks"""
+    df = one_year_one_minute()
+
+    def chunked(df):
+        stats = time_index.new_index_stats()
+        chunks = (df.iloc[i : i + 50000] for i in range(0, len(df), 50000))
+        rows = sum(len(chunk) for chunk in time_index.regularize_chunks(chunks, stats=stats))
+        return rows, stats
+
+    legacy, legacy_time, legacy_peak = measure(asfreq_set_df_index_freq, df)
+    (result, stats), new_time, new_peak = measure(time_index.regularize_index, df)
+    (rows, chunk_stats), chunk_time, chunk_peak = measure(chunked, df)
+    for name, elapsed, peak in [
+        ("asfreq", legacy_time, legacy_peak),
+        ("regularize_index", new_time, new_peak),
+        ("regularize_chunks", chunk_time, chunk_peak),
+    ]:
+        print(f"{name}: {elapsed * 1e3:.1f} ms, peak {peak / 2**20:.1f} MiB")
+    pd.testing.assert_frame_equal(result, legacy)
+    assert rows == len(result) == 525600
+    assert stats["duplicates"] == chunk_stats["duplicates"] == 500
+    assert stats["missing_steps"] == chunk_stats["missing_steps"] == 2000
+    assert new_time < legacy_time
+    assert chunk_peak < new_peak
+
+
+if __name__ == "__main__":
+    test_time_grid_across_dst()
+    test_localize_fall_back_hour()
+    test_set_df_index_freq_cleans_index()
+    test_reindex_naive_data_on_forecast_grid()
+    test_dst_benchmark()
+    test_regularize_index_stats()
+    test_regularize_benchmark()
+    print("🎉 Time index tests PASSED!")
@@ -0,0 +1,105 @@
+#!/usr/bin/env python3
+"""
+Test the timing spans of the optimization phases and of the config pipeline
+"""
+import json
+import logging
+import pathlib
+import sys
+import time
+
+sys.path.append('/workspaces/emhass/src')
+
+from emhass import utils
+
+from emhass.optimization import Optimization
+from test_greedy_engine import build_optimization, run_optimization
+
+logger = logging.getLogger("test_timing_spans")
+emhass_conf = {
+    "associations_path": pathlib.Path(__file__).parent / "emhass-ev" / "associations.csv",
+    "ev_config_path": pathlib.Path("/nonexistent/config.json"),
+}
+
+
+def get_timing_lines(caplog, label):
+    return [
+        json.loads(record.getMessage().split(" ", 2)[2])
+        for record in caplog.records
+        if record.levelno == logging.INFO
+        and record.getMessage().startswith(f"timings {label} ")
+    ]
+
+
+def test_timings_span_and_mark():
+    timings = utils.timing.Timings()
+    with timings.span("first"):
+        time.sleep(0.01)
+    time.sleep(0.005)
+    timings.mark("second")
+    with timings.span("first"):
+        time.sleep(0.01)
+    result = timings.as_dict()
+    assert list(result) == ["first", "second", "total"]
+    assert result["first"] >= 20
+    assert 5 <= result["second"] < result["first"]
+    assert result["total"] >= result["first"] + result["second"]
+
+
+def test_optimization_timings(caplog):
+    caplog.set_level(logging.INFO)
+    opt, data = build_optimization("milp")
+    assert isinstance(opt, Optimization)
+    start = time.perf_counter()
+    opt_res = run_optimization(opt, data)
+    elapsed = (time.perf_counter() - start) * 1000
+    timings = opt_res.attrs["timings"]
+    print(f"MILP phases (ms): {timings}")
+    assert timings is opt.last_timings
+    assert list(timings) == [
+        "inputs", "variables", "objective", "constraints", "solve", "extraction", "total"
+    ]
+    assert timings["total"] <= elapsed
+    assert sum(v for k, v in timings.items() if k != "total") <= timings["total"]
+    assert get_timing_lines(caplog, "perform_optimization") == [timings]
+
+    opt, data = build_optimization("auto")
+    opt_res = run_optimization(opt, data)
+    assert list(opt_res.attrs["timings"]) == ["greedy", "total"]
+
+
+def test_config_pipeline_timings(caplog):
+    caplog.set_level(logging.INFO)
+    utils._config_cache.clear()
+    config = utils.build_config(
+        emhass_conf,
+        logger,
+        pathlib.Path(__file__).parent / "emhass-ev" / "config_defaults.json",
+    )
+    params = utils.build_params(emhass_conf, {"time_zone": "Europe/Brussels"}, config, logger)
+    retrieve_hass_conf, optim_conf, plant_conf = utils.get_yaml_parse(params, logger)
+    utils.treat_runtimeparams(
+        json.dumps({"prediction_horizon": 10}),
+        json.dumps(params, default=str),
+        retrieve_hass_conf,
+        optim_conf,
+        plant_conf,
+        "naive-mpc-optim",
+        logger,
+        emhass_conf,
+    )
+    print(f"Config pipeline phases (ms): {utils.last_timings}")
+    assert list(utils.last_timings["build_config"]) == [
+        "defaults", "config", "legacy_config", "ev_config", "cache", "total"
+    ]
+    assert list(utils.last_timings["build_params"]) == [
+        "associations", "config", "secrets", "total"
+    ]
+    assert list(utils.last_timings["treat_runtimeparams"]) == [
+        "defaults", "decode", "forecast_dates", "forecasts", "runtime_params",
+        "serialize", "total"
+    ]
+    for label, timings in utils.last_timings.items():
+        assert get_timing_lines(caplog, label) == [timings]
+    # The timings are kept out of the params
+    assert "timings" not in params["passed_data"]